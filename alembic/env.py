@@ -15,6 +15,9 @@ if config.config_file_name is not None:
 
 target_metadata = Base.metadata
 
+# Full-text shadow tables are created by raw DDL, not declared on the models.
+SEARCH_SHADOW_TABLES = ("users_fts", "bookings_fts")
+
 
 def _sync_database_url() -> str:
     """Convert async database URL to sync version for Alembic migrations."""
@@ -33,6 +36,20 @@ def _sync_database_url() -> str:
     return url
 
 
+def _include_object(dialect_name: str):
+    """Keep autogenerate from touching FTS shadow tables or other dialects' indexes."""
+    def include_object(obj, name, type_, reflected, compare_to):
+        if type_ == "table" and reflected and compare_to is None:
+            if any(name == t or name.startswith(f"{t}_") for t in SEARCH_SHADOW_TABLES):
+                return False
+        ddl_if = getattr(obj, "_ddl_if", None)
+        if type_ == "index" and ddl_if is not None and ddl_if.dialect not in (None, dialect_name):
+            return False
+        return True
+
+    return include_object
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode."""
     url = _sync_database_url()
@@ -61,6 +78,7 @@ def run_migrations_online() -> None:
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
+            include_object=_include_object(connection.dialect.name),
         )
 
         with context.begin_transaction():
@@ -0,0 +1,71 @@
+"""user search indexes
+
+Revision ID: 3f1a9c2d7b84
+Revises: 90372c868171
+Create Date: 2026-10-16 09:12:31.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1a9c2d7b84'
+down_revision: Union[str, None] = '90372c868171'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRGM_COLUMNS = ("email", "full_name", "phone")
+
+USERS_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+    "email, full_name, phone, content='users', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts(rowid, email, full_name, phone) VALUES (new.id, new.email, new.full_name, new.phone); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, email, full_name, phone) "
+    "VALUES ('delete', old.id, old.email, old.full_name, old.phone); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF email, full_name, phone ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, email, full_name, phone) "
+    "VALUES ('delete', old.id, old.email, old.full_name, old.phone); "
+    "INSERT INTO users_fts(rowid, email, full_name, phone) VALUES (new.id, new.email, new.full_name, new.phone); "
+    "END",
+]
+
+
+def upgrade() -> None:
+    op.create_index("ix_users_created_at", "users", ["created_at"])
+
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for column in TRGM_COLUMNS:
+            op.create_index(
+                f"ix_users_{column}_trgm",
+                "users",
+                [column],
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+            )
+    elif dialect == "sqlite":
+        for statement in USERS_FTS_DDL:
+            op.execute(statement)
+        # Index the rows that already exist
+        op.execute("INSERT INTO users_fts(users_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        for column in TRGM_COLUMNS:
+            op.drop_index(f"ix_users_{column}_trgm", table_name="users")
+    elif dialect == "sqlite":
+        for trigger in ("users_fts_ai", "users_fts_ad", "users_fts_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS users_fts")
+
+    op.drop_index("ix_users_created_at", table_name="users")
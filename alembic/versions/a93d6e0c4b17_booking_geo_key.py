@@ -0,0 +1,69 @@
+"""booking geo key
+
+Revision ID: a93d6e0c4b17
+Revises: f07c2b8e5d41
+Create Date: 2026-10-16 14:31:56.402118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a93d6e0c4b17'
+down_revision: Union[str, None] = 'f07c2b8e5d41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BITS = 26
+
+
+def _geo_key(lat, lng):
+    # Same encoding as app.services.geo.geo_key, frozen here for the backfill
+    if lat is None or lng is None or not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    size = 1 << BITS
+    row = min(int((lat + 90.0) / 180.0 * size), size - 1)
+    col = min(int((lng + 180.0) / 360.0 * size), size - 1)
+    key = 0
+    for bit in range(BITS):
+        key |= ((col >> bit) & 1) << (2 * bit)
+        key |= ((row >> bit) & 1) << (2 * bit + 1)
+    return key
+
+
+def _backfill(table_name: str) -> None:
+    bind = op.get_bind()
+    table = sa.table(
+        table_name, sa.column("id"), sa.column("location_lat"), sa.column("location_lng"), sa.column("geo_key")
+    )
+    rows = bind.execute(
+        sa.select(table.c.id, table.c.location_lat, table.c.location_lng)
+        .where(table.c.location_lat.is_not(None), table.c.location_lng.is_not(None))
+    ).all()
+    updates = [{"row_id": row_id, "key": _geo_key(lat, lng)} for row_id, lat, lng in rows]
+    updates = [update for update in updates if update["key"] is not None]
+    if updates:
+        bind.execute(
+            table.update().where(table.c.id == sa.bindparam("row_id")).values(geo_key=sa.bindparam("key")),
+            updates,
+        )
+
+
+def upgrade() -> None:
+    for table_name in ("bookings", "bookings_archive"):
+        op.add_column(table_name, sa.Column("geo_key", sa.BigInteger(), nullable=True))
+        _backfill(table_name)
+    op.create_index("ix_bookings_geo_key", "bookings", ["geo_key"])
+    op.create_index("ix_bookings_status_geo_key", "bookings", ["status", "geo_key"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_bookings_status_geo_key", table_name="bookings")
+    op.drop_index("ix_bookings_geo_key", table_name="bookings")
+    # Plain DROP COLUMN (SQLite 3.35+): batch mode would rebuild the tables and
+    # lose the DESC ordering on their indexes
+    op.drop_column("bookings_archive", "geo_key")
+    op.drop_column("bookings", "geo_key")
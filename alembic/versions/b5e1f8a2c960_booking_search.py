@@ -0,0 +1,85 @@
+"""booking search indexes
+
+Revision ID: b5e1f8a2c960
+Revises: a93d6e0c4b17
+Create Date: 2026-10-17 09:08:44.215730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e1f8a2c960'
+down_revision: Union[str, None] = 'a93d6e0c4b17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of app.core.arabic: alef variants to alef, alef maqsura to yaa,
+# tashkeel and tatweel dropped
+FOLDS = [("أ", "ا"), ("إ", "ا"), ("آ", "ا"), ("ٱ", "ا"), ("ى", "ي")]
+TASHKEEL = "".join(chr(code) for code in range(0x064B, 0x0653)) + "\u0670\u0640"
+SEARCH_COLUMNS = {"contact_name": "A", "contact_phone": "A", "address_text": "B", "description": "C"}
+FTS_COLUMNS = ", ".join(SEARCH_COLUMNS)
+
+
+def _fold_sqlite(expr: str) -> str:
+    for source, target in [*FOLDS, *((char, "") for char in TASHKEEL)]:
+        expr = f"replace({expr}, '{source}', '{target}')"
+    return expr
+
+
+def _folded(prefix: str) -> str:
+    return ", ".join(_fold_sqlite(f"{prefix}{name}") for name in SEARCH_COLUMNS)
+
+
+def _pg_vector() -> str:
+    sources = "".join(source for source, _ in FOLDS) + TASHKEEL
+    targets = "".join(target for _, target in FOLDS)
+    return " || ".join(
+        f"setweight(to_tsvector('simple', translate({name}, '{sources}', '{targets}')), '{weight}')"
+        for name, weight in SEARCH_COLUMNS.items()
+    )
+
+
+BOOKINGS_FTS_DDL = [
+    "CREATE VIEW IF NOT EXISTS bookings_fts_content AS SELECT id, "
+    + ", ".join(f"{_fold_sqlite(name)} AS {name}" for name in SEARCH_COLUMNS)
+    + " FROM bookings",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS bookings_fts USING fts5({FTS_COLUMNS}, "
+    "content='bookings_fts_content', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS bookings_fts_ai AFTER INSERT ON bookings BEGIN "
+    f"INSERT INTO bookings_fts(rowid, {FTS_COLUMNS}) VALUES (new.id, {_folded('new.')}); "
+    "END",
+    f"CREATE TRIGGER IF NOT EXISTS bookings_fts_ad AFTER DELETE ON bookings BEGIN "
+    f"INSERT INTO bookings_fts(bookings_fts, rowid, {FTS_COLUMNS}) VALUES ('delete', old.id, {_folded('old.')}); "
+    "END",
+    f"CREATE TRIGGER IF NOT EXISTS bookings_fts_au AFTER UPDATE OF {FTS_COLUMNS} ON bookings BEGIN "
+    f"INSERT INTO bookings_fts(bookings_fts, rowid, {FTS_COLUMNS}) VALUES ('delete', old.id, {_folded('old.')}); "
+    f"INSERT INTO bookings_fts(rowid, {FTS_COLUMNS}) VALUES (new.id, {_folded('new.')}); "
+    "END",
+]
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute(f"CREATE INDEX ix_bookings_search ON bookings USING gin (({_pg_vector()}))")
+    elif dialect == "sqlite":
+        for statement in BOOKINGS_FTS_DDL:
+            op.execute(statement)
+        # Index the rows that already exist
+        op.execute("INSERT INTO bookings_fts(bookings_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.drop_index("ix_bookings_search", table_name="bookings")
+    elif dialect == "sqlite":
+        for trigger in ("bookings_fts_ai", "bookings_fts_ad", "bookings_fts_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS bookings_fts")
+        op.execute("DROP VIEW IF EXISTS bookings_fts_content")
@@ -0,0 +1,56 @@
+"""hot path indexes
+
+Revision ID: b7e4d2a91c03
+Revises: 3f1a9c2d7b84
+Create Date: 2026-10-16 10:02:47.118530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e4d2a91c03'
+down_revision: Union[str, None] = '3f1a9c2d7b84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_bookings_client_id_created_at", "bookings", ["client_id", sa.text("created_at DESC")])
+    op.create_index("ix_bookings_status_created_at", "bookings", ["status", sa.text("created_at DESC")])
+    op.create_index("ix_bookings_created_at", "bookings", [sa.text("created_at DESC")])
+    op.create_index("ix_bookings_assigned_employee_id_status", "bookings", ["assigned_employee_id", "status"])
+    op.create_index("ix_bookings_service_id", "bookings", ["service_id"])
+    if op.get_bind().dialect.name == "postgresql":
+        op.create_index(
+            "ix_bookings_active_created_at",
+            "bookings",
+            [sa.text("created_at DESC")],
+            postgresql_where=sa.text("status IN ('requested', 'assigned', 'in_progress')"),
+        )
+
+    # A booking has at most one review; drop any duplicates left by racing submits first.
+    op.execute("DELETE FROM reviews WHERE id NOT IN (SELECT MIN(id) FROM reviews GROUP BY booking_id)")
+    op.create_index(op.f("ix_reviews_booking_id"), "reviews", ["booking_id"], unique=True)
+
+    op.create_index(op.f("ix_password_reset_tokens_token_hash"), "password_reset_tokens", ["token_hash"], unique=True)
+    op.create_index(
+        "ix_password_reset_tokens_user_id_created_at", "password_reset_tokens", ["user_id", "created_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_password_reset_tokens_user_id_created_at", table_name="password_reset_tokens")
+    op.drop_index(op.f("ix_password_reset_tokens_token_hash"), table_name="password_reset_tokens")
+    op.drop_index(op.f("ix_reviews_booking_id"), table_name="reviews")
+
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ix_bookings_active_created_at", table_name="bookings")
+    op.drop_index("ix_bookings_service_id", table_name="bookings")
+    op.drop_index("ix_bookings_assigned_employee_id_status", table_name="bookings")
+    op.drop_index("ix_bookings_created_at", table_name="bookings")
+    op.drop_index("ix_bookings_status_created_at", table_name="bookings")
+    op.drop_index("ix_bookings_client_id_created_at", table_name="bookings")
@@ -0,0 +1,46 @@
+"""booking stats counters
+
+Revision ID: c52e8f0a6d19
+Revises: b7e4d2a91c03
+Create Date: 2026-10-16 11:40:05.663092
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c52e8f0a6d19'
+down_revision: Union[str, None] = 'b7e4d2a91c03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "booking_stats",
+        sa.Column("scope", sa.String(length=20), nullable=False),
+        sa.Column("scope_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("scope", "scope_id", "status"),
+    )
+
+    # Seed the counters from the existing bookings
+    status = "LOWER(CAST(status AS VARCHAR(20)))"
+    op.execute(
+        f"INSERT INTO booking_stats (scope, scope_id, status, count) "
+        f"SELECT 'global', 0, {status}, COUNT(*) FROM bookings GROUP BY {status}"
+    )
+    for scope, column in (("service", "service_id"), ("client", "client_id"), ("assignee", "assigned_employee_id")):
+        op.execute(
+            f"INSERT INTO booking_stats (scope, scope_id, status, count) "
+            f"SELECT '{scope}', {column}, {status}, COUNT(*) FROM bookings "
+            f"WHERE {column} IS NOT NULL GROUP BY {column}, {status}"
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("booking_stats")
@@ -0,0 +1,34 @@
+"""access token revocations
+
+Revision ID: c6a2e9d4f318
+Revises: b5e1f8a2c960
+Create Date: 2026-10-17 12:31:52.407116
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6a2e9d4f318'
+down_revision: Union[str, None] = 'b5e1f8a2c960'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "token_revocations",
+        sa.Column("user_id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("token_version", sa.Integer(), nullable=False),
+        sa.Column("revoked_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+    op.create_index("ix_token_revocations_revoked_at", "token_revocations", ["revoked_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_token_revocations_revoked_at", table_name="token_revocations")
+    op.drop_table("token_revocations")
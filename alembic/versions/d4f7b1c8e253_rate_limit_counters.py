@@ -0,0 +1,37 @@
+"""shared rate limit counters
+
+Revision ID: d4f7b1c8e253
+Revises: c6a2e9d4f318
+Create Date: 2026-10-17 14:06:27.519384
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f7b1c8e253'
+down_revision: Union[str, None] = 'c6a2e9d4f318'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "rate_limit_counters",
+        sa.Column("key", sa.String(length=100), nullable=False),
+        sa.Column("window_start", sa.BigInteger(), autoincrement=False, nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("key", "window_start"),
+    )
+    op.create_index("ix_rate_limit_counters_window_start", "rate_limit_counters", ["window_start"])
+    if op.get_bind().dialect.name == "postgresql":
+        # Disposable counters: skip the WAL
+        op.execute("ALTER TABLE rate_limit_counters SET UNLOGGED")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_rate_limit_counters_window_start", table_name="rate_limit_counters")
+    op.drop_table("rate_limit_counters")
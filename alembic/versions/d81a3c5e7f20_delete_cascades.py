@@ -0,0 +1,67 @@
+"""delete cascades
+
+Revision ID: d81a3c5e7f20
+Revises: c52e8f0a6d19
+Create Date: 2026-10-16 12:25:31.204417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81a3c5e7f20'
+down_revision: Union[str, None] = 'c52e8f0a6d19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column, referred table, ON DELETE action). Names follow PostgreSQL's
+# defaults, which is what the initial migration's unnamed constraints received.
+FOREIGN_KEYS = [
+    ("bookings", "client_id", "users", "CASCADE"),
+    ("bookings", "assigned_employee_id", "users", "SET NULL"),
+    ("reviews", "booking_id", "bookings", "CASCADE"),
+    ("password_reset_tokens", "user_id", "users", "CASCADE"),
+]
+
+# Lets batch mode find SQLite's unnamed foreign keys by the same names.
+NAMING_CONVENTION = {"fk": "%(table_name)s_%(column_0_name)s_fkey"}
+
+# SQLite batch mode copies indexes by reflection, which drops the DESC ordering.
+DESC_INDEXES = [
+    ("ix_bookings_client_id_created_at", ["client_id", sa.text("created_at DESC")]),
+    ("ix_bookings_status_created_at", ["status", sa.text("created_at DESC")]),
+    ("ix_bookings_created_at", [sa.text("created_at DESC")]),
+]
+
+
+def _replace_foreign_keys(with_ondelete: bool) -> None:
+    for table, column, referred, ondelete in FOREIGN_KEYS:
+        name = f"{table}_{column}_fkey"
+        with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch_op:
+            batch_op.drop_constraint(name, type_="foreignkey")
+            batch_op.create_foreign_key(
+                name, referred, [column], ["id"], ondelete=ondelete if with_ondelete else None
+            )
+
+    if op.get_bind().dialect.name == "sqlite":
+        for name, columns in DESC_INDEXES:
+            op.drop_index(name, table_name="bookings")
+            op.create_index(name, "bookings", columns)
+
+
+def upgrade() -> None:
+    # Rows the new constraints would reject (SQLite did not enforce foreign keys before)
+    op.execute("DELETE FROM reviews WHERE booking_id NOT IN (SELECT id FROM bookings)")
+    op.execute("DELETE FROM password_reset_tokens WHERE user_id NOT IN (SELECT id FROM users)")
+    op.execute(
+        "UPDATE bookings SET assigned_employee_id = NULL "
+        "WHERE assigned_employee_id IS NOT NULL AND assigned_employee_id NOT IN (SELECT id FROM users)"
+    )
+    _replace_foreign_keys(with_ondelete=True)
+
+
+def downgrade() -> None:
+    _replace_foreign_keys(with_ondelete=False)
@@ -0,0 +1,73 @@
+"""bookings archive
+
+Revision ID: e4b9f1d27a36
+Revises: d81a3c5e7f20
+Create Date: 2026-10-16 13:10:42.538190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b9f1d27a36'
+down_revision: Union[str, None] = 'd81a3c5e7f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    statuses = ("requested", "assigned", "in_progress", "completed", "cancelled")
+    if op.get_bind().dialect.name == "postgresql":
+        # Shares the bookingstatus type created with the bookings table
+        booking_status_enum = postgresql.ENUM(*statuses, name="bookingstatus", create_type=False)
+    else:
+        booking_status_enum = sa.Enum(*statuses, name="bookingstatus")
+
+    op.create_table(
+        "bookings_archive",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("client_id", sa.Integer(), nullable=False),
+        sa.Column("service_id", sa.Integer(), nullable=False),
+        sa.Column("status", booking_status_enum, nullable=False),
+        sa.Column("contact_name", sa.String(length=255), nullable=False),
+        sa.Column("contact_phone", sa.String(length=50), nullable=False),
+        sa.Column("description", sa.Text(), nullable=False),
+        sa.Column("location_lat", sa.Float(), nullable=True),
+        sa.Column("location_lng", sa.Float(), nullable=True),
+        sa.Column("address_text", sa.String(length=255), nullable=False),
+        sa.Column("assigned_employee_id", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("archived_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["assigned_employee_id"], ["users.id"], ondelete="SET NULL"),
+        sa.ForeignKeyConstraint(["client_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["service_id"], ["services.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_bookings_archive_client_id_created_at", "bookings_archive", ["client_id", "created_at"])
+    op.create_index("ix_bookings_archive_created_at", "bookings_archive", ["created_at"])
+    op.create_index("ix_bookings_archive_assigned_employee_id", "bookings_archive", ["assigned_employee_id"])
+
+    op.create_table(
+        "reviews_archive",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("booking_id", sa.Integer(), nullable=False),
+        sa.Column("rating", sa.Integer(), nullable=False),
+        sa.Column("comment", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["booking_id"], ["bookings_archive.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_reviews_archive_booking_id"), "reviews_archive", ["booking_id"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_reviews_archive_booking_id"), table_name="reviews_archive")
+    op.drop_table("reviews_archive")
+    op.drop_index("ix_bookings_archive_assigned_employee_id", table_name="bookings_archive")
+    op.drop_index("ix_bookings_archive_created_at", table_name="bookings_archive")
+    op.drop_index("ix_bookings_archive_client_id_created_at", table_name="bookings_archive")
+    op.drop_table("bookings_archive")
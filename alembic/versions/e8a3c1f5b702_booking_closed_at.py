@@ -0,0 +1,35 @@
+"""booking closed_at
+
+Revision ID: e8a3c1f5b702
+Revises: d4f7b1c8e253
+Create Date: 2026-10-17 16:42:09.813275
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8a3c1f5b702'
+down_revision: Union[str, None] = 'd4f7b1c8e253'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table_name in ("bookings", "bookings_archive"):
+        op.add_column(table_name, sa.Column("closed_at", sa.DateTime(), nullable=True))
+        # When existing bookings closed was never recorded; their creation time is the best bound
+        op.execute(
+            f"UPDATE {table_name} SET closed_at = created_at WHERE status IN ('completed', 'cancelled')"
+        )
+    op.create_index("ix_bookings_closed_at", "bookings", ["closed_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_bookings_closed_at", table_name="bookings")
+    # Plain DROP COLUMN (SQLite 3.35+), as for geo_key
+    op.drop_column("bookings_archive", "closed_at")
+    op.drop_column("bookings", "closed_at")
@@ -0,0 +1,26 @@
+"""reset token expiry index
+
+Revision ID: f07c2b8e5d41
+Revises: e4b9f1d27a36
+Create Date: 2026-10-16 13:52:09.871344
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f07c2b8e5d41'
+down_revision: Union[str, None] = 'e4b9f1d27a36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_password_reset_tokens_expires_at", "password_reset_tokens", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_password_reset_tokens_expires_at", table_name="password_reset_tokens")
@@ -0,0 +1,65 @@
+"""bookings autoincrement
+
+Revision ID: f3b6d9a2c418
+Revises: e8a3c1f5b702
+Create Date: 2026-10-17 17:20:51.406138
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b6d9a2c418'
+down_revision: Union[str, None] = 'e8a3c1f5b702'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _rebuild_bookings(autoincrement: bool) -> None:
+    """SQLite only adds AUTOINCREMENT when a table is created, so copy bookings into a new one."""
+    bind = op.get_bind()
+    # Batch mode copies indexes by reflection (losing DESC ordering) and SQLite will
+    # not rename a table that a view depends on: keep the original DDL of the indexes,
+    # the full-text triggers and view, and put it back afterwards.
+    schema = bind.execute(
+        sa.text(
+            "SELECT type, name, sql FROM sqlite_master WHERE sql IS NOT NULL AND "
+            "((type IN ('index', 'trigger') AND tbl_name = 'bookings') OR type = 'view')"
+        )
+    ).all()
+    for kind, name, _ in schema:
+        if kind != "index":
+            op.execute(f"DROP {kind.upper()} {name}")
+
+    with op.batch_alter_table("bookings", recreate="always", table_kwargs={"sqlite_autoincrement": autoincrement}):
+        pass
+
+    for kind, name, sql in sorted(schema, key=lambda entry: ("index", "view", "trigger").index(entry[0])):
+        if kind == "index":
+            op.execute(f"DROP INDEX IF EXISTS {name}")
+        op.execute(sql)
+
+
+def upgrade() -> None:
+    # PostgreSQL's sequence never hands out an id twice; SQLite reuses the highest
+    # one after it is deleted, which archived bookings still hold
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    _rebuild_bookings(autoincrement=True)
+    op.execute(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT 'bookings', 0 "
+        "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'bookings')"
+    )
+    op.execute(
+        "UPDATE sqlite_sequence SET seq = max(seq, (SELECT coalesce(max(id), 0) FROM bookings_archive)) "
+        "WHERE name = 'bookings'"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    _rebuild_bookings(autoincrement=False)
@@ -0,0 +1,35 @@
+"""
+Arabic text folding for search.
+
+Search treats the alef forms (أ إ آ ٱ) as a bare alef and alef maqsura (ى) as
+yaa, and ignores tashkeel and tatweel. `normalize_arabic` applies that to query
+text in Python; `sqlite_fold_sql` and `postgres_fold_args` spell the same
+folding out in SQL for the index definitions, so indexed text and queries agree.
+"""
+ALEF = "ا"
+ALEF_VARIANTS = "أإآٱ"
+YAA = "ي"
+YAA_VARIANTS = "ى"
+# Fathatan through sukun, superscript alef, tatweel
+TASHKEEL = "".join(chr(code) for code in range(0x064B, 0x0653)) + "\u0670\u0640"
+
+_FOLDS = [(char, ALEF) for char in ALEF_VARIANTS] + [(char, YAA) for char in YAA_VARIANTS]
+_TABLE = str.maketrans({**dict(_FOLDS), **{char: None for char in TASHKEEL}})
+
+
+def normalize_arabic(text: str) -> str:
+    return text.translate(_TABLE).casefold()
+
+
+def sqlite_fold_sql(expr: str) -> str:
+    """SQLite expression folding `expr` (nested replace(); SQLite has no translate())."""
+    for source, target in [*_FOLDS, *((char, "") for char in TASHKEEL)]:
+        expr = f"replace({expr}, '{source}', '{target}')"
+    return expr
+
+
+def postgres_fold_args() -> tuple[str, str]:
+    """The from/to strings for PostgreSQL translate(); characters without a partner are dropped."""
+    sources = "".join(source for source, _ in _FOLDS) + TASHKEEL
+    targets = "".join(target for _, target in _FOLDS)
+    return sources, targets
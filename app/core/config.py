@@ -1,4 +1,5 @@
 from functools import lru_cache
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -11,18 +12,109 @@ class Settings(BaseSettings):
 
     # Default to SQLite for local dev; override with DATABASE_URL in prod.
     database_url: str = "sqlite+aiosqlite:///./dev.db"
+    # Optional read replica for read-only pages; writes always go to database_url.
+    database_read_url: str | None = None
+    # After a write, the client's reads stay on the primary for this long.
+    read_replica_stickiness_seconds: int = 5
 
     secret_key: str = "change-me"
     access_token_expire_minutes: int = 60 * 12
     reset_token_expire_minutes: int = 30
     reset_request_cooldown_seconds: int = 60
+    # How often each worker pulls token revocations (logouts included) made by the
+    # others into memory, where they are refused without a query. Revocations
+    # apply at once regardless: requests also check the tables (app.services.access_tokens)
+    token_revocation_refresh_seconds: int = Field(5, gt=0)
+    # In-process sweep of expired reset tokens; 0 disables it
+    reset_token_sweep_interval_seconds: int = 900
+    reset_token_sweep_batch_size: int = 500
+    # bcrypt runs on a thread pool of this size (None = min(4, CPU count); 0 = inline on
+    # the event loop). Calls beyond the pool wait, up to max_queue (0 = no limit), then get 503.
+    password_hash_workers: int | None = None
+    password_hash_max_queue: int = 256
+    # Token-bucket rate limits per client address (app.services.rate_limit): each
+    # policy allows its max requests per window, with bursts up to that many
     rate_limit_window_seconds: int = 60
     rate_limit_max_requests: int = 120
+    rate_limit_auth_max_requests: int = 10  # POST /login, /register, /reset/request
+    rate_limit_static_max_requests: int = 1200
+    rate_limit_htmx_max_requests: int = 600
+    rate_limit_exempt_paths: list[str] = ["/health"]
+    rate_limit_max_clients: int = 50_000  # buckets kept, least recently seen evicted first
+    # Comma-separated proxy addresses/CIDRs whose X-Forwarded-For is believed
+    rate_limit_trusted_proxies: str = ""
+    # Where the counts live: "memory" (per worker), "shared" (mmap file, all workers
+    # on this host) or "database" (rate_limit_counters, all nodes; flushed in batches)
+    rate_limit_backend: str = "memory"
+    rate_limit_shared_path: str | None = None  # default /dev/shm/anha-rate-limit
+    rate_limit_flush_seconds: float = 1.0
+
+    # Keyset pagination for the /bookings feed
+    bookings_page_size: int = 20
+    bookings_page_size_max: int = 100
+
+    # Offset pagination for admin tables
+    admin_page_size: int = 50
+    admin_page_size_max: int = 200
+    # Most bookings one bulk action may touch
+    admin_bulk_max_bookings: int = 1000
+
+    # Bulk user import (admin upload and scripts/import_users.py)
+    user_import_batch_size: int = 500
+    user_import_hash_workers: int | None = None  # bcrypt processes; None = CPU count, 0 = in-process
+    user_import_max_errors: int = 1000  # error lines kept in the report
+
+    # Rows fetched per round trip by the streaming bookings export
+    export_batch_rows: int = 1000
+
+    # Bookings closed longer ago than this move to the archive tables (scripts/archive_bookings.py)
+    archive_after_days: int = 180
+    archive_batch_size: int = 1000
+
+    # Booking map lookups (app.services.geo)
+    geo_max_cover_cells: int = 32  # index ranges per viewport query, before merging
+    geo_viewport_max_results: int = 2000
+    geo_nearest_max_k: int = 50
+    geo_nearest_start_radius_m: float = 1000
+    geo_nearest_max_radius_m: float = 100_000
+
+    # Auto-dispatch of requested bookings to staff (app.services.dispatch)
+    dispatch_interval_seconds: int = 0  # in-process loop; 0 = only the admin "auto assign" button
+    dispatch_batch_size: int = 500  # bookings per transaction
+    dispatch_max_open_per_staff: int = 8  # assigned + in progress; 0 = no cap
+    dispatch_max_distance_m: float = 50_000  # from the person's last job to the booking
 
     auto_create_db: bool = True
 
+    # In-process service catalog cache; bounds staleness across worker processes
+    catalog_cache_ttl_seconds: int = 300
+    # In-process cache of signed-in users; the TTL bounds how long another worker
+    # keeps honouring a role change or deactivation (0 entries disables it)
+    user_cache_ttl_seconds: int = 30
+    user_cache_max_entries: int = 10_000
+
     db_connect_timeout_seconds: int | None = None
     db_connect_ssl: bool | None = None
+
+    # Connection pool (PostgreSQL and file-backed SQLite). Budget pool_size +
+    # max_overflow per uvicorn worker against the server's max_connections.
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout_seconds: float = 30
+    db_pool_recycle_seconds: int = 1800
+    db_pool_pre_ping: bool = True
+    # asyncpg prepared statement cache; set to 0 behind PgBouncer in transaction mode
+    db_statement_cache_size: int = 100
+
+    # SQLite profile, applied to every new connection. Set a value to None to
+    # leave that pragma at SQLite's default.
+    sqlite_journal_mode: str | None = "WAL"
+    sqlite_synchronous: str | None = "NORMAL"
+    sqlite_busy_timeout_ms: int | None = 5000
+    sqlite_mmap_size: int | None = 256 * 1024 * 1024
+    sqlite_cache_size: int | None = -64000  # negative = KiB, so ~64 MB per connection
+    sqlite_temp_store: str | None = "MEMORY"
+    sqlite_foreign_keys: bool = True  # user and booking deletes rely on ON DELETE cascades
     test_database_url: str | None = None
 
     # SMTP Configuration (Defaulting to Hostinger settings as a baseline)
@@ -1,11 +1,13 @@
 from datetime import datetime, timedelta
 import hashlib
 import secrets
+from typing import NamedTuple
 
-from jose import jwt
+from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 from app.core.config import get_settings
+from app.models.user import Role
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 settings = get_settings()
@@ -23,17 +25,49 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(password_bytes.decode('utf-8', errors='ignore'), hashed_password)
 
 
-def create_access_token(subject: str) -> str:
+class TokenClaims(NamedTuple):
+    user_id: int
+    role: Role
+    version: int
+    token_id: str
+    expires_at: datetime
+
+
+def create_access_token(user_id: int, role: Role, token_version: int) -> str:
     expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
-    payload = {"sub": subject, "exp": expire}
+    payload = {
+        "sub": str(user_id),
+        "role": role.value,
+        "ver": token_version,
+        "jti": secrets.token_urlsafe(16),
+        "exp": expire,
+    }
     return jwt.encode(payload, settings.secret_key, algorithm="HS256")
 
 
+def decode_access_token(token: str) -> TokenClaims | None:
+    """The claims of a valid, unexpired token; None for anything else (including pre-claims tokens)."""
+    try:
+        payload = jwt.decode(token, settings.secret_key, algorithms=["HS256"])
+        return TokenClaims(
+            int(payload["sub"]),
+            Role(payload["role"]),
+            int(payload["ver"]),
+            str(payload["jti"]),
+            datetime.utcfromtimestamp(payload["exp"]),
+        )
+    except (JWTError, KeyError, TypeError, ValueError):
+        return None
+
+
+def hash_reset_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
 def create_reset_token() -> tuple[str, str]:
     token = secrets.token_urlsafe(32)
-    token_hash = hashlib.sha256(token.encode("utf-8")).hexdigest()
-    return token, token_hash
+    return token, hash_reset_token(token)
 
 
 def verify_reset_token(token: str, token_hash: str) -> bool:
-    return hashlib.sha256(token.encode("utf-8")).hexdigest() == token_hash
+    return hash_reset_token(token) == token_hash
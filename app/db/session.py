@@ -1,7 +1,12 @@
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from time import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
+from starlette.requests import Request
 
 from app.core.config import get_settings
+from app.db.pool import InstrumentedQueuePool
 
 
 class Base(DeclarativeBase):
@@ -10,29 +15,124 @@ class Base(DeclarativeBase):
 
 settings = get_settings()
 
-# Build connect_args based on database type
-connect_args = {}
 is_postgresql = "postgresql" in settings.database_url
 
-if is_postgresql:
-    # PostgreSQL-specific connection arguments
-    if settings.db_connect_timeout_seconds is not None:
-        connect_args["timeout"] = settings.db_connect_timeout_seconds
-    if settings.db_connect_ssl is not None:
-        connect_args["ssl"] = settings.db_connect_ssl
-else:
-    # SQLite-specific connection arguments
-    connect_args["check_same_thread"] = False
-
-engine = create_async_engine(
-    settings.database_url,
-    future=True,
-    echo=False,
-    connect_args=connect_args,
-)
+# Cookie set after a write that pins the client's reads to the primary for a
+# short window, so it sees its own changes even when the replica lags.
+PRIMARY_PIN_COOKIE = "db_primary_until"
+
+
+def _is_sqlite_memory(url: str) -> bool:
+    return "postgresql" not in url and (":memory:" in url or url.endswith("://"))
+
+
+def sqlite_pragmas() -> list[str]:
+    """PRAGMA statements for the configured SQLite profile."""
+    pragmas = []
+    if settings.sqlite_journal_mode:
+        pragmas.append(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+    if settings.sqlite_synchronous:
+        pragmas.append(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    if settings.sqlite_busy_timeout_ms is not None:
+        pragmas.append(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    if settings.sqlite_mmap_size is not None:
+        pragmas.append(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+    if settings.sqlite_cache_size is not None:
+        pragmas.append(f"PRAGMA cache_size={int(settings.sqlite_cache_size)}")
+    if settings.sqlite_temp_store:
+        pragmas.append(f"PRAGMA temp_store={settings.sqlite_temp_store}")
+    pragmas.append(f"PRAGMA foreign_keys={'ON' if settings.sqlite_foreign_keys else 'OFF'}")
+    return pragmas
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in sqlite_pragmas():
+        cursor.execute(pragma)
+    cursor.close()
+
+
+def create_engine_for(url: str) -> AsyncEngine:
+    """Build an engine with the connect args and pool options for the URL's database type."""
+    connect_args = {}
+    engine_options = {}
+
+    if "postgresql" in url:
+        # PostgreSQL-specific connection arguments
+        if settings.db_connect_timeout_seconds is not None:
+            connect_args["timeout"] = settings.db_connect_timeout_seconds
+        if settings.db_connect_ssl is not None:
+            connect_args["ssl"] = settings.db_connect_ssl
+        connect_args["prepared_statement_cache_size"] = settings.db_statement_cache_size
+        if settings.db_statement_cache_size == 0:
+            connect_args["statement_cache_size"] = 0
+
+        engine_options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout_seconds,
+            pool_recycle=settings.db_pool_recycle_seconds,
+            pool_pre_ping=settings.db_pool_pre_ping,
+        )
+    else:
+        # SQLite-specific connection arguments
+        connect_args["check_same_thread"] = False
+        if not _is_sqlite_memory(url):
+            # Reuse connections so the per-connection pragmas are paid once
+            engine_options.update(
+                poolclass=InstrumentedQueuePool,
+                pool_size=settings.db_pool_size,
+                max_overflow=settings.db_max_overflow,
+                pool_timeout=settings.db_pool_timeout_seconds,
+            )
+
+    new_engine = create_async_engine(
+        url,
+        future=True,
+        echo=False,
+        connect_args=connect_args,
+        **engine_options,
+    )
+    if "postgresql" not in url:
+        event.listen(new_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    return new_engine
+
+
+engine = create_engine_for(settings.database_url)
 AsyncSessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
 
+# Optional read replica; without one, reads share the primary engine.
+if settings.database_read_url:
+    read_engine = create_engine_for(settings.database_read_url)
+    AsyncReadSessionLocal = async_sessionmaker(bind=read_engine, expire_on_commit=False, class_=AsyncSession)
+else:
+    read_engine = engine
+    AsyncReadSessionLocal = AsyncSessionLocal
+
+
+def has_read_replica() -> bool:
+    return AsyncReadSessionLocal is not AsyncSessionLocal
+
+
+def pinned_to_primary(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(PRIMARY_PIN_COOKIE, 0)) > time()
+    except ValueError:
+        return False
+
 
 async def get_db_session():
     async with AsyncSessionLocal() as session:
         yield session
+
+
+def read_sessionmaker(request: Request) -> async_sessionmaker:
+    """The replica's session factory, unless this client just wrote."""
+    return AsyncSessionLocal if pinned_to_primary(request) else AsyncReadSessionLocal
+
+
+async def get_read_db_session(request: Request):
+    """Session for read-only handlers (see `read_sessionmaker`)."""
+    async with read_sessionmaker(request)() as session:
+        yield session
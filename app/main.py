@@ -1,6 +1,6 @@
-from collections import deque
-from time import monotonic
-from typing import Deque
+import asyncio
+import math
+from time import time
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.gzip import GZipMiddleware
@@ -11,36 +11,48 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_settings
 from app.db.init_db import init_db
-from app.db.session import Base, engine
+from app.db.session import PRIMARY_PIN_COOKIE, AsyncSessionLocal, Base, engine, has_read_replica
 import app.models  # noqa: F401
+import app.services.booking_stats  # noqa: F401  (booking counter flush listeners)
+import app.services.archive  # noqa: F401  (booking closed_at flush listener)
+import app.services.geo  # noqa: F401  (booking geo_key flush listener)
 from app.routers import auth, bookings, pages, admin
+from app.services.access_tokens import run_token_revocation_refresher, token_revocations
 from app.services.content import get_translations, get_profile
+from app.services.dispatch import run_dispatcher
+from app.services.hashing import PasswordHasherBusy, password_hasher
+from app.services.rate_limit import (
+    DatabaseRateLimiter, client_ip, hit_async, rate_limiter, route_policy, run_rate_limit_flusher,
+)
+from app.services.reset_tokens import run_reset_token_sweeper
+from app.services.user_import import shutdown_hashing_pools
 
 settings = get_settings()
 
 app = FastAPI(title=settings.app_name, default_response_class=ORJSONResponse)
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 
-# In-memory, per-process rate limiter.
-_rate_limit_store: dict[str, Deque[float]] = {}
-
 @app.middleware("http")
 async def rate_limit(request: Request, call_next):
-    client_ip = request.client.host if request.client else "unknown"
-    now = monotonic()
-    window_seconds = settings.rate_limit_window_seconds
-    max_requests = settings.rate_limit_max_requests
-    timestamps = _rate_limit_store.setdefault(client_ip, deque())
-
-    while timestamps and now - timestamps[0] > window_seconds:
-        timestamps.popleft()
-
-    if len(timestamps) >= max_requests:
-        return PlainTextResponse("Too many requests", status_code=429)
-
-    timestamps.append(now)
+    policy = route_policy(request)
+    if policy is not None:
+        retry_after = await hit_async(rate_limiter, client_ip(request), policy)
+        if retry_after:
+            return PlainTextResponse(
+                "Too many requests", status_code=429, headers={"Retry-After": str(math.ceil(retry_after))}
+            )
     return await call_next(request)
 
+@app.middleware("http")
+async def pin_writers_to_primary(request: Request, call_next):
+    response = await call_next(request)
+    if has_read_replica() and request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        window = settings.read_replica_stickiness_seconds
+        response.set_cookie(
+            PRIMARY_PIN_COOKIE, str(time() + window), max_age=window, httponly=True, samesite="lax"
+        )
+    return response
+
 @app.middleware("http")
 async def add_security_headers(request: Request, call_next):
     response = await call_next(request)
@@ -102,6 +114,10 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
         status_code=exc.status_code
     )
 
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return PlainTextResponse("Server busy, try again shortly", status_code=503, headers={"Retry-After": "1"})
+
 @app.exception_handler(Exception)
 async def generic_exception_handler(request: Request, exc: Exception):
     lang = request.cookies.get("lang", "ar")
@@ -123,6 +139,10 @@ async def generic_exception_handler(request: Request, exc: Exception):
         status_code=500
     )
 
+@app.get("/health", include_in_schema=False)
+async def health():
+    return {"status": "ok"}
+
 app.include_router(pages.router)
 app.include_router(auth.router)
 app.include_router(bookings.router)
@@ -136,3 +156,35 @@ async def on_startup() -> None:
     if settings.auto_create_db:
         async with AsyncSession(engine) as session:
             await init_db(session)
+    async with AsyncSessionLocal() as session:
+        await token_revocations.refresh(session)
+    app.state.token_revocation_refresher = asyncio.create_task(
+        run_token_revocation_refresher(AsyncSessionLocal, settings.token_revocation_refresh_seconds)
+    )
+    if isinstance(rate_limiter, DatabaseRateLimiter):
+        app.state.rate_limit_flusher = asyncio.create_task(
+            run_rate_limit_flusher(rate_limiter, AsyncSessionLocal, settings.rate_limit_flush_seconds)
+        )
+    if settings.reset_token_sweep_interval_seconds > 0:
+        app.state.reset_token_sweeper = asyncio.create_task(
+            run_reset_token_sweeper(AsyncSessionLocal, settings.reset_token_sweep_interval_seconds)
+        )
+    if settings.dispatch_interval_seconds > 0:
+        app.state.dispatcher = asyncio.create_task(
+            run_dispatcher(AsyncSessionLocal, settings.dispatch_interval_seconds)
+        )
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    for name in ("rate_limit_flusher", "token_revocation_refresher", "reset_token_sweeper", "dispatcher"):
+        task = getattr(app.state, name, None)
+        if task is None:
+            continue
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    password_hasher.shutdown()
+    shutdown_hashing_pools()
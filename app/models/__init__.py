@@ -1,7 +1,14 @@
+from app.models.archive import BookingArchive, ReviewArchive
 from app.models.booking import Booking
+from app.models.booking_stat import BookingStat
 from app.models.password_reset import PasswordResetToken
+from app.models.rate_limit import RateLimitCounter
 from app.models.review import Review
 from app.models.service import Service
+from app.models.token_revocation import RevokedToken, TokenRevocation
 from app.models.user import User
 
-__all__ = ["Booking", "PasswordResetToken", "Review", "Service", "User"]
+__all__ = [
+    "Booking", "BookingArchive", "BookingStat", "PasswordResetToken", "RateLimitCounter", "Review",
+    "ReviewArchive", "RevokedToken", "Service", "TokenRevocation", "User",
+]
@@ -0,0 +1,57 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Enum, Float, ForeignKey, Index, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.session import Base
+from app.models.booking import BookingStatus
+
+# Booking statuses that are eligible for the archive.
+CLOSED_STATUSES = (BookingStatus.completed, BookingStatus.cancelled)
+
+
+class BookingArchive(Base):
+    """
+    Closed bookings moved out of `bookings` by app.services.archive, with the same
+    ids and columns. Read-only; still counted by booking_stats.
+    """
+
+    __tablename__ = "bookings_archive"
+    __table_args__ = (
+        Index("ix_bookings_archive_client_id_created_at", "client_id", "created_at"),
+        Index("ix_bookings_archive_created_at", "created_at"),
+        Index("ix_bookings_archive_assigned_employee_id", "assigned_employee_id"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    client_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    service_id: Mapped[int] = mapped_column(ForeignKey("services.id"))
+    status: Mapped[BookingStatus] = mapped_column(Enum(BookingStatus))
+
+    contact_name: Mapped[str] = mapped_column(String(255))
+    contact_phone: Mapped[str] = mapped_column(String(50))
+    description: Mapped[str] = mapped_column(Text, default="")
+    location_lat: Mapped[float | None] = mapped_column(Float, nullable=True)
+    location_lng: Mapped[float | None] = mapped_column(Float, nullable=True)
+    geo_key: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    address_text: Mapped[str] = mapped_column(String(255), default="")
+
+    assigned_employee_id: Mapped[int | None] = mapped_column(
+        ForeignKey("users.id", ondelete="SET NULL"), nullable=True
+    )
+
+    created_at: Mapped[datetime] = mapped_column(DateTime)
+    closed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class ReviewArchive(Base):
+    __tablename__ = "reviews_archive"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    booking_id: Mapped[int] = mapped_column(
+        ForeignKey("bookings_archive.id", ondelete="CASCADE"), unique=True, index=True
+    )
+    rating: Mapped[int] = mapped_column(Integer)
+    comment: Mapped[str] = mapped_column(Text, default="")
+    created_at: Mapped[datetime] = mapped_column(DateTime)
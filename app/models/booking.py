@@ -1,9 +1,10 @@
 import enum
 from datetime import datetime
 
-from sqlalchemy import DateTime, Enum, ForeignKey, String, Text, Float
+from sqlalchemy import DDL, BigInteger, DateTime, Enum, ForeignKey, Index, String, Text, Float, event, func, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from app.core.arabic import postgres_fold_args, sqlite_fold_sql
 from app.db.session import Base
 
 
@@ -15,11 +16,17 @@ class BookingStatus(str, enum.Enum):
     cancelled = "cancelled"
 
 
+# Statuses that still need work; the dashboards' "active" count.
+ACTIVE_STATUSES = (BookingStatus.requested, BookingStatus.assigned, BookingStatus.in_progress)
+
+
 class Booking(Base):
     __tablename__ = "bookings"
+    # Never reuse an id on SQLite: archived bookings keep theirs
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    client_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+    client_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
     service_id: Mapped[int] = mapped_column(ForeignKey("services.id"))
     status: Mapped[BookingStatus] = mapped_column(Enum(BookingStatus), default=BookingStatus.requested)
 
@@ -28,13 +35,98 @@ class Booking(Base):
     description: Mapped[str] = mapped_column(Text, default="")
     location_lat: Mapped[float | None] = mapped_column(Float, nullable=True)
     location_lng: Mapped[float | None] = mapped_column(Float, nullable=True)
+    # Z-order cell of (lat, lng), kept up to date by app.services.geo
+    geo_key: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     address_text: Mapped[str] = mapped_column(String(255), default="")
 
-    assigned_employee_id: Mapped[int | None] = mapped_column(ForeignKey("users.id"), nullable=True)
+    assigned_employee_id: Mapped[int | None] = mapped_column(
+        ForeignKey("users.id", ondelete="SET NULL"), nullable=True
+    )
 
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # When the booking was completed or cancelled, kept up to date by app.services.archive
+    closed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
     client = relationship("User", back_populates="bookings", foreign_keys=[client_id])
     assigned_employee = relationship("User", back_populates="assigned_bookings", foreign_keys=[assigned_employee_id])
     service = relationship("Service", back_populates="bookings")
-    review = relationship("Review", back_populates="booking", uselist=False)
+    review = relationship(
+        "Review", back_populates="booking", uselist=False, cascade="all, delete-orphan", passive_deletes=True
+    )
+
+
+# Hot-path indexes, shaped after the list and dashboard queries.
+Index("ix_bookings_client_id_created_at", Booking.client_id, Booking.created_at.desc())
+Index("ix_bookings_status_created_at", Booking.status, Booking.created_at.desc())
+Index("ix_bookings_created_at", Booking.created_at.desc())
+Index("ix_bookings_assigned_employee_id_status", Booking.assigned_employee_id, Booking.status)
+Index("ix_bookings_service_id", Booking.service_id)
+Index("ix_bookings_geo_key", Booking.geo_key)
+Index("ix_bookings_status_geo_key", Booking.status, Booking.geo_key)
+Index("ix_bookings_closed_at", Booking.closed_at)
+Index(
+    "ix_bookings_active_created_at",
+    Booking.created_at.desc(),
+    postgresql_where=Booking.status.in_([status.name for status in ACTIVE_STATUSES]),
+).ddl_if(dialect="postgresql")
+
+
+# ---- Full-text search (app.services.search) ------------------------------
+# Columns with their rank weight; Arabic text is folded before indexing.
+SEARCH_COLUMNS = {"contact_name": "A", "contact_phone": "A", "address_text": "B", "description": "C"}
+SEARCH_WEIGHTS = {"A": 4.0, "B": 2.0, "C": 1.0}  # bm25 column weights on SQLite
+
+
+def search_vector(model=Booking):
+    """PostgreSQL tsvector of a booking; ix_bookings_search indexes exactly this expression."""
+    # Constants as text() so they render inline, as in the index definition
+    config = text("'simple'")
+    sources, targets = (text(f"'{chars}'") for chars in postgres_fold_args())
+    vector = None
+    for name, weight in SEARCH_COLUMNS.items():
+        part = func.setweight(
+            func.to_tsvector(config, func.translate(getattr(model, name), sources, targets)),
+            text(f"'{weight}'"),
+        )
+        vector = part if vector is None else vector.op("||")(part)
+    return vector
+
+
+Index("ix_bookings_search", search_vector(Booking.__table__.c), postgresql_using="gin").ddl_if(dialect="postgresql")
+
+# SQLite: an external-content FTS5 table over a view of the folded columns, kept
+# in sync with `bookings` by triggers. The view is the content table, so a
+# 'rebuild' re-reads folded text too.
+_fts_columns = ", ".join(SEARCH_COLUMNS)
+
+
+def _folded(prefix: str) -> str:
+    return ", ".join(sqlite_fold_sql(f"{prefix}{name}") for name in SEARCH_COLUMNS)
+
+
+BOOKINGS_FTS_DDL = [
+    f"CREATE VIEW IF NOT EXISTS bookings_fts_content AS SELECT id, "
+    + ", ".join(f"{sqlite_fold_sql(name)} AS {name}" for name in SEARCH_COLUMNS)
+    + " FROM bookings",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS bookings_fts USING fts5({_fts_columns}, "
+    "content='bookings_fts_content', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS bookings_fts_ai AFTER INSERT ON bookings BEGIN "
+    f"INSERT INTO bookings_fts(rowid, {_fts_columns}) VALUES (new.id, {_folded('new.')}); "
+    "END",
+    f"CREATE TRIGGER IF NOT EXISTS bookings_fts_ad AFTER DELETE ON bookings BEGIN "
+    f"INSERT INTO bookings_fts(bookings_fts, rowid, {_fts_columns}) VALUES ('delete', old.id, {_folded('old.')}); "
+    "END",
+    f"CREATE TRIGGER IF NOT EXISTS bookings_fts_au AFTER UPDATE OF {_fts_columns} ON bookings BEGIN "
+    f"INSERT INTO bookings_fts(bookings_fts, rowid, {_fts_columns}) VALUES ('delete', old.id, {_folded('old.')}); "
+    f"INSERT INTO bookings_fts(rowid, {_fts_columns}) VALUES (new.id, {_folded('new.')}); "
+    "END",
+]
+
+for _statement in BOOKINGS_FTS_DDL:
+    event.listen(Booking.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(
+    Booking.__table__, "after_drop", DDL("DROP TABLE IF EXISTS bookings_fts").execute_if(dialect="sqlite")
+)
+event.listen(
+    Booking.__table__, "after_drop", DDL("DROP VIEW IF EXISTS bookings_fts_content").execute_if(dialect="sqlite")
+)
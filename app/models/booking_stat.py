@@ -0,0 +1,19 @@
+from sqlalchemy import Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.session import Base
+
+
+class BookingStat(Base):
+    """
+    Precomputed booking counters, one row per (scope, scope_id, status).
+    Scopes: "global" (scope_id 0), "service", "client" and "assignee".
+    Maintained by app.services.booking_stats in the same transaction as the booking change.
+    """
+
+    __tablename__ = "booking_stats"
+
+    scope: Mapped[str] = mapped_column(String(20), primary_key=True)
+    scope_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    status: Mapped[str] = mapped_column(String(20), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, default=0)
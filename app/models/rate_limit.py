@@ -0,0 +1,25 @@
+from sqlalchemy import DDL, BigInteger, Integer, String, event
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.session import Base
+
+
+class RateLimitCounter(Base):
+    """
+    Requests per client key and rate-limit window, shared by every app node
+    (app.services.rate_limit, "database" backend). Disposable: on PostgreSQL the
+    table is UNLOGGED, so counter writes skip the WAL and a crash just empties it.
+    """
+
+    __tablename__ = "rate_limit_counters"
+
+    key: Mapped[str] = mapped_column(String(100), primary_key=True)
+    window_start: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False, index=True)
+    count: Mapped[int] = mapped_column(Integer, default=0)
+
+
+event.listen(
+    RateLimitCounter.__table__,
+    "after_create",
+    DDL("ALTER TABLE rate_limit_counters SET UNLOGGED").execute_if(dialect="postgresql"),
+)
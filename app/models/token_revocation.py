@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.session import Base
+
+
+class TokenRevocation(Base):
+    """
+    Per-user access token version. Tokens carry the version they were issued at;
+    bumping it revokes every older token. No foreign key: the row has to outlive
+    a deleted user, whose tokens stay revoked until they expire.
+    """
+
+    __tablename__ = "token_revocations"
+
+    user_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    token_version: Mapped[int] = mapped_column(Integer, default=0)
+    revoked_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+
+
+class RevokedToken(Base):
+    """
+    A single access token signed out before it expired, by its jti. Kept until
+    `expires_at`; after that the token is refused anyway.
+    """
+
+    __tablename__ = "revoked_tokens"
+
+    token_id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, index=True)
+    revoked_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
@@ -1,7 +1,7 @@
 import enum
 from datetime import datetime
 
-from sqlalchemy import DateTime, String, Boolean, Enum
+from sqlalchemy import DDL, DateTime, String, Boolean, Enum, Index, event
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.session import Base
@@ -17,6 +17,22 @@ class Role(str, enum.Enum):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_created_at", "created_at"),
+        # Substring search in the admin users list (PostgreSQL, pg_trgm)
+        Index(
+            "ix_users_email_trgm", "email",
+            postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_users_full_name_trgm", "full_name",
+            postgresql_using="gin", postgresql_ops={"full_name": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_users_phone_trgm", "phone",
+            postgresql_using="gin", postgresql_ops={"phone": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     email: Mapped[str] = mapped_column(String(255), unique=True, index=True)
@@ -27,7 +43,39 @@ class User(Base):
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
-    bookings = relationship("Booking", back_populates="client", foreign_keys="Booking.client_id")
+    # The database cascades deletes and clears assignments (ON DELETE CASCADE / SET NULL)
+    bookings = relationship(
+        "Booking", back_populates="client", foreign_keys="Booking.client_id",
+        cascade="all, delete-orphan", passive_deletes=True,
+    )
     assigned_bookings = relationship(
-        "Booking", back_populates="assigned_employee", foreign_keys="Booking.assigned_employee_id"
+        "Booking", back_populates="assigned_employee", foreign_keys="Booking.assigned_employee_id",
+        passive_deletes=True,
     )
+
+
+# Substring search in the admin users list (SQLite): an external-content FTS5
+# table with the trigram tokenizer, kept in sync with `users` by triggers.
+USERS_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+    "email, full_name, phone, content='users', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts(rowid, email, full_name, phone) VALUES (new.id, new.email, new.full_name, new.phone); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, email, full_name, phone) "
+    "VALUES ('delete', old.id, old.email, old.full_name, old.phone); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF email, full_name, phone ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, email, full_name, phone) "
+    "VALUES ('delete', old.id, old.email, old.full_name, old.phone); "
+    "INSERT INTO users_fts(rowid, email, full_name, phone) VALUES (new.id, new.email, new.full_name, new.phone); "
+    "END",
+]
+
+event.listen(
+    User.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+for _statement in USERS_FTS_DDL:
+    event.listen(User.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(User.__table__, "after_drop", DDL("DROP TABLE IF EXISTS users_fts").execute_if(dialect="sqlite"))
@@ -1,20 +1,39 @@
-from fastapi import APIRouter, Depends, Form, Request, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
+import io
+from datetime import date, datetime, time, timedelta
+from urllib.parse import urlencode
+
+from fastapi import APIRouter, Depends, File, Form, Query, Request, HTTPException, UploadFile
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy import delete as sql_delete, update as sql_update, func, literal, select, union_all
+from sqlalchemy.orm import aliased, joinedload, selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db_session
+from app.core.config import get_settings
+from app.db.pool import pool_status
+from app.db.session import engine, get_db_session, get_read_db_session, read_sessionmaker
+from app.models.archive import BookingArchive, ReviewArchive
 from app.models.booking import Booking, BookingStatus
 from app.models.service import Service
 from app.models.user import User, Role
 from app.models.review import Review
-from app.services.deps import get_current_user
+from app.core.security import TokenClaims
+from app.services.deps import get_current_user, get_token_claims
 from app.services.content import get_translations, get_profile
-from app.core.security import hash_password
+from app.services.access_tokens import revoke_tokens
+from app.services.booking_stats import locked_for_update, track_bulk
+from app.services.archive import BOOKING_COLUMNS, closed_at_value
+from app.services.catalog import service_catalog
+from app.services.dispatch import dispatch_pending
+from app.services.hashing import password_hasher
+from app.services.export import EXPORT_FORMATS, csv_chunks, xlsx_chunks
+from app.services.search import bookings_search, users_search_clause
+from app.services.stats import admin_overview
+from app.services.user_cache import user_cache
+from app.services.user_import import detect_format, import_users
 
 router = APIRouter(prefix="/admin")
+settings = get_settings()
 templates = Jinja2Templates(directory="app/templates")
 
 
@@ -34,11 +53,14 @@ def _base_context(request: Request, user: User | None = None) -> dict:
     }
 
 
-async def require_admin(user: User = Depends(get_current_user)) -> User:
-    """Dependency to ensure user is admin"""
-    if user.role != Role.admin:
+async def require_admin(
+    claims: TokenClaims = Depends(get_token_claims),
+    session: AsyncSession = Depends(get_db_session),
+) -> User:
+    """Dependency to ensure user is admin (checked from the token before any query)"""
+    if claims.role != Role.admin:
         raise HTTPException(status_code=403, detail="صلاحيات غير كافية")
-    return user
+    return await get_current_user(claims, session)
 
 
 # ==================== ADMIN DASHBOARD ====================
@@ -48,53 +70,86 @@ async def admin_dashboard(
     user: User = Depends(require_admin),
     session: AsyncSession = Depends(get_db_session),
 ):
-    # Get overview stats
-    users_count = await session.execute(select(func.count(User.id)))
-    bookings_count = await session.execute(select(func.count(Booking.id)))
-    services_count = await session.execute(select(func.count(Service.id)))
-    reviews_count = await session.execute(select(func.count(Review.id)))
-    
+    stats = await admin_overview(session)
+
     # Get recent bookings
     recent_bookings = await session.execute(
         select(Booking)
-        .options(selectinload(Booking.service), selectinload(Booking.client))
+        .options(joinedload(Booking.service), joinedload(Booking.client))
         .order_by(Booking.created_at.desc())
         .limit(5)
     )
-    
-    # Get users by role
-    role_counts = {}
-    for role in Role:
-        count = await session.execute(select(func.count(User.id)).where(User.role == role))
-        role_counts[role.value] = count.scalar()
-    
-    stats = {
-        "users": users_count.scalar(),
-        "bookings": bookings_count.scalar(),
-        "services": services_count.scalar(),
-        "reviews": reviews_count.scalar(),
-        "role_counts": role_counts,
-    }
-    
+
     context = _base_context(request, user)
     context["stats"] = stats
     context["recent_bookings"] = recent_bookings.scalars().all()
     return templates.TemplateResponse("admin/dashboard.html", context)
 
 
+# ==================== METRICS ====================
+@router.get("/metrics/db-pool")
+async def db_pool_metrics(admin: User = Depends(require_admin)):
+    """Live connection pool statistics, for sizing the pool against worker counts."""
+    return pool_status(engine.pool)
+
+
+@router.get("/metrics/password-hashing")
+async def password_hashing_metrics(admin: User = Depends(require_admin)):
+    """bcrypt pool occupancy, queue depth and wait times."""
+    return password_hasher.metrics()
+
+
 # ==================== USERS CRUD ====================
 @router.get("/users", response_class=HTMLResponse)
 async def list_users(
     request: Request,
+    q: str = "",
+    role: str | None = None,
+    active: str | None = None,
+    page: int = Query(default=1, ge=1),
+    limit: int | None = Query(default=None, ge=1),
     user: User = Depends(require_admin),
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncSession = Depends(get_read_db_session),
 ):
-    result = await session.execute(select(User).order_by(User.created_at.desc()))
-    users = result.scalars().all()
-    
+    page_size = min(limit or settings.admin_page_size, settings.admin_page_size_max)
+    filters = {
+        "q": q.strip(),
+        "role": role if role in Role.__members__ else None,
+        "active": active if active in ("1", "0") else None,
+    }
+
+    conditions = []
+    if filters["q"]:
+        conditions.append(users_search_clause(filters["q"], session.get_bind().dialect.name))
+    if filters["role"]:
+        conditions.append(User.role == Role(filters["role"]))
+    if filters["active"] is not None:
+        conditions.append(User.is_active.is_(filters["active"] == "1"))
+
+    result = await session.execute(
+        select(User, func.count().over().label("total"))
+        .where(*conditions)
+        .order_by(User.created_at.desc(), User.id.desc())
+        .limit(page_size)
+        .offset((page - 1) * page_size)
+    )
+    rows = result.all()
+    users = [row[0] for row in rows]
+    if rows:
+        total = rows[0].total
+    elif page > 1:
+        total = (await session.execute(select(func.count(User.id)).where(*conditions))).scalar()
+    else:
+        total = 0
+
     context = _base_context(request, user)
     context["users"] = users
     context["roles"] = [r for r in Role]
+    context["filters"] = filters
+    context["page"] = page
+    context["page_size"] = page_size
+    context["total"] = total
+    context["pages"] = max(1, -(-total // page_size))
     return templates.TemplateResponse("admin/partials/users_list.html", context)
 
 
@@ -113,11 +168,15 @@ async def update_user(
     if not target_user:
         return HTMLResponse("المستخدم غير موجود", status_code=404)
     
+    # Tokens carry the role; a new role or a deactivation needs fresh ones
+    if target_user.role != Role(role) or (target_user.is_active and not is_active):
+        await revoke_tokens(session, user_id)
     target_user.full_name = full_name
     target_user.email = email
     target_user.role = Role(role)
     target_user.is_active = is_active
     await session.commit()
+    user_cache.invalidate(user_id)
     
     return _redirect("/admin")
 
@@ -128,46 +187,33 @@ async def delete_user(
     admin: User = Depends(require_admin),
     session: AsyncSession = Depends(get_db_session),
 ):
-    from sqlalchemy import delete as sql_delete
-    from app.models.review import Review
-    
-    result = await session.execute(select(User).where(User.id == user_id))
-    target_user = result.scalar_one_or_none()
-    if not target_user:
-        return HTMLResponse("المستخدم غير موجود", status_code=404)
-    
     # Prevent self-deletion
-    if target_user.id == admin.id:
+    if user_id == admin.id:
         return HTMLResponse("لا يمكنك حذف حسابك", status_code=400)
-    
-    # Get all bookings by this user to delete their reviews first
-    user_bookings = await session.execute(
-        select(Booking).where(Booking.client_id == user_id)
-    )
-    booking_ids = [b.id for b in user_bookings.scalars().all()]
-    
-    if booking_ids:
-        # Delete reviews for these bookings
-        await session.execute(
-            sql_delete(Review).where(Review.booking_id.in_(booking_ids))
-        )
-        # Delete the bookings
-        await session.execute(
-            sql_delete(Booking).where(Booking.client_id == user_id)
-        )
-    
-    # Also unassign this user from any bookings they were assigned to
-    await session.execute(
-        select(Booking).where(Booking.assigned_employee_id == user_id)
+
+    # The database removes the user's bookings, their reviews and reset tokens, and
+    # clears assignments (ON DELETE CASCADE / SET NULL); only the counters need help.
+    await track_bulk(session, Booking.client_id == user_id, delete_rows=True)
+    await track_bulk(
+        session,
+        (Booking.assigned_employee_id == user_id) & (Booking.client_id != user_id),
+        {"assigned_employee_id": None},
     )
-    # Set assigned_employee_id to NULL for bookings assigned to this user
-    from sqlalchemy import update as sql_update
-    await session.execute(
-        sql_update(Booking).where(Booking.assigned_employee_id == user_id).values(assigned_employee_id=None)
+    await track_bulk(session, BookingArchive.client_id == user_id, delete_rows=True, model=BookingArchive)
+    await track_bulk(
+        session,
+        (BookingArchive.assigned_employee_id == user_id) & (BookingArchive.client_id != user_id),
+        {"assigned_employee_id": None},
+        model=BookingArchive,
     )
-    
-    await session.delete(target_user)
+    result = await session.execute(sql_delete(User).where(User.id == user_id))
+    if result.rowcount == 0:
+        await session.rollback()
+        return HTMLResponse("المستخدم غير موجود", status_code=404)
+    await revoke_tokens(session, user_id)
+
     await session.commit()
+    user_cache.invalidate(user_id)
     return _redirect("/admin")
 
 
@@ -189,7 +235,7 @@ async def create_user(
         email=email,
         full_name=full_name,
         phone=phone,
-        hashed_password=hash_password(password),
+        hashed_password=await password_hasher.hash(password),
         role=Role(role),
     )
     session.add(user)
@@ -197,39 +243,386 @@ async def create_user(
     return _redirect("/admin")
 
 
+@router.post("/users/import", response_class=HTMLResponse)
+async def import_users_upload(
+    request: Request,
+    file: UploadFile = File(...),
+    default_role: str = Form("client"),
+    admin: User = Depends(require_admin),
+    session: AsyncSession = Depends(get_db_session),
+):
+    fmt = detect_format(file.filename or "")
+    if fmt is None:
+        return HTMLResponse("صيغة الملف غير مدعومة (CSV أو JSONL)", status_code=400)
+    if default_role not in Role.__members__:
+        return HTMLResponse("دور غير صالح", status_code=400)
+
+    # The upload is spooled to disk by Starlette; read it back line by line
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        report = await import_users(session, lines, fmt, default_role=Role(default_role))
+    finally:
+        lines.detach()
+
+    context = _base_context(request, admin)
+    context["report"] = report
+    return templates.TemplateResponse("admin/partials/import_report.html", context)
+
+
 # ==================== BOOKINGS CRUD ====================
+ClientUser = aliased(User)
+EmployeeUser = aliased(User)
+
+BOOKING_SORT_KEYS = ("id", "created_at", "status", "service", "client", "employee")
+
+
+def _sort_columns(entity) -> dict:
+    return {
+        "id": entity.id,
+        "created_at": entity.created_at,
+        "status": entity.status,
+        "service": Service.name_ar,
+        "client": ClientUser.full_name,
+        "employee": EmployeeUser.full_name,
+    }
+
+
+def _parse_int(value: str | None) -> int | None:
+    if value is None or not value.strip():
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def _parse_date(value: str | None) -> date | None:
+    if value is None or not value.strip():
+        return None
+    try:
+        return date.fromisoformat(value.strip())
+    except ValueError:
+        return None
+
+
+def _booking_filters(
+    status: str | None,
+    service_id: str | None,
+    employee_id: str | None,
+    date_from: str | None,
+    date_to: str | None,
+    include_archived: str | None = None,
+    q: str | None = None,
+) -> dict:
+    """Normalize raw query params into the filters understood by `_apply_booking_filters`."""
+    return {
+        "q": (q or "").strip() or None,
+        "status": status if status in BookingStatus.__members__ else None,
+        "service_id": _parse_int(service_id),
+        "employee_id": "none" if employee_id == "none" else _parse_int(employee_id),
+        "date_from": _parse_date(date_from),
+        "date_to": _parse_date(date_to),
+        "include_archived": (include_archived or "").lower() in {"1", "true", "on"},
+    }
+
+
+def _apply_booking_filters(query, filters: dict, dialect_name: str, model=Booking):
+    """Filter on `model`: Booking, BookingArchive or an alias of either. `dialect_name`
+    is that of the database the query runs on (which may be a read replica)."""
+    # Only live bookings are in the search index, so a search leaves archived rows out
+    matches = bookings_search(filters["q"], dialect_name) if filters["q"] else None
+    if matches is not None:
+        query = query.where(model.id.in_(select(matches.c.id)))
+    if filters["status"]:
+        query = query.where(model.status == BookingStatus(filters["status"]))
+    if filters["service_id"] is not None:
+        query = query.where(model.service_id == filters["service_id"])
+    if filters["employee_id"] == "none":
+        query = query.where(model.assigned_employee_id.is_(None))
+    elif filters["employee_id"] is not None:
+        query = query.where(model.assigned_employee_id == filters["employee_id"])
+    if filters["date_from"]:
+        query = query.where(model.created_at >= datetime.combine(filters["date_from"], time.min))
+    if filters["date_to"]:
+        query = query.where(model.created_at < datetime.combine(filters["date_to"] + timedelta(days=1), time.min))
+    return query
+
+
+def _bookings_with_archive(filters: dict, dialect_name: str):
+    """Filtered bookings from both tiers as one subquery, flagged by an `archived` column."""
+    hot = select(*(getattr(Booking, name) for name in BOOKING_COLUMNS), literal(False).label("archived"))
+    cold = select(*(getattr(BookingArchive, name) for name in BOOKING_COLUMNS), literal(True).label("archived"))
+    return union_all(
+        _apply_booking_filters(hot, filters, dialect_name),
+        _apply_booking_filters(cold, filters, dialect_name, BookingArchive),
+    ).subquery("bookings_all")
+
+
 @router.get("/bookings", response_class=HTMLResponse)
 async def list_bookings(
     request: Request,
     status: str | None = None,
+    service_id: str | None = None,
+    employee_id: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    q: str | None = None,
+    sort: str | None = None,
+    direction: str = "desc",
+    page: int = Query(default=1, ge=1),
+    limit: int | None = Query(default=None, ge=1),
+    include_archived: str | None = None,
     admin: User = Depends(require_admin),
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncSession = Depends(get_read_db_session),
 ):
-    query = select(Booking).options(
-        selectinload(Booking.service),
-        selectinload(Booking.client),
-        selectinload(Booking.assigned_employee)
+    filters = _booking_filters(status, service_id, employee_id, date_from, date_to, include_archived, q)
+    return await _render_bookings(request, admin, session, filters, sort, direction, page, limit)
+
+
+async def _render_bookings(
+    request: Request,
+    admin: User,
+    session: AsyncSession,
+    filters: dict,
+    sort: str | None,
+    direction: str,
+    page: int,
+    limit: int | None,
+) -> HTMLResponse:
+    # Without an explicit sort, search results come by relevance and the rest newest first
+    if sort not in BOOKING_SORT_KEYS:
+        sort = None
+    dialect_name = session.get_bind().dialect.name
+    matches = bookings_search(filters["q"], dialect_name) if filters["q"] else None
+    if direction not in ("asc", "desc"):
+        direction = "desc"
+    page_size = min(limit or settings.admin_page_size, settings.admin_page_size_max)
+
+    if filters["include_archived"]:
+        tiers = _bookings_with_archive(filters, dialect_name)
+        entity, archived = aliased(Booking, tiers), tiers.c.archived
+    else:
+        entity, archived = Booking, literal(False)
+
+    # The window count returns the filtered total alongside each row of the page
+    query = select(entity, archived.label("archived"), func.count().over().label("total")).options(
+        selectinload(entity.service),
+        selectinload(entity.client),
+        selectinload(entity.assigned_employee)
     )
-    
-    if status and status != "all":
-        query = query.where(Booking.status == status)
-    
-    query = query.order_by(Booking.created_at.desc())
-    result = await session.execute(query)
-    bookings = result.scalars().all()
-    
-    # Get employees for assignment dropdown
+    if not filters["include_archived"]:
+        query = _apply_booking_filters(query, filters, dialect_name)
+
+    if sort == "service":
+        query = query.outerjoin(Service, entity.service_id == Service.id)
+    elif sort == "client":
+        query = query.outerjoin(ClientUser, entity.client_id == ClientUser.id)
+    elif sort == "employee":
+        query = query.outerjoin(EmployeeUser, entity.assigned_employee_id == EmployeeUser.id)
+
+    if sort is None and matches is not None:
+        query = query.join(matches, matches.c.id == entity.id).order_by(matches.c.rank.desc(), entity.id.desc())
+    else:
+        sort_column = _sort_columns(entity)[sort or "created_at"]
+        if direction == "asc":
+            query = query.order_by(sort_column.asc(), entity.id.asc())
+        else:
+            query = query.order_by(sort_column.desc(), entity.id.desc())
+    query = query.limit(page_size).offset((page - 1) * page_size)
+
+    rows = (await session.execute(query)).all()
+    bookings = [row[0] for row in rows]
+    if rows:
+        total = rows[0].total
+    elif page > 1:
+        # Past the last page the window has no rows to ride on
+        if filters["include_archived"]:
+            count_query = select(func.count()).select_from(_bookings_with_archive(filters, dialect_name))
+        else:
+            count_query = _apply_booking_filters(select(func.count(Booking.id)), filters, dialect_name)
+        total = (await session.execute(count_query)).scalar()
+    else:
+        total = 0
+
+    # Get employees for assignment dropdown and filter
     employees = await session.execute(
-        select(User).where(User.role.in_([Role.employee, Role.technical, Role.driver]))
+        select(User.id, User.full_name, User.role)
+        .where(User.role.in_([Role.employee, Role.technical, Role.driver]))
+        .order_by(User.full_name)
     )
-    
+    services = await session.execute(select(Service.id, Service.name_ar).order_by(Service.id))
+
     context = _base_context(request, admin)
     context["bookings"] = bookings
-    context["employees"] = employees.scalars().all()
+    context["archived_ids"] = {row[0].id for row in rows if row.archived}
+    context["employees"] = employees.all()
+    context["services"] = services.all()
     context["statuses"] = [s for s in BookingStatus]
+    context["filters"] = filters
+    context["sort"] = sort or ("relevance" if matches is not None else "created_at")
+    context["sort_param"] = sort or ""
+    context["direction"] = direction
+    context["page"] = page
+    context["page_size"] = page_size
+    context["total"] = total
+    context["pages"] = max(1, -(-total // page_size))
+    context["export_query"] = urlencode({
+        key: "1" if value is True else value
+        for key, value in filters.items()
+        if value is not None and value is not False
+    })
     return templates.TemplateResponse("admin/partials/bookings_list.html", context)
 
 
+EXPORT_HEADER = (
+    "id", "created_at", "status", "service", "client", "client_email", "contact_name", "contact_phone",
+    "address", "location_lat", "location_lng", "employee", "rating", "review",
+)
+
+
+def _export_select(model, review_model):
+    return (
+        select(
+            model.id, model.created_at, model.status, Service.name_ar.label("service"),
+            ClientUser.full_name.label("client"), ClientUser.email.label("client_email"), model.contact_name,
+            model.contact_phone, model.address_text, model.location_lat, model.location_lng,
+            EmployeeUser.full_name.label("employee"), review_model.rating, review_model.comment,
+        )
+        .outerjoin(Service, model.service_id == Service.id)
+        .outerjoin(ClientUser, model.client_id == ClientUser.id)
+        .outerjoin(EmployeeUser, model.assigned_employee_id == EmployeeUser.id)
+        .outerjoin(review_model, review_model.booking_id == model.id)
+    )
+
+
+@router.get("/bookings/export")
+async def export_bookings(
+    request: Request,
+    format: str = "csv",
+    status: str | None = None,
+    service_id: str | None = None,
+    employee_id: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    q: str | None = None,
+    include_archived: str | None = None,
+    admin: User = Depends(require_admin),
+):
+    if format not in EXPORT_FORMATS:
+        return HTMLResponse("صيغة التصدير غير مدعومة", status_code=400)
+    filters = _booking_filters(status, service_id, employee_id, date_from, date_to, include_archived, q)
+    sessionmaker = read_sessionmaker(request)
+    dialect_name = sessionmaker.kw["bind"].dialect.name
+
+    query = _apply_booking_filters(_export_select(Booking, Review), filters, dialect_name)
+    if filters["include_archived"]:
+        archived = _apply_booking_filters(
+            _export_select(BookingArchive, ReviewArchive), filters, dialect_name, BookingArchive
+        )
+        query = select(union_all(query, archived).subquery("bookings_all"))
+    columns = query.selected_columns
+    query = query.order_by(columns.created_at.desc(), columns.id.desc()).execution_options(
+        yield_per=settings.export_batch_rows
+    )
+
+    async def batches():
+        # Opened here: the response body outlives the request's dependencies
+        async with sessionmaker() as session:
+            result = await session.stream(query)
+            async for rows in result.partitions():
+                yield rows
+
+    chunks = csv_chunks if format == "csv" else xlsx_chunks
+    filename = f"bookings-{datetime.utcnow():%Y%m%d-%H%M}.{format}"
+    return StreamingResponse(
+        chunks(EXPORT_HEADER, batches()),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post("/bookings/bulk", response_class=HTMLResponse)
+async def bulk_update_bookings(
+    request: Request,
+    action: str = Form(...),
+    booking_ids: list[int] = Form(default=[]),
+    new_status: str | None = Form(None),
+    new_employee_id: str | None = Form(None),
+    status: str | None = Form(None),
+    service_id: str | None = Form(None),
+    employee_id: str | None = Form(None),
+    date_from: str | None = Form(None),
+    date_to: str | None = Form(None),
+    q: str | None = Form(None),
+    sort: str | None = Form(None),
+    direction: str = Form("desc"),
+    page: int = Form(1),
+    limit: int | None = Form(None),
+    include_archived: str | None = Form(None),
+    admin: User = Depends(require_admin),
+    session: AsyncSession = Depends(get_db_session),
+):
+    """Apply one status change, assignment or delete to the selected bookings and re-render the list."""
+    booking_ids = list(dict.fromkeys(booking_ids))
+    if not booking_ids:
+        return HTMLResponse("لم يتم تحديد أي طلب", status_code=400)
+    if len(booking_ids) > settings.admin_bulk_max_bookings:
+        return HTMLResponse("عدد الطلبات المحددة كبير جداً", status_code=400)
+
+    selected = Booking.id.in_(booking_ids)
+    if action == "delete":
+        await track_bulk(session, selected, delete_rows=True)
+        await session.execute(sql_delete(Booking).where(selected))
+    else:
+        if action == "status":
+            if new_status not in BookingStatus.__members__:
+                return HTMLResponse("حالة غير صالحة", status_code=400)
+            values = {"status": BookingStatus(new_status)}
+        elif action == "assign":
+            assignee_id = _parse_int(new_employee_id)
+            if assignee_id is not None:
+                assignee_role = (await session.execute(select(User.role).where(User.id == assignee_id))).scalar()
+                if assignee_role not in (Role.employee, Role.technical, Role.driver):
+                    return HTMLResponse("الموظف غير موجود", status_code=400)
+            values = {"assigned_employee_id": assignee_id}
+        else:
+            return HTMLResponse("إجراء غير معروف", status_code=400)
+        await track_bulk(session, selected, values)
+        if "status" in values:
+            values["closed_at"] = closed_at_value(values["status"])
+        await session.execute(
+            sql_update(Booking).where(selected).values(**values).execution_options(synchronize_session=False)
+        )
+    await session.commit()
+
+    filters = _booking_filters(status, service_id, employee_id, date_from, date_to, include_archived, q)
+    return await _render_bookings(request, admin, session, filters, sort, direction, max(page, 1), limit)
+
+
+@router.post("/bookings/dispatch", response_class=HTMLResponse)
+async def dispatch_bookings(
+    request: Request,
+    status: str | None = Form(None),
+    service_id: str | None = Form(None),
+    employee_id: str | None = Form(None),
+    date_from: str | None = Form(None),
+    date_to: str | None = Form(None),
+    q: str | None = Form(None),
+    sort: str | None = Form(None),
+    direction: str = Form("desc"),
+    page: int = Form(1),
+    limit: int | None = Form(None),
+    include_archived: str | None = Form(None),
+    admin: User = Depends(require_admin),
+    session: AsyncSession = Depends(get_db_session),
+):
+    """Run the auto-dispatcher over every unassigned requested booking and re-render the list."""
+    await dispatch_pending(session)
+
+    filters = _booking_filters(status, service_id, employee_id, date_from, date_to, include_archived, q)
+    return await _render_bookings(request, admin, session, filters, sort, direction, max(page, 1), limit)
+
+
 @router.post("/bookings/{booking_id}/update", response_class=HTMLResponse)
 async def update_booking(
     booking_id: int,
@@ -238,7 +631,9 @@ async def update_booking(
     admin: User = Depends(require_admin),
     session: AsyncSession = Depends(get_db_session),
 ):
-    result = await session.execute(select(Booking).where(Booking.id == booking_id))
+    result = await session.execute(
+        await locked_for_update(session, select(Booking).where(Booking.id == booking_id))
+    )
     booking = result.scalar_one_or_none()
     if not booking:
         return HTMLResponse("الطلب غير موجود", status_code=404)
@@ -262,12 +657,13 @@ async def delete_booking(
     admin: User = Depends(require_admin),
     session: AsyncSession = Depends(get_db_session),
 ):
-    result = await session.execute(select(Booking).where(Booking.id == booking_id))
-    booking = result.scalar_one_or_none()
-    if not booking:
+    # The review goes with it (ON DELETE CASCADE)
+    await track_bulk(session, Booking.id == booking_id, delete_rows=True)
+    result = await session.execute(sql_delete(Booking).where(Booking.id == booking_id))
+    if result.rowcount == 0:
+        await session.rollback()
         return HTMLResponse("الطلب غير موجود", status_code=404)
-    
-    await session.delete(booking)
+
     await session.commit()
     return _redirect("/admin")
 
@@ -277,7 +673,7 @@ async def delete_booking(
 async def list_services(
     request: Request,
     admin: User = Depends(require_admin),
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncSession = Depends(get_read_db_session),
 ):
     result = await session.execute(select(Service).order_by(Service.id))
     services = result.scalars().all()
@@ -298,6 +694,7 @@ async def create_service(
     service = Service(name_ar=name_ar, name_en=name_en, description=description)
     session.add(service)
     await session.commit()
+    service_catalog.invalidate()
     return _redirect("/admin")
 
 
@@ -319,6 +716,7 @@ async def update_service(
     service.name_en = name_en
     service.description = description
     await session.commit()
+    service_catalog.invalidate()
     return _redirect("/admin")
 
 
@@ -335,4 +733,5 @@ async def delete_service(
     
     await session.delete(service)
     await session.commit()
+    service_catalog.invalidate()
     return _redirect("/admin")
@@ -1,18 +1,21 @@
 from datetime import datetime, timedelta
-import hashlib
 
-from fastapi import APIRouter, Depends, Form, HTTPException, Request
+from fastapi import APIRouter, Cookie, Depends, Form, HTTPException, Request
 from fastapi.responses import RedirectResponse
 from sqlalchemy import select, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_settings
-from app.core.security import create_access_token, create_reset_token, hash_password, verify_password
+from app.core.security import create_reset_token, decode_access_token
 from app.db.session import get_db_session
 from app.models.password_reset import PasswordResetToken
 from app.models.user import User, Role
+from app.services.access_tokens import issue_access_token, revoke_token, revoke_tokens, token_revocations
 from app.services.content import get_translations
 from app.services.email import send_password_reset_email
+from app.services.hashing import password_hasher
+from app.services.reset_tokens import ResetTokenState, check_reset_token
+from app.services.user_cache import user_cache
 
 router = APIRouter()
 settings = get_settings()
@@ -46,7 +49,7 @@ async def register(
         email=email,
         full_name=full_name,
         phone=phone,
-        hashed_password=hash_password(password),
+        hashed_password=await password_hasher.hash(password),
         role=Role.client,  # Always client for self-registration
         is_active=True,
     )
@@ -56,7 +59,7 @@ async def register(
     is_secure = settings.environment == "production"
     response.set_cookie(
         "access_token", 
-        create_access_token(email), 
+        await issue_access_token(session, user), 
         httponly=True, 
         samesite="lax",
         secure=is_secure
@@ -72,7 +75,9 @@ async def login(
 ):
     result = await session.execute(select(User).where(User.email == email))
     user = result.scalar_one_or_none()
-    if not user or not verify_password(password, user.hashed_password):
+    # Give the connection back to the pool before waiting on bcrypt; the loaded user stays readable
+    await session.close()
+    if not user or not await password_hasher.verify(password, user.hashed_password):
         raise HTTPException(status_code=401, detail="بيانات الدخول غير صحيحة")
     
     # Role-based redirect
@@ -85,7 +90,7 @@ async def login(
     is_secure = settings.environment == "production"
     response.set_cookie(
         "access_token", 
-        create_access_token(user.email), 
+        await issue_access_token(session, user), 
         httponly=True, 
         samesite="lax",
         secure=is_secure
@@ -94,7 +99,16 @@ async def login(
 
 
 @router.post("/logout")
-async def logout():
+async def logout(
+    access_token: str | None = Cookie(default=None),
+    session: AsyncSession = Depends(get_db_session),
+):
+    # Revoke this token, not just the cookie, so a copy of it stops working too;
+    # the user's other sessions stay signed in
+    claims = decode_access_token(access_token) if access_token else None
+    if claims is not None and not token_revocations.is_revoked(claims):
+        await revoke_token(session, claims)
+        await session.commit()
     response = _redirect("/")
     response.delete_cookie("access_token")
     return response
@@ -148,19 +162,19 @@ async def reset_confirm(
     if new_password != confirm_password:
         raise HTTPException(status_code=400, detail="كلمتا المرور غير متطابقتين")
     
-    token_hash = hashlib.sha256(token.encode("utf-8")).hexdigest()
-    result = await session.execute(select(PasswordResetToken).where(PasswordResetToken.token_hash == token_hash))
-    matched = result.scalar_one_or_none()
-    if not matched or matched.expires_at < datetime.utcnow():
+    state, user_id = await check_reset_token(session, token)
+    if state is not ResetTokenState.valid:
         raise HTTPException(status_code=400, detail="الرابط غير صالح أو منتهي")
 
-    user_result = await session.execute(select(User).where(User.id == matched.user_id))
+    user_result = await session.execute(select(User).where(User.id == user_id))
     user = user_result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="المستخدم غير موجود")
 
-    user.hashed_password = hash_password(new_password)
+    user.hashed_password = await password_hasher.hash(new_password)
     await session.execute(delete(PasswordResetToken).where(PasswordResetToken.user_id == user.id))
+    await revoke_tokens(session, user.id)
     await session.commit()
+    user_cache.invalidate(user.id)
     
     return _redirect("/reset/done")
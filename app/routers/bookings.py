@@ -1,19 +1,27 @@
-from fastapi import APIRouter, Depends, Form, Request
+from fastapi import APIRouter, Depends, Form, Query, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db_session
+from app.core.config import get_settings
+from app.db.session import get_db_session, get_read_db_session
 from app.models.booking import Booking, BookingStatus
 from app.models.review import Review
 from app.models.service import Service
 from app.models.user import User, Role
+from app.services.booking_stats import locked_for_update
 from app.services.deps import get_current_user
+from app.services.catalog import service_catalog
 from app.services.content import get_translations, get_profile
+from app.services.geo import nearest, viewport_clause
+from app.services.pagination import keyset_page, split_page
+from app.services.search import bookings_search
 
 router = APIRouter(prefix="/bookings")
+settings = get_settings()
 templates = Jinja2Templates(directory="app/templates")
 
 
@@ -50,10 +58,13 @@ async def create_booking(
     user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_db_session),
 ):
-    result = await session.execute(select(Service).where(Service.id == service_id))
-    service = result.scalar_one_or_none()
-    if not service:
-        return HTMLResponse("الخدمة غير موجودة", status_code=404)
+    catalog = await service_catalog.get(session)
+    if service_id not in catalog.by_id:
+        # The service may have been added through another worker since we cached;
+        # look up just this id, so bogus ids cannot force catalog reloads
+        if await session.get(Service, service_id) is None:
+            return HTMLResponse("الخدمة غير موجودة", status_code=404)
+        service_catalog.invalidate()
 
     booking = Booking(
         client_id=user.id,
@@ -67,7 +78,13 @@ async def create_booking(
         status=BookingStatus.requested,
     )
     session.add(booking)
-    await session.commit()
+    try:
+        await session.commit()
+    except IntegrityError:
+        # The cached catalog still listed a service another worker has since deleted
+        await session.rollback()
+        service_catalog.invalidate()
+        return HTMLResponse("الخدمة غير موجودة", status_code=404)
     return _redirect("/dashboard")
 
 
@@ -75,14 +92,16 @@ async def create_booking(
 async def list_bookings(
     request: Request,
     status: str | None = None,
+    q: str | None = None,
+    cursor: str | None = None,
+    limit: int | None = Query(default=None, ge=1),
     user: User = Depends(get_current_user),
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncSession = Depends(get_read_db_session),
 ):
-    query = select(Booking).options(
-        selectinload(Booking.review),
-        selectinload(Booking.service),
-        selectinload(Booking.client)
-    )
+    page_size = min(limit or settings.bookings_page_size, settings.bookings_page_size_max)
+
+    # Only the service is rendered on the booking card
+    query = select(Booking).options(selectinload(Booking.service))
 
     # Role-based access control
     if user.role not in {Role.employee, Role.technical, Role.driver, Role.admin}:
@@ -92,17 +111,102 @@ async def list_bookings(
     if status and status != 'all':
         query = query.where(Booking.status == status)
 
-    query = query.order_by(Booking.created_at.desc())
-    result = await session.execute(query)
-    bookings = result.scalars().all()
+    matches = bookings_search(q, session.get_bind().dialect.name) if q else None
+    if matches is not None:
+        # Ranked results page by offset; the cursor is the offset of the next page
+        try:
+            offset = int(cursor) if cursor else 0
+        except ValueError:
+            return HTMLResponse("مؤشر الصفحة غير صالح", status_code=400)
+        query = (
+            query.join(matches, matches.c.id == Booking.id)
+            .order_by(matches.c.rank.desc(), Booking.created_at.desc(), Booking.id.desc())
+            .offset(max(offset, 0))
+            .limit(page_size + 1)
+        )
+        rows = list((await session.execute(query)).scalars().all())
+        bookings = rows[:page_size]
+        next_cursor = str(offset + page_size) if len(rows) > page_size else None
+    else:
+        try:
+            query = keyset_page(query, Booking.created_at, Booking.id, cursor, page_size)
+        except ValueError:
+            return HTMLResponse("مؤشر الصفحة غير صالح", status_code=400)
+
+        result = await session.execute(query)
+        bookings, next_cursor = split_page(list(result.scalars().all()), page_size)
 
     # For employees, pass additional context for action buttons
     context = _base_context(request, user=user)
     context["bookings"] = bookings
     context["is_staff"] = user.role in {Role.employee, Role.technical, Role.driver, Role.admin}
+    context["status"] = status or "all"
+    context["q"] = q or ""
+    context["cursor"] = cursor
+    context["next_cursor"] = next_cursor
+    context["page_size"] = page_size
     return templates.TemplateResponse("partials/bookings_list.html", context)
 
 
+STAFF_ROLES = {Role.employee, Role.technical, Role.driver, Role.admin}
+
+
+def _map_point(booking: Booking, **extra) -> dict:
+    return {
+        "id": booking.id,
+        "lat": booking.location_lat,
+        "lng": booking.location_lng,
+        "status": booking.status.value,
+        "service_id": booking.service_id,
+        "assigned_employee_id": booking.assigned_employee_id,
+        **extra,
+    }
+
+
+@router.get("/map")
+async def bookings_in_viewport(
+    north: float = Query(..., ge=-90, le=90),
+    south: float = Query(..., ge=-90, le=90),
+    east: float = Query(..., ge=-180, le=180),
+    west: float = Query(..., ge=-180, le=180),
+    status: str | None = None,
+    limit: int | None = Query(default=None, ge=1),
+    user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_db_session),
+):
+    """Geotagged bookings inside a map viewport (west > east crosses the antimeridian)."""
+    if user.role not in STAFF_ROLES:
+        return HTMLResponse("غير مصرح لك بهذا الإجراء", status_code=403)
+    if south > north:
+        return HTMLResponse("حدود الخريطة غير صالحة", status_code=400)
+
+    limit = min(limit or settings.geo_viewport_max_results, settings.geo_viewport_max_results)
+    query = select(Booking).where(viewport_clause(south, west, north, east))
+    if status and status != "all":
+        if status not in BookingStatus.__members__:
+            return HTMLResponse("حالة غير صالحة", status_code=400)
+        query = query.where(Booking.status == BookingStatus(status))
+    result = await session.execute(query.limit(limit + 1))
+    bookings = list(result.scalars().all())
+    return {"bookings": [_map_point(b) for b in bookings[:limit]], "truncated": len(bookings) > limit}
+
+
+@router.get("/nearest")
+async def nearest_open_bookings(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    k: int = Query(default=10, ge=1),
+    user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_db_session),
+):
+    """The k open bookings closest to a point, nearest first."""
+    if user.role not in STAFF_ROLES:
+        return HTMLResponse("غير مصرح لك بهذا الإجراء", status_code=403)
+
+    found = await nearest(session, lat, lng, min(k, settings.geo_nearest_max_k))
+    return {"bookings": [_map_point(b, distance_m=round(d, 1)) for b, d in found]}
+
+
 @router.post("/{booking_id}/review")
 async def create_review(
     booking_id: int,
@@ -139,7 +243,9 @@ async def update_booking_status(
     if user.role not in {Role.employee, Role.technical, Role.driver, Role.admin}:
         return HTMLResponse("غير مصرح لك بهذا الإجراء", status_code=403)
     
-    result = await session.execute(select(Booking).where(Booking.id == booking_id))
+    result = await session.execute(
+        await locked_for_update(session, select(Booking).where(Booking.id == booking_id))
+    )
     booking = result.scalar_one_or_none()
     
     if not booking:
@@ -1,22 +1,25 @@
-from datetime import datetime
 import hashlib
+import secrets
 from fastapi import APIRouter, Cookie, Depends, Request, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
 from fastapi.templating import Jinja2Templates
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db_session
-from app.models.service import Service
+from app.db.session import get_db_session, get_read_db_session
+from app.services.catalog import CatalogSnapshot, service_catalog
 from app.services.content import get_translations, get_profile
+from app.services.reset_tokens import ResetTokenState, check_reset_token
 from app.services.deps import get_current_user, get_current_user_optional
+from app.services.stats import booking_counts
 from app.models.user import User, Role
-from app.models.password_reset import PasswordResetToken
 
 router = APIRouter()
 
 templates = Jinja2Templates(directory="app/templates")
 
+# Changes on every restart, so a deploy never revalidates pages rendered by old templates.
+_BOOT_ID = secrets.token_hex(8)
+
 
 def _get_lang(request: Request) -> str:
     """Get language from cookie, default to Arabic."""
@@ -48,16 +51,31 @@ async def set_language(lang: str, request: Request):
     return response
 
 
+def _page_etag(catalog: CatalogSnapshot, request: Request, user: User | None) -> str:
+    """ETag for a page rendered from the catalog: catalog version + viewer + language + this process's templates."""
+    viewer = f"{user.id}:{user.role.value}:{user.full_name}" if user else "anonymous"
+    raw = f"{catalog.version}|{viewer}|{_get_lang(request)}|{_BOOT_ID}"
+    return 'W/"' + hashlib.sha256(raw.encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def _catalog_response(request: Request, template: str, context: dict, etag: str) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return templates.TemplateResponse(template, context, headers=headers)
+
+
 @router.get("/", response_class=HTMLResponse)
 async def home(
     request: Request,
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncSession = Depends(get_read_db_session),
     current_user: User | None = Depends(get_current_user_optional),
 ):
-    services = (await session.execute(select(Service))).scalars().all()
+    catalog = await service_catalog.get(session)
     context = _base_context(request, user=current_user)
-    context["services"] = services
-    return templates.TemplateResponse("index.html", context)
+    context["services"] = catalog.services
+    return _catalog_response(request, "index.html", context, _page_etag(catalog, request, current_user))
 
 
 @router.get("/login", response_class=HTMLResponse)
@@ -81,20 +99,18 @@ async def reset_request_page(request: Request, user: User | None = Depends(get_c
     return templates.TemplateResponse("reset_request.html", _base_context(request))
 
 
-@router.get("/reset/verify/{token}", response_class=HTMLResponse)
-async def reset_verify_page(request: Request, token: str, session: AsyncSession = Depends(get_db_session)):
-    token_hash = hashlib.sha256(token.encode("utf-8")).hexdigest()
-    result = await session.execute(
-        select(PasswordResetToken).where(PasswordResetToken.token_hash == token_hash)
-    )
-    matched = result.scalar_one_or_none()
-
-    if not matched:
+async def _verified_reset_token(session: AsyncSession, token: str) -> None:
+    state, _ = await check_reset_token(session, token)
+    if state is ResetTokenState.unknown:
         raise HTTPException(status_code=400, detail="الرابط غير صالح")
-
-    if matched.expires_at < datetime.utcnow():
+    if state is ResetTokenState.expired:
         raise HTTPException(status_code=400, detail="رابط إعادة التعيين منتهي الصلاحية")
 
+
+@router.get("/reset/verify/{token}", response_class=HTMLResponse)
+async def reset_verify_page(request: Request, token: str, session: AsyncSession = Depends(get_db_session)):
+    await _verified_reset_token(session, token)
+
     context = _base_context(request)
     context["token"] = token
     return templates.TemplateResponse("reset_verified.html", context)
@@ -102,18 +118,7 @@ async def reset_verify_page(request: Request, token: str, session: AsyncSession
 
 @router.get("/reset/{token}", response_class=HTMLResponse)
 async def reset_confirm_page(request: Request, token: str, session: AsyncSession = Depends(get_db_session)):
-    # Verify token exists and is not expired
-    token_hash = hashlib.sha256(token.encode("utf-8")).hexdigest()
-    result = await session.execute(
-        select(PasswordResetToken).where(PasswordResetToken.token_hash == token_hash)
-    )
-    matched = result.scalar_one_or_none()
-    
-    if not matched:
-        raise HTTPException(status_code=400, detail="الرابط غير صالح")
-    
-    if matched.expires_at < datetime.utcnow():
-        raise HTTPException(status_code=400, detail="رابط إعادة التعيين منتهي الصلاحية")
+    await _verified_reset_token(session, token)
 
     context = _base_context(request)
     context["token"] = token
@@ -134,24 +139,13 @@ async def reset_done_page(request: Request):
 async def dashboard(
     request: Request,
     user: User = Depends(get_current_user),
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncSession = Depends(get_read_db_session),
 ):
-    from app.models.booking import Booking, BookingStatus
-
     # Basic stats
     if user.role in {Role.employee, Role.technical, Role.driver}:
-        q = select(Booking)
+        stats = await booking_counts(session)
     else:
-        q = select(Booking).where(Booking.client_id == user.id)
-
-    res = await session.execute(q)
-    bookings = res.scalars().all()
-
-    stats = {
-        "total": len(bookings),
-        "active": len([b for b in bookings if b.status in {BookingStatus.requested, BookingStatus.assigned, BookingStatus.in_progress}]),
-        "completed": len([b for b in bookings if b.status == BookingStatus.completed]),
-    }
+        stats = await booking_counts(session, client_id=user.id)
 
     context = _base_context(request, user=user)
     context["stats"] = stats
@@ -164,10 +158,10 @@ async def booking_page(
     user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_db_session),
 ):
-    services = (await session.execute(select(Service))).scalars().all()
+    catalog = await service_catalog.get(session)
     context = _base_context(request, user=user)
-    context["services"] = services
-    return templates.TemplateResponse("booking.html", context)
+    context["services"] = catalog.services
+    return _catalog_response(request, "booking.html", context, _page_etag(catalog, request, user))
 
 
 @router.get("/profile", response_class=HTMLResponse)
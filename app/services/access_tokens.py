@@ -0,0 +1,178 @@
+"""
+Access token issue and revocation.
+
+Tokens carry the user id, role, the user's token version and their own id
+(jti), so a request can be authorized from the token alone. Revoking a user's
+tokens (deactivation, role change, deletion, password reset) bumps the version
+in `token_revocations`; every token issued at an older version is then refused.
+Logout revokes only the token presented, by adding its jti to `revoked_tokens`
+until it expires, so the user's other devices stay signed in.
+
+`token_revocations` is the in-memory side: the versions and token ids revoked
+within the last token lifetime (older revocations only concern tokens that have
+expired anyway), so refusing a token already known to be revoked costs a dict
+lookup. It only ever errs towards accepting: a revocation made by another worker
+reaches it with `run_token_revocation_refresher`, every
+`token_revocation_refresh_seconds`. So that revocations apply immediately on
+every worker, `is_token_revoked` also checks the tables for a token the set
+accepts: one query, two primary key lookups, on each authenticated request.
+Either way, a revocation learned from another worker drops the user from
+`user_cache` too.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import get_settings
+from app.core.security import TokenClaims, create_access_token
+from app.models.token_revocation import RevokedToken, TokenRevocation
+from app.models.user import User
+from app.services.user_cache import user_cache
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Re-read revocations this far behind the last refresh, for transactions that
+# committed late and for clock skew between nodes
+REFRESH_OVERLAP = timedelta(minutes=1)
+
+
+class TokenRevocations:
+    def __init__(self, lifetime: timedelta):
+        self.lifetime = lifetime
+        self._versions: dict[int, tuple[int, datetime]] = {}
+        self._tokens: dict[str, datetime] = {}  # revoked token id -> its expiry
+        self._refreshed_at: datetime | None = None
+
+    def clear(self) -> None:
+        self._versions.clear()
+        self._tokens.clear()
+        self._refreshed_at = None
+
+    def note(self, user_id: int, version: int, revoked_at: datetime) -> bool:
+        """Record a revocation; returns whether it is news to this process."""
+        current = self._versions.get(user_id)
+        if current is None or version > current[0]:
+            self._versions[user_id] = (version, revoked_at)
+            return True
+        return False
+
+    def note_token(self, token_id: str, expires_at: datetime) -> None:
+        self._tokens[token_id] = expires_at
+
+    def is_revoked(self, claims: TokenClaims) -> bool:
+        if claims.token_id in self._tokens:
+            return True
+        current = self._versions.get(claims.user_id)
+        return current is not None and claims.version < current[0]
+
+    async def refresh(self, session: AsyncSession) -> int:
+        """Pick up revocations made since the last refresh; returns how many rows were read."""
+        started = datetime.utcnow()
+        since = self._refreshed_at - REFRESH_OVERLAP if self._refreshed_at else started - self.lifetime
+        rows = (
+            await session.execute(
+                select(TokenRevocation.user_id, TokenRevocation.token_version, TokenRevocation.revoked_at)
+                .where(TokenRevocation.revoked_at > since)
+            )
+        ).all()
+        for user_id, version, revoked_at in rows:
+            if self.note(user_id, version, revoked_at):
+                user_cache.invalidate(user_id)
+        tokens = (
+            await session.execute(
+                select(RevokedToken.token_id, RevokedToken.expires_at).where(RevokedToken.revoked_at > since)
+            )
+        ).all()
+        for token_id, expires_at in tokens:
+            self.note_token(token_id, expires_at)
+
+        horizon = started - self.lifetime
+        for user_id in [user_id for user_id, (_, revoked_at) in self._versions.items() if revoked_at < horizon]:
+            del self._versions[user_id]
+        for token_id in [token_id for token_id, expires_at in self._tokens.items() if expires_at < started]:
+            del self._tokens[token_id]
+        self._refreshed_at = started
+        return len(rows) + len(tokens)
+
+
+token_revocations = TokenRevocations(lifetime=timedelta(minutes=settings.access_token_expire_minutes))
+
+
+async def is_token_revoked(session: AsyncSession, claims: TokenClaims) -> bool:
+    """Whether any worker has revoked the token: `token_revocations`, then the tables."""
+    if token_revocations.is_revoked(claims):
+        return True
+    version, signed_out = (
+        await session.execute(
+            select(
+                select(TokenRevocation.token_version)
+                .where(TokenRevocation.user_id == claims.user_id)
+                .scalar_subquery(),
+                select(RevokedToken.token_id).where(RevokedToken.token_id == claims.token_id).exists(),
+            )
+        )
+    ).one()
+    if signed_out:
+        token_revocations.note_token(claims.token_id, claims.expires_at)
+        return True
+    if version is not None and claims.version < version:
+        # Revoked by another worker since the last refresh; the time only bounds how long it is kept
+        token_revocations.note(claims.user_id, version, datetime.utcnow())
+        user_cache.invalidate(claims.user_id)
+        return True
+    return False
+
+
+async def issue_access_token(session: AsyncSession, user: User) -> str:
+    version = (
+        await session.execute(
+            select(func.max(TokenRevocation.token_version)).where(TokenRevocation.user_id == user.id)
+        )
+    ).scalar()
+    return create_access_token(user.id, user.role, version or 0)
+
+
+async def revoke_tokens(session: AsyncSession, user_id: int) -> None:
+    """Refuse every token issued to the user so far. Applies in this process at once;
+    the caller commits."""
+    revoked_at = datetime.utcnow()
+    insert = pg_insert if session.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(TokenRevocation).values(user_id=user_id, token_version=1, revoked_at=revoked_at)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id"],
+        set_={"token_version": TokenRevocation.token_version + 1, "revoked_at": revoked_at},
+    ).returning(TokenRevocation.token_version)
+    version = (await session.execute(stmt)).scalar_one()
+    token_revocations.note(user_id, version, revoked_at)
+
+
+async def revoke_token(session: AsyncSession, claims: TokenClaims) -> None:
+    """Refuse this one token until it expires. Applies in this process at once;
+    the caller commits."""
+    revoked_at = datetime.utcnow()
+    # Entries past their expiry guard nothing any more
+    await session.execute(delete(RevokedToken).where(RevokedToken.expires_at < revoked_at))
+    insert = pg_insert if session.get_bind().dialect.name == "postgresql" else sqlite_insert
+    await session.execute(
+        insert(RevokedToken)
+        .values(token_id=claims.token_id, expires_at=claims.expires_at, revoked_at=revoked_at)
+        .on_conflict_do_nothing(index_elements=["token_id"])
+    )
+    token_revocations.note_token(claims.token_id, claims.expires_at)
+
+
+async def run_token_revocation_refresher(sessionmaker: async_sessionmaker, interval_seconds: float) -> None:
+    """Refresh `token_revocations` every `interval_seconds` until cancelled."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            async with sessionmaker() as session:
+                await token_revocations.refresh(session)
+        except Exception:
+            logger.exception("Token revocation refresh failed")
@@ -0,0 +1,98 @@
+"""
+Archival of closed bookings.
+
+Completed and cancelled bookings closed more than `archive_after_days` ago are
+copied with their reviews into bookings_archive / reviews_archive and deleted
+from the hot tables, one batch per transaction. The rows keep their ids, and the
+booking_stats counters cover both tiers, so archiving does not change any count.
+
+`closed_at` is stamped by a flush listener when a booking reaches a closed
+status and cleared if it is reopened; set-based status updates use
+`closed_at_value`.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.archive import CLOSED_STATUSES, BookingArchive, ReviewArchive
+from app.models.booking import Booking, BookingStatus
+from app.models.review import Review
+
+settings = get_settings()
+
+BOOKING_COLUMNS = (
+    "id", "client_id", "service_id", "status", "contact_name", "contact_phone", "description",
+    "location_lat", "location_lng", "geo_key", "address_text", "assigned_employee_id", "created_at",
+    "closed_at",
+)
+REVIEW_COLUMNS = ("id", "booking_id", "rating", "comment", "created_at")
+
+
+def archivable(older_than_days: int, now: datetime | None = None):
+    cutoff = (now or datetime.utcnow()) - timedelta(days=older_than_days)
+    return Booking.status.in_(CLOSED_STATUSES) & (Booking.closed_at < cutoff)
+
+
+def closed_at_value(status: BookingStatus):
+    """closed_at for a set-based change to `status`: kept when already closed, now when closing."""
+    return func.coalesce(Booking.closed_at, datetime.utcnow()) if status in CLOSED_STATUSES else None
+
+
+async def archive_closed_bookings(
+    session: AsyncSession,
+    older_than_days: int | None = None,
+    batch_size: int | None = None,
+    now: datetime | None = None,
+) -> int:
+    """Move archivable bookings in batches; returns how many were moved."""
+    older_than_days = settings.archive_after_days if older_than_days is None else older_than_days
+    batch_size = batch_size or settings.archive_batch_size
+    condition = archivable(older_than_days, now)
+    archived_at = now or datetime.utcnow()
+    moved = 0
+
+    while True:
+        ids = (
+            await session.execute(select(Booking.id).where(condition).order_by(Booking.id).limit(batch_size))
+        ).scalars().all()
+        if not ids:
+            return moved
+
+        booking_columns = [getattr(Booking, name) for name in BOOKING_COLUMNS]
+        await session.execute(
+            BookingArchive.__table__.insert().from_select(
+                [*BOOKING_COLUMNS, "archived_at"],
+                select(*booking_columns, literal(archived_at)).where(Booking.id.in_(ids)),
+            )
+        )
+        review_columns = [getattr(Review, name) for name in REVIEW_COLUMNS]
+        await session.execute(
+            ReviewArchive.__table__.insert().from_select(
+                REVIEW_COLUMNS, select(*review_columns).where(Review.booking_id.in_(ids))
+            )
+        )
+        # Core DELETE: the rows moved rather than disappeared, so the counters stay
+        # as they are. Reviews follow through ON DELETE CASCADE.
+        await session.execute(Booking.__table__.delete().where(Booking.__table__.c.id.in_(ids)))
+        await session.commit()
+        moved += len(ids)
+
+
+async def count_archivable(session: AsyncSession, older_than_days: int | None = None) -> int:
+    older_than_days = settings.archive_after_days if older_than_days is None else older_than_days
+    return (
+        await session.execute(select(func.count(Booking.id)).where(archivable(older_than_days)))
+    ).scalar()
+
+
+# ---- Flush listener --------------------------------------------------------
+
+@event.listens_for(Booking, "before_insert")
+@event.listens_for(Booking, "before_update")
+def _set_closed_at(mapper, connection, target) -> None:
+    if target.status not in CLOSED_STATUSES:
+        target.closed_at = None
+    elif target.closed_at is None:
+        target.closed_at = datetime.utcnow()
@@ -0,0 +1,238 @@
+"""
+Incrementally maintained booking counters (see app.models.booking_stat).
+
+Single-row inserts, updates and deletes made through the ORM are tracked by
+flush listeners, so the counters change in the same transaction as the booking.
+Set-based UPDATE/DELETE statements bypass the ORM and must call `track_bulk`
+with the same condition before executing the statement; Core updates that
+return the rows they changed report them with `track_rows`.
+
+A change is counted from the row as it was before the write, so that state has
+to be read under the lock the write will hold: `track_bulk` does so itself, and
+a booking loaded to be changed through the ORM must be selected with
+`locked_for_update`. Otherwise two concurrent writers can both count the same
+"before" and the counters drift. Archived bookings
+(app.models.archive) are counted too; archiving moves rows without touching
+the counters.
+"""
+from collections import Counter, namedtuple
+
+from sqlalchemy import delete, event, func, inspect, select, text, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.archive import BookingArchive
+from app.models.booking import Booking, BookingStatus
+from app.models.booking_stat import BookingStat
+
+BookingKey = namedtuple("BookingKey", "status service_id client_id assigned_employee_id")
+
+
+def _status_value(status) -> str:
+    return status.value if isinstance(status, BookingStatus) else BookingStatus(status).value
+
+
+def _counter_keys(key: BookingKey) -> list[tuple[str, int, str]]:
+    status = _status_value(key.status)
+    keys = [
+        ("global", 0, status),
+        ("service", key.service_id, status),
+        ("client", key.client_id, status),
+    ]
+    if key.assigned_employee_id is not None:
+        keys.append(("assignee", key.assigned_employee_id, status))
+    return keys
+
+
+def _deltas(before: BookingKey | None, after: BookingKey | None, n: int = 1) -> Counter:
+    deltas: Counter = Counter()
+    if before is not None:
+        for counter_key in _counter_keys(before):
+            deltas[counter_key] -= n
+    if after is not None:
+        for counter_key in _counter_keys(after):
+            deltas[counter_key] += n
+    return deltas
+
+
+def _upsert(dialect_name: str, deltas: Counter):
+    rows = [
+        {"scope": scope, "scope_id": scope_id, "status": status, "count": delta}
+        for (scope, scope_id, status), delta in deltas.items()
+        if delta
+    ]
+    if not rows:
+        return None
+    insert = pg_insert if dialect_name == "postgresql" else sqlite_insert
+    stmt = insert(BookingStat).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=["scope", "scope_id", "status"],
+        set_={"count": BookingStat.count + stmt.excluded["count"]},
+    )
+
+
+def snapshot(booking: Booking, committed: bool = False) -> BookingKey:
+    """The counted fields of a booking; `committed` reads the pre-flush values."""
+    values = []
+    state = inspect(booking)
+    for name in BookingKey._fields:
+        value = getattr(booking, name)
+        if committed:
+            history = state.attrs[name].history
+            if history.deleted:
+                value = history.deleted[0]
+        values.append(value)
+    key = BookingKey(*values)
+    if key.status is None:
+        key = key._replace(status=BookingStatus.requested)
+    return key
+
+
+async def locked_for_update(session: AsyncSession, query):
+    """
+    `query`, a select of bookings about to be changed, set up to read them as the
+    write will find them: with row locks (FOR UPDATE) on PostgreSQL, and on SQLite,
+    which has none, after taking the database write lock.
+    """
+    if session.get_bind().dialect.name == "sqlite":
+        connection = await session.connection()
+        raw = await connection.get_raw_connection()
+        # Holding the write lock already if this transaction has written anything
+        if not raw.driver_connection.in_transaction:
+            await connection.exec_driver_sql("BEGIN IMMEDIATE")
+    return query.with_for_update()
+
+
+# ---- ORM flush listeners -------------------------------------------------
+
+@event.listens_for(Booking, "after_insert")
+def _track_insert(mapper, connection, target) -> None:
+    stmt = _upsert(connection.dialect.name, _deltas(None, snapshot(target)))
+    if stmt is not None:
+        connection.execute(stmt)
+
+
+@event.listens_for(Booking, "after_update")
+def _track_update(mapper, connection, target) -> None:
+    before, after = snapshot(target, committed=True), snapshot(target)
+    if before == after:
+        return
+    stmt = _upsert(connection.dialect.name, _deltas(before, after))
+    if stmt is not None:
+        connection.execute(stmt)
+
+
+@event.listens_for(Booking, "after_delete")
+def _track_delete(mapper, connection, target) -> None:
+    stmt = _upsert(connection.dialect.name, _deltas(snapshot(target, committed=True), None))
+    if stmt is not None:
+        connection.execute(stmt)
+
+
+# ---- Set-based changes ---------------------------------------------------
+
+async def track_bulk(
+    session: AsyncSession, condition, values: dict | None = None, *, delete_rows: bool = False, model=Booking
+) -> None:
+    """
+    Adjust the counters for a set-based UPDATE (`values`) or DELETE (`delete_rows`)
+    of the bookings matching `condition`. Call it before executing the statement.
+    Pass `model=BookingArchive` for changes to archived bookings.
+    """
+    key_columns = (model.status, model.service_id, model.client_id, model.assigned_employee_id)
+    # Row by row: PostgreSQL does not lock the rows behind a GROUP BY
+    rows = await session.execute(await locked_for_update(session, select(*key_columns).where(condition)))
+    groups = Counter(BookingKey(*row) for row in rows.all())
+    deltas: Counter = Counter()
+    for before, n in groups.items():
+        after = None if delete_rows else before._replace(**(values or {}))
+        deltas.update(_deltas(before, after, n))
+    stmt = _upsert(session.get_bind().dialect.name, deltas)
+    if stmt is not None:
+        await session.execute(stmt)
+
+
+async def track_rows(session: AsyncSession, changes) -> None:
+    """
+    Adjust the counters for rows changed outside the ORM (an UPDATE ... RETURNING),
+    given each row's (before, after) BookingKey; None stands for no row.
+    """
+    deltas: Counter = Counter()
+    for before, after in changes:
+        deltas.update(_deltas(before, after))
+    stmt = _upsert(session.get_bind().dialect.name, deltas)
+    if stmt is not None:
+        await session.execute(stmt)
+
+
+# ---- Rebuild -------------------------------------------------------------
+
+async def _derive_counts(session: AsyncSession) -> dict[tuple[str, int, str], int]:
+    """Recount every scope from the raw bookings and bookings_archive tables."""
+    key_fields = ("id", *BookingKey._fields)
+    bookings = union_all(
+        select(*(getattr(Booking, name) for name in key_fields)),
+        select(*(getattr(BookingArchive, name) for name in key_fields)),
+    ).subquery()
+    scope_columns = {
+        "service": bookings.c.service_id,
+        "client": bookings.c.client_id,
+        "assignee": bookings.c.assigned_employee_id,
+    }
+    expected: dict[tuple[str, int, str], int] = {}
+    rows = await session.execute(
+        select(bookings.c.status, func.count(bookings.c.id)).group_by(bookings.c.status)
+    )
+    for status, n in rows.all():
+        expected[("global", 0, _status_value(status))] = n
+    for scope, column in scope_columns.items():
+        rows = await session.execute(
+            select(column, bookings.c.status, func.count(bookings.c.id))
+            .where(column.is_not(None))
+            .group_by(column, bookings.c.status)
+        )
+        for scope_id, status, n in rows.all():
+            expected[(scope, scope_id, _status_value(status))] = n
+    return expected
+
+
+async def rebuild_booking_stats(session: AsyncSession, apply: bool = True) -> list[tuple]:
+    """
+    Re-derive the counters from the raw tables and compare them with the stored ones.
+    Returns the mismatches as (scope, scope_id, status, stored, expected); when `apply`
+    is true the stored counters are replaced with the derived ones.
+
+    Applying locks out booking writes until the new counters are committed (pass a
+    session that has not run anything yet): otherwise a change committed between the
+    recount and the replacement would be counted by neither.
+    """
+    if apply:
+        if session.get_bind().dialect.name == "postgresql":
+            # Writers queue at their counter upsert; reads go on
+            await session.execute(text("LOCK TABLE booking_stats IN EXCLUSIVE MODE"))
+        else:
+            # Takes SQLite's write lock up front rather than at the DELETE
+            await session.execute(text("BEGIN IMMEDIATE"))
+    expected = await _derive_counts(session)
+    stored_rows = await session.execute(select(BookingStat).where(BookingStat.count != 0))
+    stored = {(row.scope, row.scope_id, row.status): row.count for row in stored_rows.scalars().all()}
+
+    mismatches = [
+        (*key, stored.get(key, 0), expected.get(key, 0))
+        for key in sorted(set(stored) | set(expected))
+        if stored.get(key, 0) != expected.get(key, 0)
+    ]
+
+    if apply:
+        await session.execute(delete(BookingStat))
+        if expected:
+            await session.execute(
+                BookingStat.__table__.insert(),
+                [
+                    {"scope": scope, "scope_id": scope_id, "status": status, "count": n}
+                    for (scope, scope_id, status), n in expected.items()
+                ],
+            )
+        await session.commit()
+    return mismatches
@@ -0,0 +1,74 @@
+"""
+In-process cache of the service catalog.
+
+The catalog is read on every home page, booking page and booking submission but
+only changes through the admin service CRUD endpoints, which call `invalidate()`
+after committing. Each invalidation bumps the generation, and a load that raced
+with one is never stored, so a stale snapshot cannot outlive the edit that
+replaced it. Other worker processes pick the change up after
+`catalog_cache_ttl_seconds`.
+"""
+import hashlib
+from collections import namedtuple
+from time import monotonic
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.service import Service
+
+settings = get_settings()
+
+CachedService = namedtuple("CachedService", "id name_ar name_en description")
+
+
+class CatalogSnapshot:
+    """An immutable view of the services table at one catalog generation."""
+
+    def __init__(self, generation: int, services: tuple[CachedService, ...]):
+        self.generation = generation
+        self.services = services
+        self.by_id = {service.id: service for service in services}
+        self.loaded_at = monotonic()
+        digest = hashlib.sha256(repr(services).encode("utf-8")).hexdigest()[:16]
+        # Content-derived, so every worker holding the same catalog agrees on it.
+        self.version = digest
+        self.etag = f'W/"catalog-{digest}"'
+
+
+class ServiceCatalog:
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._generation = 0
+        self._snapshot: CatalogSnapshot | None = None
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._snapshot = None
+
+    def _fresh(self) -> CatalogSnapshot | None:
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.generation != self._generation:
+            return None
+        if monotonic() - snapshot.loaded_at > self.ttl_seconds:
+            return None
+        return snapshot
+
+    async def get(self, session: AsyncSession) -> CatalogSnapshot:
+        snapshot = self._fresh()
+        if snapshot is not None:
+            return snapshot
+
+        generation = self._generation
+        result = await session.execute(
+            select(Service.id, Service.name_ar, Service.name_en, Service.description).order_by(Service.id)
+        )
+        snapshot = CatalogSnapshot(generation, tuple(CachedService(*row) for row in result.all()))
+        # Don't store a load that an invalidation overtook
+        if generation == self._generation:
+            self._snapshot = snapshot
+        return snapshot
+
+
+service_catalog = ServiceCatalog(ttl_seconds=settings.catalog_cache_ttl_seconds)
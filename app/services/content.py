@@ -175,6 +175,9 @@ TRANSLATIONS = {
         "loading": "جاري التحميل...",
         "no_bookings": "لا توجد طلبات حتى الآن",
         "no_bookings_desc": "ابدأ بإنشاء طلب جديد للاستفادة من خدماتنا",
+        "load_more": "عرض المزيد",
+        "search_bookings": "ابحث بالاسم أو الجوال أو العنوان أو الوصف",
+        "no_search_results": "لا توجد طلبات مطابقة للبحث",
         "new_service_request": "طلب خدمة جديدة ✨",
         "no_description": "لا يوجد وصف إضافي",
         "default_service_desc": "نقدم أفضل خدمات الصيانة المتكاملة لضمان استمرارية أعمالكم بكفاءة عالية.",
@@ -316,6 +319,9 @@ TRANSLATIONS = {
         "loading": "Loading...",
         "no_bookings": "No bookings yet",
         "no_bookings_desc": "Start by creating a new request to benefit from our services",
+        "load_more": "Load more",
+        "search_bookings": "Search by name, phone, address or description",
+        "no_search_results": "No bookings match your search",
         "new_service_request": "Request New Service ✨",
         "no_description": "No additional description",
         "default_service_desc": "We provide the best integrated maintenance services to ensure your business continuity with high efficiency.",
@@ -1,53 +1,58 @@
 from fastapi import Cookie, Depends, HTTPException, status
-from jose import JWTError, jwt
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_settings
+from app.core.security import TokenClaims, decode_access_token
 from app.db.session import get_db_session
 from app.models.user import User, Role
+from app.services.access_tokens import is_token_revoked, token_revocations
+from app.services.user_cache import user_cache
 
 settings = get_settings()
 
 
-def _decode_token(token: str) -> str:
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=["HS256"])
-    except JWTError as exc:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token") from exc
-    subject = payload.get("sub")
-    if not subject:
+def _signed_out(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_303_SEE_OTHER,
+        detail=detail,
+        headers={"Location": "/login"},
+    )
+
+
+async def get_token_claims(access_token: str | None = Cookie(default=None)) -> TokenClaims:
+    """The caller's token claims, checked against the revocations this worker knows
+    of; no database access. `get_current_user` makes the full check."""
+    if not access_token:
+        raise _signed_out("Not authenticated")
+    claims = decode_access_token(access_token)
+    if claims is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    return subject
+    if token_revocations.is_revoked(claims):
+        raise _signed_out("Token revoked")
+    return claims
 
 
 async def get_current_user(
+    claims: TokenClaims = Depends(get_token_claims),
     session: AsyncSession = Depends(get_db_session),
-    access_token: str | None = Cookie(default=None),
 ) -> User:
-    if not access_token:
-        raise HTTPException(
-            status_code=status.HTTP_303_SEE_OTHER,
-            detail="Not authenticated",
-            headers={"Location": "/login"},
-        )
-    subject = _decode_token(access_token)
-    result = await session.execute(select(User).where(User.email == subject))
-    user = result.scalar_one_or_none()
+    if await is_token_revoked(session, claims):
+        raise _signed_out("Token revoked")
+    user = await user_cache.get(session, claims.user_id)
     if not user or not user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_303_SEE_OTHER,
-            detail="Inactive user",
-            headers={"Location": "/login"},
-        )
+        raise _signed_out("Inactive user")
     return user
 
 
 def require_role(*roles: Role):
-    async def _role_guard(user: User = Depends(get_current_user)) -> User:
-        if user.role not in roles:
+    async def _role_guard(
+        claims: TokenClaims = Depends(get_token_claims),
+        session: AsyncSession = Depends(get_db_session),
+    ) -> User:
+        # Decided from the token: a role change revokes it
+        if claims.role not in roles:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-        return user
+        return await get_current_user(claims, session)
 
     return _role_guard
 
@@ -59,16 +64,11 @@ async def get_current_user_optional(
     """Get current user if logged in, otherwise return None (no redirect)."""
     if not access_token:
         return None
-    try:
-        payload = jwt.decode(access_token, settings.secret_key, algorithms=["HS256"])
-        subject = payload.get("sub")
-        if not subject:
-            return None
-    except JWTError:
+    claims = decode_access_token(access_token)
+    if claims is None or await is_token_revoked(session, claims):
         return None
-    
-    result = await session.execute(select(User).where(User.email == subject))
-    user = result.scalar_one_or_none()
+
+    user = await user_cache.get(session, claims.user_id)
     if not user or not user.is_active:
         return None
     return user
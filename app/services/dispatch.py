@@ -0,0 +1,291 @@
+"""
+Automatic assignment of requested bookings to staff.
+
+`Dispatcher` holds the available employee, technical and driver accounts in
+memory, grouped into tiers by open workload (assigned + in progress bookings,
+read from the booking_stats "assignee" counters). Each tier indexes its staff
+on a lat/lng grid by the location of their last job. A booking goes to the
+least loaded tier that has someone within `dispatch_max_distance_m`, and to
+the nearest person in it; bookings without a location go to whoever in the
+least loaded tier has waited longest.
+
+`dispatch_pending` feeds the oldest unassigned requested bookings through a
+dispatcher in batches and writes each batch's decisions, with the counter
+changes, in one transaction. The write only takes bookings that are still
+requested and unassigned, so a manual assignment or another dispatch run that
+got there first keeps its booking and the counters follow the rows actually
+changed.
+"""
+import asyncio
+import logging
+import math
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import get_settings
+from app.models.booking import Booking, BookingStatus
+from app.models.booking_stat import BookingStat
+from app.models.user import Role, User
+from app.services.booking_stats import BookingKey, track_rows
+from app.services.geo import METERS_PER_DEGREE
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+DISPATCH_ROLES = (Role.employee, Role.technical, Role.driver)
+OPEN_STATUSES = (BookingStatus.assigned, BookingStatus.in_progress)
+CELL_DEG = 0.05  # grid cell edge, about 5.5 km of latitude
+
+
+@dataclass(slots=True)
+class StaffState:
+    user_id: int
+    workload: int = 0
+    lat: float | None = None
+    lng: float | None = None
+
+
+def _grid_cell(lat: float, lng: float) -> tuple[int, int]:
+    return math.floor(lat / CELL_DEG), math.floor(lng / CELL_DEG)
+
+
+class _Tier:
+    """Staff sharing one workload: in arrival order, and on the grid when their location is known."""
+
+    def __init__(self):
+        self.members: dict[int, StaffState] = {}
+        self.unplaced: dict[int, StaffState] = {}
+        self.cells: dict[tuple[int, int], dict[int, StaffState]] = {}
+
+    def add(self, staff: StaffState) -> None:
+        self.members[staff.user_id] = staff
+        if staff.lat is None or staff.lng is None:
+            self.unplaced[staff.user_id] = staff
+        else:
+            self.cells.setdefault(_grid_cell(staff.lat, staff.lng), {})[staff.user_id] = staff
+
+    def remove(self, staff: StaffState) -> None:
+        del self.members[staff.user_id]
+        if staff.lat is None or staff.lng is None:
+            del self.unplaced[staff.user_id]
+        else:
+            cell = _grid_cell(staff.lat, staff.lng)
+            del self.cells[cell][staff.user_id]
+            if not self.cells[cell]:
+                del self.cells[cell]
+
+    def first(self) -> StaffState | None:
+        return next(iter(self.members.values()), None)
+
+    def first_unplaced(self) -> StaffState | None:
+        return next(iter(self.unplaced.values()), None)
+
+    def nearest(self, lat: float, lng: float, max_distance_m: float) -> StaffState | None:
+        """Closest placed member within `max_distance_m`."""
+        if not self.cells:
+            return None
+        row, col = _grid_cell(lat, lng)
+        # Cell widths shrink towards the poles; size the search for the narrowest one in reach
+        lat_edge = min(abs(lat) + max_distance_m / METERS_PER_DEGREE, 89.9)
+        cell_m = CELL_DEG * METERS_PER_DEGREE * math.cos(math.radians(lat_edge))
+        rings = min(math.ceil(max_distance_m / cell_m), int(180 / CELL_DEG))
+
+        # Equirectangular distances: well within 1% of the great circle at dispatch
+        # ranges and much cheaper, which matters on this path. Compared squared.
+        x_scale = METERS_PER_DEGREE * math.cos(math.radians(lat))
+        best, best_d2 = None, max_distance_m ** 2
+
+        def consider(members: dict[int, StaffState]) -> None:
+            nonlocal best, best_d2
+            for staff in members.values():
+                dx = (staff.lng - lng) * x_scale
+                dy = (staff.lat - lat) * METERS_PER_DEGREE
+                d2 = dx * dx + dy * dy
+                if d2 < best_d2:
+                    best, best_d2 = staff, d2
+
+        # Walk rings of cells outwards and stop once the next ring is out of reach;
+        # when that would visit more cells than are occupied, check the rest directly.
+        scanned = 0
+        for ring in range(rings + 1):
+            if scanned >= len(self.cells):
+                for (r, c), members in self.cells.items():
+                    if ring <= max(abs(r - row), abs(c - col)) <= rings:
+                        consider(members)
+                return best
+            for cell in _ring(row, col, ring):
+                scanned += 1
+                if cell in self.cells:
+                    consider(self.cells[cell])
+            if (ring * cell_m) ** 2 >= best_d2:
+                return best
+        return best
+
+
+def _ring(row: int, col: int, ring: int) -> Iterable[tuple[int, int]]:
+    if ring == 0:
+        yield row, col
+        return
+    for c in range(col - ring, col + ring + 1):
+        yield row - ring, c
+        yield row + ring, c
+    for r in range(row - ring + 1, row + ring):
+        yield r, col - ring
+        yield r, col + ring
+
+
+class Dispatcher:
+    """In-memory assignment state; `assign` picks a person and updates their workload and location."""
+
+    def __init__(self, staff: Iterable[StaffState], max_open: int | None = None, max_distance_m: float | None = None):
+        self.max_open = max_open if max_open is not None else settings.dispatch_max_open_per_staff
+        self.max_distance_m = max_distance_m if max_distance_m is not None else settings.dispatch_max_distance_m
+        self._tiers: dict[int, _Tier] = {}
+        for member in staff:
+            self._place(member)
+
+    def _place(self, staff: StaffState) -> None:
+        if self.max_open and staff.workload >= self.max_open:
+            return
+        self._tiers.setdefault(staff.workload, _Tier()).add(staff)
+
+    def __bool__(self) -> bool:
+        return bool(self._tiers)
+
+    def choose(self, lat: float | None, lng: float | None) -> StaffState | None:
+        for workload in sorted(self._tiers):
+            tier = self._tiers[workload]
+            if lat is None or lng is None:
+                return tier.first()
+            # Nobody close enough at this workload: someone whose location is unknown, else the next tier
+            staff = tier.nearest(lat, lng, self.max_distance_m) or tier.first_unplaced()
+            if staff is not None:
+                return staff
+        return None
+
+    def assign(self, lat: float | None, lng: float | None) -> StaffState | None:
+        staff = self.choose(lat, lng)
+        if staff is None:
+            return None
+        tier = self._tiers[staff.workload]
+        tier.remove(staff)
+        if not tier.members:
+            del self._tiers[staff.workload]
+        staff.workload += 1
+        if lat is not None and lng is not None:
+            staff.lat, staff.lng = lat, lng
+        self._place(staff)
+        return staff
+
+
+async def load_staff(session: AsyncSession) -> list[StaffState]:
+    """Active dispatchable staff with their open workload and last job location."""
+    dispatchable = select(User.id).where(User.role.in_(DISPATCH_ROLES), User.is_active.is_(True))
+    staff = {
+        user_id: StaffState(user_id)
+        for user_id in (await session.execute(dispatchable.order_by(User.id))).scalars()
+    }
+    workloads = await session.execute(
+        select(BookingStat.scope_id, func.sum(BookingStat.count))
+        .where(
+            BookingStat.scope == "assignee",
+            BookingStat.status.in_([status.value for status in OPEN_STATUSES]),
+        )
+        .group_by(BookingStat.scope_id)
+    )
+    for user_id, workload in workloads.all():
+        if user_id in staff:
+            staff[user_id].workload = workload
+
+    last_job = (
+        select(func.max(Booking.id))
+        .where(Booking.assigned_employee_id.in_(dispatchable), Booking.geo_key.is_not(None))
+        .group_by(Booking.assigned_employee_id)
+    )
+    locations = await session.execute(
+        select(Booking.assigned_employee_id, Booking.location_lat, Booking.location_lng)
+        .where(Booking.id.in_(last_job))
+    )
+    for user_id, lat, lng in locations.all():
+        staff[user_id].lat, staff[user_id].lng = lat, lng
+    return list(staff.values())
+
+
+async def apply_assignments(session: AsyncSession, decisions: dict[int, int]) -> int:
+    """Assign each booking id to its employee id where the booking is still requested
+    and unassigned; returns how many were. The caller commits."""
+    if not decisions:
+        return 0
+    bookings = Booking.__table__
+    result = await session.execute(
+        bookings.update()
+        .where(
+            bookings.c.id.in_(decisions),
+            bookings.c.status == BookingStatus.requested,
+            bookings.c.assigned_employee_id.is_(None),
+        )
+        .values(status=BookingStatus.assigned, assigned_employee_id=case(decisions, value=bookings.c.id))
+        .returning(bookings.c.service_id, bookings.c.client_id, bookings.c.assigned_employee_id)
+    )
+    changes = []
+    for service_id, client_id, employee_id in result.all():
+        before = BookingKey(BookingStatus.requested, service_id, client_id, None)
+        changes.append((before, before._replace(status=BookingStatus.assigned, assigned_employee_id=employee_id)))
+    await track_rows(session, changes)
+    return len(changes)
+
+
+async def dispatch_pending(
+    session: AsyncSession, batch_size: int | None = None, dispatcher: Dispatcher | None = None
+) -> int:
+    """Assign unassigned requested bookings, oldest first; returns how many were assigned."""
+    batch_size = batch_size or settings.dispatch_batch_size
+    dispatcher = dispatcher or Dispatcher(await load_staff(session))
+    assigned = 0
+    after_id = 0
+    while dispatcher:
+        # Row locks (PostgreSQL) keep a concurrent manual assignment off these rows until commit;
+        # SQLite has none, and apply_assignments skips whatever was taken in the meantime
+        rows = (
+            await session.execute(
+                select(Booking.id, Booking.location_lat, Booking.location_lng)
+                .where(
+                    Booking.status == BookingStatus.requested,
+                    Booking.assigned_employee_id.is_(None),
+                    Booking.id > after_id,
+                )
+                .order_by(Booking.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+        ).all()
+        if not rows:
+            break
+        after_id = rows[-1].id
+
+        decisions = {}
+        for row in rows:
+            staff = dispatcher.assign(row.location_lat, row.location_lng)
+            if staff is not None:
+                decisions[row.id] = staff.user_id
+        # A booking lost to someone else still counts against its chosen person for
+        # the rest of this run, which only makes the run slightly more conservative
+        assigned += await apply_assignments(session, decisions)
+        await session.commit()
+    return assigned
+
+
+async def run_dispatcher(sessionmaker: async_sessionmaker, interval_seconds: float) -> None:
+    """Dispatch every `interval_seconds` until cancelled."""
+    while True:
+        try:
+            async with sessionmaker() as session:
+                assigned = await dispatch_pending(session)
+            if assigned:
+                logger.info("Auto-dispatched %d booking(s)", assigned)
+        except Exception:
+            logger.exception("Booking dispatch failed")
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,172 @@
+"""
+Spatial lookups over booking locations.
+
+Each geotagged booking carries `geo_key`, a Z-order (Morton) code that
+interleaves 26 bits of latitude with 26 bits of longitude. Bookings close on the
+map share key prefixes, so a map rectangle is covered by a handful of integer
+ranges on the B-tree index. That works unchanged on PostgreSQL and SQLite. The
+key is set by a flush listener whenever a booking's coordinates change.
+
+`viewport_clause` builds the WHERE clause for a bounding box. `nearest` grows a
+box around a point until it holds k bookings that are provably the closest,
+reading only the closest few of each box, ranked in SQL.
+"""
+import math
+
+from sqlalchemy import and_, case, event, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.booking import ACTIVE_STATUSES, Booking
+
+settings = get_settings()
+
+BITS = 26  # per axis; a cell at full precision is about 0.3 m x 0.6 m
+EARTH_RADIUS_M = 6_371_000.0
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+NEAREST_OVERFETCH = 4  # candidates read per box, as a multiple of k
+
+
+def _spread(value: int) -> int:
+    """Put the bits of `value` on the even bit positions."""
+    result = 0
+    for bit in range(BITS):
+        result |= ((value >> bit) & 1) << (2 * bit)
+    return result
+
+
+def _cell(lat: float, lng: float, level: int) -> tuple[int, int]:
+    """Row and column of the cell holding the point on a 2^level x 2^level grid."""
+    size = 1 << level
+    row = min(int((lat + 90.0) / 180.0 * size), size - 1)
+    col = min(int((lng + 180.0) / 360.0 * size), size - 1)
+    return row, col
+
+
+def _morton(row: int, col: int) -> int:
+    return (_spread(row) << 1) | _spread(col)
+
+
+def geo_key(lat: float | None, lng: float | None) -> int | None:
+    if lat is None or lng is None or not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return _morton(*_cell(lat, lng, BITS))
+
+
+def key_ranges(south: float, west: float, north: float, east: float, max_cells: int | None = None) -> list[tuple[int, int]]:
+    """Half-open geo_key ranges whose cells cover the box (west <= east)."""
+    max_cells = max_cells or settings.geo_max_cover_cells
+    level = BITS
+    while level > 0:
+        row_min, col_min = _cell(south, west, level)
+        row_max, col_max = _cell(north, east, level)
+        if (row_max - row_min + 1) * (col_max - col_min + 1) <= max_cells:
+            break
+        level -= 1
+    if level == 0:
+        return [(0, 1 << (2 * BITS))]
+
+    shift = 2 * (BITS - level)
+    starts = sorted(
+        _morton(row, col) << shift
+        for row in range(row_min, row_max + 1)
+        for col in range(col_min, col_max + 1)
+    )
+    # Cells adjacent on the curve merge into one range
+    ranges: list[list[int]] = []
+    for start in starts:
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = start + (1 << shift)
+        else:
+            ranges.append([start, start + (1 << shift)])
+    return [(start, end) for start, end in ranges]
+
+
+def viewport_clause(south: float, west: float, north: float, east: float, model=Booking):
+    """WHERE clause for bookings inside the box; a box with west > east crosses the antimeridian."""
+    boxes = [(west, east)] if west <= east else [(west, 180.0), (-180.0, east)]
+    clauses = []
+    for box_west, box_east in boxes:
+        ranges = key_ranges(south, box_west, north, box_east)
+        clauses.append(and_(
+            or_(*(and_(model.geo_key >= start, model.geo_key < end) for start, end in ranges)),
+            model.location_lat.between(south, north),
+            model.location_lng.between(box_west, box_east),
+        ))
+    return or_(*clauses)
+
+
+def distance_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle (haversine) distance in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _lng_scale(lat: float, radius_m: float) -> float:
+    """Meters per degree of longitude, relative to latitude, at the box edge nearest a pole."""
+    return math.cos(math.radians(min(abs(lat) + radius_m / METERS_PER_DEGREE, 89.9)))
+
+
+def _box_around(lat: float, lng: float, radius_m: float) -> tuple[float, float, float, float]:
+    d_lat = radius_m / METERS_PER_DEGREE
+    south, north = max(-90.0, lat - d_lat), min(90.0, lat + d_lat)
+    d_lng = radius_m / (METERS_PER_DEGREE * _lng_scale(lat, radius_m))
+    if d_lng >= 180:
+        return south, -180.0, north, 180.0
+    west, east = lng - d_lng, lng + d_lng
+    # Wrap across the antimeridian; viewport_clause handles west > east
+    west = west + 360 if west < -180 else west
+    east = east - 360 if east > 180 else east
+    return south, west, north, east
+
+
+async def nearest(
+    session: AsyncSession, lat: float, lng: float, k: int, statuses=ACTIVE_STATUSES
+) -> list[tuple[Booking, float]]:
+    """The k bookings in `statuses` closest to the point, with their distances in meters."""
+    radius = settings.geo_nearest_start_radius_m
+    limit = k * NEAREST_OVERFETCH
+    d_lat = Booking.location_lat - lat
+    d_lng = Booking.location_lng - lng
+    d_lng = case((d_lng > 180, d_lng - 360), (d_lng < -180, d_lng + 360), else_=d_lng)
+    while True:
+        # Squared degrees, with longitude scaled for the box edge nearest a pole: never more
+        # than the true distance inside the box, so the database can rank and cut the box
+        scale = _lng_scale(lat, radius)
+        rank = d_lat * d_lat + d_lng * d_lng * (scale * scale)
+        result = await session.execute(
+            select(Booking, rank)
+            .where(Booking.status.in_(statuses), viewport_clause(*_box_around(lat, lng, radius)))
+            .order_by(rank, Booking.id)
+            .limit(limit)
+        )
+        rows = result.all()
+        found = sorted(
+            ((booking, distance_m(lat, lng, booking.location_lat, booking.location_lng)) for booking, _ in rows),
+            key=lambda pair: pair[1],
+        )
+        # Anything outside the box is farther than `radius`, and anything the limit cut off
+        # is at least as far as the last row read, so hits within both bounds are final
+        truncated = len(rows) == limit
+        reach = min(radius, math.sqrt(rows[-1][1]) * METERS_PER_DEGREE) if truncated else radius
+        within = [pair for pair in found if pair[1] <= reach]
+        if len(within) >= k:
+            return within[:k]
+        if truncated:
+            # Many bookings just past k's reach; rank further into the same box
+            limit *= 2
+        elif radius >= settings.geo_nearest_max_radius_m:
+            return within
+        else:
+            radius *= 4
+
+
+# ---- Flush listener --------------------------------------------------------
+
+@event.listens_for(Booking, "before_insert")
+@event.listens_for(Booking, "before_update")
+def _set_geo_key(mapper, connection, target) -> None:
+    target.geo_key = geo_key(target.location_lat, target.location_lng)
@@ -0,0 +1,108 @@
+"""
+Password hashing off the event loop.
+
+bcrypt takes a few hundred milliseconds per call by design; run inline it stalls
+every request on the worker. `password_hasher` runs `hash_password` /
+`verify_password` on a small thread pool (bcrypt releases the GIL), admits at
+most `password_hash_workers` calls at a time and lets up to
+`password_hash_max_queue` more wait for a slot. Beyond that it raises
+`PasswordHasherBusy`, which the app answers with 503, so a login storm sheds
+load instead of building an unbounded backlog. `metrics()` feeds
+/admin/metrics/password-hashing.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from app.core.config import get_settings
+from app.core.security import hash_password, verify_password
+
+settings = get_settings()
+
+
+class PasswordHasherBusy(RuntimeError):
+    """The hashing queue is full."""
+
+
+class PasswordHasher:
+    def __init__(self, workers: int | None = None, max_queue: int | None = None):
+        workers = settings.password_hash_workers if workers is None else workers
+        self.workers = min(4, os.cpu_count() or 1) if workers is None else workers
+        self.max_queue = settings.password_hash_max_queue if max_queue is None else max_queue
+        self._executor: ThreadPoolExecutor | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.reset_metrics()
+
+    def reset_metrics(self) -> None:
+        self.in_flight = 0
+        self.queued = 0
+        self.queued_max = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.run_seconds_total = 0.0
+
+    async def _run(self, fn, *args):
+        if self.workers == 0:
+            # Inline, on the event loop (scripts and benchmarks)
+            return fn(*args)
+        loop = asyncio.get_running_loop()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        if self._loop is not loop:
+            # A semaphore belongs to one event loop
+            self._slots, self._loop = asyncio.Semaphore(self.workers), loop
+        if self.max_queue and self._slots.locked() and self.queued >= self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+
+        queued_at = perf_counter()
+        self.queued += 1
+        self.queued_max = max(self.queued_max, self.queued)
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        started = perf_counter()
+        self.wait_seconds_total += started - queued_at
+        self.wait_seconds_max = max(self.wait_seconds_max, started - queued_at)
+
+        self.in_flight += 1
+        try:
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+            self.completed += 1
+            self.run_seconds_total += perf_counter() - started
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, password, hashed_password)
+
+    def metrics(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "queued_max": self.queued_max,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_seconds_avg": self.wait_seconds_total / self.completed if self.completed else 0.0,
+            "wait_seconds_max": self.wait_seconds_max,
+            "run_seconds_avg": self.run_seconds_total / self.completed if self.completed else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor, self._slots, self._loop = None, None, None
+
+
+password_hasher = PasswordHasher()
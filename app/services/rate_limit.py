@@ -0,0 +1,362 @@
+"""
+Per-client request rate limiting.
+
+Each request is matched to a policy (`route_policy`): strict for credential
+submissions, loose for static files and the list views HTMX reloads as
+partials, none for health checks, and the general limit for everything else.
+Only the method and path choose: a client sending HX-Request elsewhere still
+draws on the general limit. Behind a reverse proxy, list it in
+`rate_limit_trusted_proxies` so the client address is taken from
+X-Forwarded-For rather than the proxy's own.
+
+Where the counts live is `rate_limit_backend`:
+- "memory": token buckets in a fixed-size LRU in this process. Each uvicorn
+  worker enforces the limit on its own.
+- "shared": token buckets in a fixed-size hash table in a memory-mapped file,
+  shared by every worker on the host under a file lock, which requests wait
+  for without blocking the event loop.
+- "database": sliding-window counters in the rate_limit_counters table, shared
+  by every node. Requests are counted locally and flushed in one batch every
+  `rate_limit_flush_seconds`, which also reads back the cluster-wide counts,
+  so no request waits on the database. Nodes see each other's traffic one
+  flush late.
+All of them take O(1) per request and bounded memory (`rate_limit_max_clients`
+buckets or counters); a forgotten client simply starts again from zero.
+"""
+import asyncio
+import fcntl
+import hashlib
+import ipaddress
+import logging
+import mmap
+import os
+import struct
+import tempfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from time import monotonic, time
+from typing import NamedTuple
+
+from fastapi import Request
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import get_settings
+from app.models.rate_limit import RateLimitCounter
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Pause between attempts at a shared-memory lock held by another worker
+LOCK_RETRY_SECONDS = 0.0005
+
+AUTH_PATHS = frozenset({"/login", "/register", "/reset/request"})
+# GET endpoints the pages poll and filter through hx-get
+HTMX_PATHS = frozenset({"/bookings", "/admin/bookings", "/admin/users", "/admin/services"})
+
+
+class RatePolicy(NamedTuple):
+    name: str
+    max_requests: int
+    window_seconds: float
+
+    @property
+    def rate(self) -> float:
+        """Tokens regained per second."""
+        return self.max_requests / self.window_seconds
+
+
+POLICIES = {
+    "auth": RatePolicy("auth", settings.rate_limit_auth_max_requests, settings.rate_limit_window_seconds),
+    "static": RatePolicy("static", settings.rate_limit_static_max_requests, settings.rate_limit_window_seconds),
+    "htmx": RatePolicy("htmx", settings.rate_limit_htmx_max_requests, settings.rate_limit_window_seconds),
+    "default": RatePolicy("default", settings.rate_limit_max_requests, settings.rate_limit_window_seconds),
+}
+
+
+def route_policy(request: Request) -> RatePolicy | None:
+    path = request.url.path
+    if path in settings.rate_limit_exempt_paths:
+        return None
+    if request.method == "POST" and path in AUTH_PATHS:
+        return POLICIES["auth"]
+    if path.startswith("/static/"):
+        return POLICIES["static"]
+    if request.method == "GET" and path in HTMX_PATHS:
+        return POLICIES["htmx"]
+    return POLICIES["default"]
+
+
+def _networks(spec: str) -> tuple[ipaddress.IPv4Network | ipaddress.IPv6Network, ...]:
+    return tuple(ipaddress.ip_network(part.strip(), strict=False) for part in spec.split(",") if part.strip())
+
+
+_TRUSTED_PROXIES = _networks(settings.rate_limit_trusted_proxies)
+
+
+def _trusted(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in _TRUSTED_PROXIES)
+
+
+def client_ip(request: Request) -> str:
+    """The peer address, or behind trusted proxies the nearest X-Forwarded-For hop they did not add."""
+    peer = request.client.host if request.client else "unknown"
+    if not _TRUSTED_PROXIES or not _trusted(peer):
+        return peer
+    hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _trusted(hop):
+            return hop
+    return hops[0] if hops else peer
+
+
+def _take(tokens: float, updated: float, now: float, policy: RatePolicy) -> tuple[float, float]:
+    """Refill a bucket to `now` and take a token: (tokens left, 0) or (tokens, seconds until one is due)."""
+    tokens = min(float(policy.max_requests), tokens + max(0.0, now - updated) * policy.rate)
+    if tokens < 1:
+        return tokens, (1 - tokens) / policy.rate
+    return tokens - 1, 0.0
+
+
+class TokenBucketLimiter:
+    """Token buckets in this process, in LRU order."""
+
+    def __init__(self, max_clients: int):
+        self.max_clients = max_clients
+        # (policy, client) -> [tokens left, monotonic time of the last update]
+        self._buckets: OrderedDict[tuple[str, str], list[float]] = OrderedDict()
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def hit(self, client: str, policy: RatePolicy, now: float | None = None) -> float:
+        """Take a token for `client`; returns 0 if allowed, else the seconds until one is available."""
+        now = monotonic() if now is None else now
+        key = (policy.name, client)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(policy.max_requests), now]
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        bucket[0], retry_after = _take(bucket[0], bucket[1], now, policy)
+        bucket[1] = now
+        return retry_after
+
+
+# key hash (0 = empty), tokens left, monotonic time of the last update
+_SLOT = struct.Struct("<Qdd")
+_PROBES = 8
+
+
+class SharedMemoryLimiter:
+    """
+    Token buckets in a memory-mapped file shared by the workers on one host.
+    Open addressing over `slots` fixed-size slots; when a key's probe run is
+    full, the least recently updated bucket in it is reused. CLOCK_MONOTONIC
+    is host-wide on Linux, so every worker agrees on bucket times.
+    """
+
+    def __init__(self, path: str, slots: int):
+        self.path = path
+        self.slots = slots
+        self._size = slots * _SLOT.size
+        self._pid: int | None = None
+        self._fd = -1
+        self._map: mmap.mmap | None = None
+
+    def _attach(self) -> None:
+        """Open and map the file once per process. A worker forked after the limiter
+        was built (gunicorn --preload) must not use its parent's open file: flock
+        locks belong to the open file, so the workers would not exclude each other."""
+        if self._pid == os.getpid():
+            return
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        # The first worker sizes the file; the others map what is there
+        if os.fstat(fd).st_size < self._size:
+            os.ftruncate(fd, self._size)
+        self._fd, self._map, self._pid = fd, mmap.mmap(fd, self._size), os.getpid()
+
+    @contextmanager
+    def _locked(self, blocking: bool = True):
+        """Hold the file lock; without `blocking`, yields False at once if another worker has it."""
+        self._attach()
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def clear(self) -> None:
+        with self._locked():
+            self._map[:] = bytes(len(self._map))
+
+    def hit(self, client: str, policy: RatePolicy, now: float | None = None, blocking: bool = True) -> float | None:
+        """As for the other limiters; without `blocking`, None when the lock is taken (see `hit_async`)."""
+        now = monotonic() if now is None else now
+        # Python's hash() differs per process; every worker must agree on the slot
+        digest = hashlib.blake2b(f"{policy.name}:{client}".encode(), digest_size=8).digest()
+        key = int.from_bytes(digest, "little") or 1
+        first = key % self.slots
+        with self._locked(blocking) as acquired:
+            if not acquired:
+                return None
+            offset = None
+            oldest = None
+            for probe in range(_PROBES):
+                at = ((first + probe) % self.slots) * _SLOT.size
+                slot_key, tokens, updated = _SLOT.unpack_from(self._map, at)
+                if slot_key == key:
+                    offset = at
+                    break
+                if slot_key == 0:
+                    offset, tokens, updated = at, float(policy.max_requests), now
+                    break
+                if oldest is None or updated < oldest[1]:
+                    oldest = (at, updated)
+            else:
+                offset, tokens, updated = oldest[0], float(policy.max_requests), now
+            tokens, retry_after = _take(tokens, updated, now, policy)
+            _SLOT.pack_into(self._map, offset, key, tokens, now)
+        return retry_after
+
+
+class DatabaseRateLimiter:
+    """
+    Sliding-window counters shared through the rate_limit_counters table. `hit`
+    only reads and updates local state; `flush` writes the local counts in one
+    upsert, reads back the totals for every client seen since the last flush
+    and drops expired windows.
+    """
+
+    def __init__(self, max_clients: int, retention_seconds: float):
+        self.max_clients = max_clients
+        self.retention_seconds = retention_seconds
+        # (key, window start) -> requests not yet flushed
+        self._pending: dict[tuple[str, int], int] = {}
+        # keys hit since the last flush, including refused ones
+        self._touched: set[str] = set()
+        # key -> {window start: cluster-wide count as of the last flush}, LRU
+        self._seen: OrderedDict[str, dict[int, int]] = OrderedDict()
+
+    def clear(self) -> None:
+        self._pending.clear()
+        self._touched.clear()
+        self._seen.clear()
+
+    def _count(self, key: str, start: int) -> int:
+        return self._seen.get(key, {}).get(start, 0) + self._pending.get((key, start), 0)
+
+    def hit(self, client: str, policy: RatePolicy, now: float | None = None) -> float:
+        # Wall-clock windows, so that every node agrees on them
+        now = time() if now is None else now
+        window = int(policy.window_seconds)
+        key = f"{policy.name}:{client}"
+        start = int(now // window) * window
+        self._touched.add(key)
+        current = self._count(key, start)
+        previous = self._count(key, start - window)
+        elapsed = now - start
+        # The previous window's count, weighted by how much of it still overlaps
+        if previous * (1 - elapsed / window) + current >= policy.max_requests:
+            if current >= policy.max_requests or not previous:
+                return window - elapsed
+            return max(window * (1 - (policy.max_requests - current) / previous) - elapsed, 0.001)
+        self._pending[(key, start)] = self._pending.get((key, start), 0) + 1
+        return 0.0
+
+    async def flush(self, session: AsyncSession, now: float | None = None, chunk_size: int = 500) -> int:
+        """Write the local counts and refresh the cluster-wide ones; returns how many counters were written."""
+        now = time() if now is None else now
+        pending, self._pending = self._pending, {}
+        touched, self._touched = self._touched, set()
+        insert = pg_insert if session.get_bind().dialect.name == "postgresql" else sqlite_insert
+        rows = [{"key": key, "window_start": start, "count": count} for (key, start), count in pending.items()]
+        for offset in range(0, len(rows), chunk_size):
+            stmt = insert(RateLimitCounter).values(rows[offset:offset + chunk_size])
+            await session.execute(stmt.on_conflict_do_update(
+                index_elements=["key", "window_start"],
+                set_={"count": RateLimitCounter.count + stmt.excluded["count"]},
+            ))
+        await session.execute(delete(RateLimitCounter).where(
+            RateLimitCounter.window_start < now - self.retention_seconds
+        ))
+
+        keys = list(touched.union(key for key, _ in pending))
+        totals: dict[str, dict[int, int]] = {key: {} for key in keys}
+        for offset in range(0, len(keys), chunk_size):
+            result = await session.execute(
+                select(RateLimitCounter.key, RateLimitCounter.window_start, RateLimitCounter.count)
+                .where(RateLimitCounter.key.in_(keys[offset:offset + chunk_size]))
+            )
+            for key, start, count in result.all():
+                totals[key][start] = count
+        await session.commit()
+
+        for key, counts in totals.items():
+            self._seen[key] = counts
+            self._seen.move_to_end(key)
+        while len(self._seen) > self.max_clients:
+            self._seen.popitem(last=False)
+        return len(rows)
+
+
+async def run_rate_limit_flusher(
+    limiter: DatabaseRateLimiter, sessionmaker: async_sessionmaker, interval_seconds: float
+) -> None:
+    """Flush every `interval_seconds` until cancelled; the last counts are flushed on the way out."""
+    try:
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                async with sessionmaker() as session:
+                    await limiter.flush(session)
+            except Exception:
+                # Counts from a failed flush are dropped: the limiter fails open
+                logger.exception("Rate limit flush failed")
+    finally:
+        try:
+            async with sessionmaker() as session:
+                await limiter.flush(session)
+        except Exception:
+            logger.exception("Rate limit flush failed")
+
+
+async def hit_async(limiter, client: str, policy: RatePolicy) -> float:
+    """`limiter.hit` for the event loop: while another worker holds the shared-memory
+    lock, yield and try again rather than block every request on this worker."""
+    if not isinstance(limiter, SharedMemoryLimiter):
+        return limiter.hit(client, policy)
+    while (retry_after := limiter.hit(client, policy, blocking=False)) is None:
+        await asyncio.sleep(LOCK_RETRY_SECONDS)
+    return retry_after
+
+
+def build_rate_limiter(backend: str):
+    if backend == "memory":
+        return TokenBucketLimiter(max_clients=settings.rate_limit_max_clients)
+    if backend == "shared":
+        directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        path = settings.rate_limit_shared_path or os.path.join(directory, "anha-rate-limit")
+        return SharedMemoryLimiter(path, slots=settings.rate_limit_max_clients)
+    if backend == "database":
+        retention = 2 * max(policy.window_seconds for policy in POLICIES.values())
+        return DatabaseRateLimiter(max_clients=settings.rate_limit_max_clients, retention_seconds=retention)
+    raise ValueError(f"Unknown rate_limit_backend {backend!r}; expected memory, shared or database")
+
+
+rate_limiter = build_rate_limiter(settings.rate_limit_backend)
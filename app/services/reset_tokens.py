@@ -0,0 +1,80 @@
+"""
+Password-reset token lookup and cleanup.
+
+`check_reset_token` is the only place a token from a link or form is matched:
+one lookup on the unique token_hash index, with the expiry compared in SQL.
+`run_reset_token_sweeper` runs in the app process and deletes expired tokens
+in bounded batches, so tokens that nobody redeems do not pile up.
+"""
+import asyncio
+import enum
+import logging
+from datetime import datetime
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import get_settings
+from app.core.security import hash_reset_token
+from app.models.password_reset import PasswordResetToken
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class ResetTokenState(str, enum.Enum):
+    valid = "valid"
+    expired = "expired"
+    unknown = "unknown"
+
+
+async def check_reset_token(session: AsyncSession, token: str) -> tuple[ResetTokenState, int | None]:
+    """State of a raw reset token and, when valid, the user it belongs to."""
+    row = (
+        await session.execute(
+            select(
+                PasswordResetToken.user_id,
+                (PasswordResetToken.expires_at > datetime.utcnow()).label("unexpired"),
+            ).where(PasswordResetToken.token_hash == hash_reset_token(token))
+        )
+    ).one_or_none()
+    if row is None:
+        return ResetTokenState.unknown, None
+    if not row.unexpired:
+        return ResetTokenState.expired, None
+    return ResetTokenState.valid, row.user_id
+
+
+async def sweep_expired_reset_tokens(session: AsyncSession, batch_size: int | None = None) -> int:
+    """Delete expired tokens, `batch_size` rows per transaction; returns how many went."""
+    batch_size = batch_size or settings.reset_token_sweep_batch_size
+    removed = 0
+    while True:
+        expired_ids = (
+            select(PasswordResetToken.id)
+            .where(PasswordResetToken.expires_at <= datetime.utcnow())
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        result = await session.execute(
+            delete(PasswordResetToken)
+            .where(PasswordResetToken.id.in_(expired_ids))
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        removed += result.rowcount
+        if result.rowcount < batch_size:
+            return removed
+
+
+async def run_reset_token_sweeper(sessionmaker: async_sessionmaker, interval_seconds: float) -> None:
+    """Sweep every `interval_seconds` until cancelled."""
+    while True:
+        try:
+            async with sessionmaker() as session:
+                removed = await sweep_expired_reset_tokens(session)
+            if removed:
+                logger.info("Removed %d expired password reset token(s)", removed)
+        except Exception:
+            logger.exception("Password reset token sweep failed")
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,81 @@
+import re
+
+from sqlalchemy import column, func, literal_column, or_, select, table
+
+from app.core.arabic import normalize_arabic
+from app.models.booking import SEARCH_COLUMNS, SEARCH_WEIGHTS, Booking, search_vector
+from app.models.user import User
+
+# Trigram indexes cannot match anything shorter than one trigram.
+MIN_TRIGRAM_LENGTH = 3
+
+users_fts = table("users_fts", column("rowid"))
+bookings_fts = table("bookings_fts", column("rowid"))
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def _like_pattern(term: str, prefix_only: bool = False) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%" if prefix_only else f"%{escaped}%"
+
+
+def _fts_phrase(term: str) -> str:
+    """Quote a raw term as a single FTS5 phrase so punctuation in emails is taken literally."""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def users_search_clause(term: str, dialect_name: str):
+    """
+    WHERE clause matching `term` as a substring of email, full name or phone.
+    PostgreSQL uses ILIKE served by the pg_trgm GIN indexes; SQLite uses the
+    users_fts trigram table. Terms too short for a trigram fall back to a prefix match.
+    """
+    term = term.strip()
+    columns = (User.email, User.full_name, User.phone)
+
+    if len(term) < MIN_TRIGRAM_LENGTH:
+        pattern = _like_pattern(term, prefix_only=True)
+        return or_(*(col.ilike(pattern, escape="\\") for col in columns))
+
+    if dialect_name == "sqlite":
+        matches = select(users_fts.c.rowid).where(literal_column("users_fts").op("MATCH")(_fts_phrase(term)))
+        return User.id.in_(matches)
+
+    pattern = _like_pattern(term)
+    return or_(*(col.ilike(pattern, escape="\\") for col in columns))
+
+
+def search_terms(term: str) -> list[str]:
+    """Folded words of a search box entry; punctuation only separates them."""
+    return _WORD.findall(normalize_arabic(term))
+
+
+def bookings_search(term: str, dialect_name: str):
+    """
+    Bookings matching every word of `term` (each as a prefix), as a subquery of
+    (id, rank) with higher ranks first; None when `term` has no words. PostgreSQL
+    uses the ix_bookings_search GIN index, SQLite the bookings_fts table.
+    """
+    words = search_terms(term)
+    if not words:
+        return None
+
+    if dialect_name == "sqlite":
+        weights = [SEARCH_WEIGHTS[weight] for weight in SEARCH_COLUMNS.values()]
+        # bm25() is lower for better matches
+        rank = -func.bm25(literal_column("bookings_fts"), *weights)
+        query = " ".join(f'"{word}"*' for word in words)
+        return (
+            select(bookings_fts.c.rowid.label("id"), rank.label("rank"))
+            .where(literal_column("bookings_fts").op("MATCH")(query))
+            .subquery("matches")
+        )
+
+    vector = search_vector()
+    tsquery = func.to_tsquery(literal_column("'simple'"), " & ".join(f"{word}:*" for word in words))
+    return (
+        select(Booking.id, func.ts_rank_cd(vector, tsquery).label("rank"))
+        .where(vector.op("@@")(tsquery))
+        .subquery("matches")
+    )
@@ -0,0 +1,56 @@
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.booking import ACTIVE_STATUSES, BookingStatus
+from app.models.booking_stat import BookingStat
+from app.models.review import Review
+from app.models.service import Service
+from app.models.user import Role, User
+
+
+async def booking_counts(session: AsyncSession, client_id: int | None = None) -> dict:
+    """
+    Total, active and completed booking counts, read from the precomputed
+    booking_stats counters (at most one row per status).
+    Restricted to one client's bookings when `client_id` is given.
+    """
+    scope, scope_id = ("global", 0) if client_id is None else ("client", client_id)
+    result = await session.execute(
+        select(BookingStat.status, BookingStat.count)
+        .where(BookingStat.scope == scope, BookingStat.scope_id == scope_id)
+    )
+    by_status = dict(result.all())
+    return {
+        "total": sum(by_status.values()),
+        "active": sum(by_status.get(status.value, 0) for status in ACTIVE_STATUSES),
+        "completed": by_status.get(BookingStatus.completed.value, 0),
+    }
+
+
+async def admin_overview(session: AsyncSession) -> dict:
+    """
+    All admin dashboard counters in a single statement: the per-role user counts
+    come from one filtered aggregate, the booking total from the global counters
+    and the other tables from scalar subqueries.
+    """
+    users = select(
+        func.count(User.id).label("users"),
+        *(func.count(User.id).filter(User.role == role).label(f"role_{role.value}") for role in Role),
+    ).subquery()
+    query = select(
+        users,
+        select(func.coalesce(func.sum(BookingStat.count), 0))
+        .where(BookingStat.scope == "global")
+        .scalar_subquery()
+        .label("bookings"),
+        select(func.count(Service.id)).scalar_subquery().label("services"),
+        select(func.count(Review.id)).scalar_subquery().label("reviews"),
+    )
+    row = (await session.execute(query)).one()
+    return {
+        "users": row.users,
+        "bookings": row.bookings,
+        "services": row.services,
+        "reviews": row.reviews,
+        "role_counts": {role.value: row._mapping[f"role_{role.value}"] for role in Role},
+    }
@@ -0,0 +1,71 @@
+"""
+In-process cache of signed-in users.
+
+Every authenticated request resolves its token's user id to a `User`. The
+cache keeps detached copies of recently seen active users in LRU order (at most
+`user_cache_max_entries`) for `user_cache_ttl_seconds`; a hit is merged into
+the request's session without a query. The admin user update and delete
+endpoints and password reset call `invalidate()` after committing, and as with
+the service catalog a load that raced with an invalidation is never stored.
+Other worker processes drop a user as soon as they see the token revocation
+that deactivation, a role change or a password reset makes
+(app.services.access_tokens), and pick up other edits after the TTL.
+"""
+from collections import OrderedDict
+from time import monotonic
+
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.config import get_settings
+from app.models.user import User
+
+settings = get_settings()
+
+_COLUMNS = tuple(attr.key for attr in inspect(User).column_attrs)
+
+
+class UserCache:
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._generation = 0
+        self._entries: OrderedDict[int, tuple[float, User]] = OrderedDict()
+
+    def invalidate(self, user_id: int | None = None) -> None:
+        """Forget one user, or everyone."""
+        self._generation += 1
+        if user_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(user_id, None)
+
+    def _store(self, user: User) -> None:
+        cached = User(**{key: getattr(user, key) for key in _COLUMNS})
+        make_transient_to_detached(cached)
+        self._entries[user.id] = (monotonic(), cached)
+        self._entries.move_to_end(user.id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, session: AsyncSession, user_id: int) -> User | None:
+        """The user, attached to `session`."""
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            loaded_at, cached = entry
+            if monotonic() - loaded_at <= self.ttl_seconds:
+                self._entries.move_to_end(user_id)
+                return await session.merge(cached, load=False)
+            del self._entries[user_id]
+
+        generation = self._generation
+        result = await session.execute(select(User).where(User.id == user_id))
+        user = result.scalar_one_or_none()
+        # Only active users are kept, so a new or reactivated account is seen at once
+        if user is not None and user.is_active and self.max_entries and generation == self._generation:
+            self._store(user)
+        return user
+
+
+user_cache = UserCache(max_entries=settings.user_cache_max_entries, ttl_seconds=settings.user_cache_ttl_seconds)
@@ -0,0 +1,251 @@
+"""
+Bulk user import from CSV or JSONL.
+
+Rows are read one line at a time and handled in batches of `batch_size`: each
+batch is decoded and validated with `UserCreate` in a worker thread, checked
+against existing emails in one query, hashed across a process pool (one per
+process, shared by every import and shut down with the app) and inserted with a single multi-row
+INSERT ... ON CONFLICT DO NOTHING, then committed. Memory stays bounded by the
+batch size and `max_errors`, whatever the size of the file.
+
+Columns: email, password, full_name, phone (optional), role (optional).
+"""
+import asyncio
+import csv
+import json
+import multiprocessing
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import islice
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.security import hash_password
+from app.models.user import Role, User
+from app.schemas.auth import UserCreate
+
+settings = get_settings()
+
+FORMATS = ("csv", "jsonl")
+
+
+class ImportReport:
+    """Outcome of an import; keeps at most `max_errors` error lines but counts all of them."""
+
+    def __init__(self, max_errors: int):
+        self.max_errors = max_errors
+        self.rows = 0
+        self.created = 0
+        self.error_count = 0
+        self.errors: list[tuple[int, str]] = []
+
+    def error(self, line: int, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line, message))
+
+    @property
+    def errors_truncated(self) -> bool:
+        return self.error_count > len(self.errors)
+
+
+def detect_format(filename: str) -> str | None:
+    name = filename.lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return None
+
+
+def iter_records(lines: Iterable[str], fmt: str) -> Iterator[tuple[int, dict | None, str | None]]:
+    """Yield (line number, record, parse error) for each data line of a CSV or JSONL stream."""
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, {key.strip(): value for key, value in record.items() if key}, None
+        return
+
+    for line_num, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield line_num, None, f"JSON غير صالح: {exc.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield line_num, None, "يجب أن يكون كل سطر كائن JSON"
+            continue
+        yield line_num, record, None
+
+
+def _until_undecodable(records: Iterator) -> Iterator[tuple[int, dict | None, str | None]]:
+    """Pass `records` through; a decoding error ends the import with a row error, keeping
+    the report for the batches already committed."""
+    line = 0
+    try:
+        for line, record, parse_error in records:
+            yield line, record, parse_error
+    except UnicodeDecodeError:
+        yield line + 1, None, "الملف ليس بترميز UTF-8؛ توقف الاستيراد عند هذا السطر"
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()
+    )
+
+
+def _validate(line: int, record: dict, default_role: Role, report: ImportReport) -> dict | None:
+    try:
+        user = UserCreate(
+            email=record.get("email") or "",
+            password=record.get("password") or "",
+            full_name=record.get("full_name") or "",
+            phone=record.get("phone") or "",
+        )
+    except ValidationError as exc:
+        report.error(line, _validation_message(exc))
+        return None
+
+    role_value = record.get("role") or ""
+    if not isinstance(role_value, str):
+        report.error(line, f"دور غير صالح: {role_value!r}")
+        return None
+    role_value = role_value.strip()
+    if role_value and role_value not in Role.__members__:
+        report.error(line, f"دور غير صالح: {role_value}")
+        return None
+    return {
+        "line": line,
+        "email": user.email,
+        "password": user.password,
+        "full_name": user.full_name,
+        "phone": user.phone,
+        "role": Role(role_value) if role_value else default_role,
+    }
+
+
+_pools: dict[int | None, ProcessPoolExecutor] = {}
+
+
+def hashing_pool(workers: int | None = None) -> Executor | None:
+    """The process pool for bcrypt, started on first use and then reused; `workers=0`
+    gives None, which hashes in a thread of this process."""
+    workers = settings.user_import_hash_workers if workers is None else workers
+    if workers == 0:
+        return None
+    pool = _pools.get(workers)
+    if pool is None:
+        # Spawned, not forked: a fork of this threaded process could inherit locks held mid-update
+        pool = _pools[workers] = ProcessPoolExecutor(
+            max_workers=workers or None, mp_context=multiprocessing.get_context("spawn")
+        )
+    return pool
+
+
+def shutdown_hashing_pools(wait: bool = False) -> None:
+    for pool in _pools.values():
+        pool.shutdown(wait=wait, cancel_futures=True)
+    _pools.clear()
+
+
+def _next_batch(records: Iterator, batch_size: int, default_role: Role, report: ImportReport) -> list[dict] | None:
+    """Read, parse and validate up to `batch_size` records; None once they run out."""
+    chunk = list(islice(records, batch_size))
+    if not chunk:
+        return None
+    batch = []
+    for line, record, parse_error in chunk:
+        report.rows += 1
+        if parse_error:
+            report.error(line, parse_error)
+            continue
+        row = _validate(line, record, default_role, report)
+        if row is not None:
+            batch.append(row)
+    return batch
+
+
+async def _import_batch(
+    session: AsyncSession, batch: list[dict], executor: Executor | None, report: ImportReport
+) -> None:
+    # Duplicates inside the batch, then emails that already exist
+    unique: dict[str, dict] = {}
+    for row in batch:
+        if row["email"] in unique:
+            report.error(row["line"], "البريد مكرر في الملف")
+        else:
+            unique[row["email"]] = row
+    existing = await session.execute(select(User.email).where(User.email.in_(unique)))
+    for email in existing.scalars():
+        report.error(unique.pop(email)["line"], "البريد مستخدم بالفعل")
+    if not unique:
+        return
+
+    rows = list(unique.values())
+    loop = asyncio.get_running_loop()
+    hashes = await asyncio.gather(
+        *(loop.run_in_executor(executor, hash_password, row["password"]) for row in rows)
+    )
+
+    insert = pg_insert if session.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = (
+        insert(User)
+        .values([
+            {
+                "email": row["email"],
+                "full_name": row["full_name"],
+                "phone": row["phone"],
+                "role": row["role"],
+                "hashed_password": hashed,
+                "is_active": True,
+            }
+            for row, hashed in zip(rows, hashes)
+        ])
+        .on_conflict_do_nothing(index_elements=["email"])
+        .returning(User.email)
+    )
+    inserted = set((await session.execute(stmt)).scalars())
+    await session.commit()
+
+    report.created += len(inserted)
+    # Lost a race with a concurrent signup or import
+    for row in rows:
+        if row["email"] not in inserted:
+            report.error(row["line"], "البريد مستخدم بالفعل")
+
+
+async def import_users(
+    session: AsyncSession,
+    lines: Iterable[str],
+    fmt: str,
+    *,
+    default_role: Role = Role.client,
+    batch_size: int | None = None,
+    workers: int | None = None,
+    max_errors: int | None = None,
+) -> ImportReport:
+    """Stream `lines` (an open text file or any line iterator) into the users table."""
+    if fmt not in FORMATS:
+        raise ValueError(f"unsupported import format: {fmt}")
+    batch_size = batch_size or settings.user_import_batch_size
+    report = ImportReport(settings.user_import_max_errors if max_errors is None else max_errors)
+    records = _until_undecodable(iter_records(lines, fmt))
+
+    executor = hashing_pool(workers)
+    loop = asyncio.get_running_loop()
+    # Off the event loop: reading the file and validating a batch blocks for as long as it takes.
+    # One batch at a time, so the records iterator and the report are never used concurrently.
+    while (batch := await loop.run_in_executor(
+        None, _next_batch, records, batch_size, default_role, report
+    )) is not None:
+        if batch:
+            await _import_batch(session, batch, executor, report)
+    return report
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Move bookings completed or cancelled more than N days ago, with their
+reviews, into the archive tables. Safe to run from cron; each batch is its
+own transaction.
+Run with: python scripts/archive_bookings.py [--days 180] [--dry-run]
+"""
+import argparse
+import asyncio
+import sys
+import os
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.db.session import engine
+import app.models  # noqa: F401
+from app.services.archive import archive_closed_bookings, count_archivable
+
+
+async def archive(days: int, batch_size: int | None, dry_run: bool) -> int:
+    async with AsyncSession(engine) as session:
+        if dry_run:
+            n = await count_archivable(session, days)
+            print(f"📦 {n} booking(s) closed more than {days} days ago would be archived")
+            return 0
+        moved = await archive_closed_bookings(session, days, batch_size)
+
+    print(f"📦 Archived {moved} booking(s) older than {days} days")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=get_settings().archive_after_days,
+                        help="archive bookings closed more than this many days ago")
+    parser.add_argument("--batch-size", type=int, help="bookings moved per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="only count what would be archived")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(archive(args.days, args.batch_size, args.dry_run)))
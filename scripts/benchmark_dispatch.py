@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark the booking auto-dispatcher on a synthetic, seeded workload.
+Run with: python scripts/benchmark_dispatch.py [--staff 1000] [--bookings 100000] [--seed 1] [--db]
+
+Staff and bookings are scattered around a few Saudi cities from --seed, so a
+run with the same arguments replays the same decisions. The default measures
+the in-memory Dispatcher alone; --db also loads the data into a throwaway
+SQLite database and times dispatch_pending end to end (reads, decisions,
+UPDATEs and counter upserts, one transaction per batch).
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import Base, create_engine_for
+import app.models  # noqa: F401
+import app.services.booking_stats  # noqa: F401
+from app.models.booking import Booking
+from app.models.service import Service
+from app.models.user import Role, User
+from app.services.dispatch import Dispatcher, StaffState, dispatch_pending, load_staff
+from app.services.geo import geo_key
+
+CITIES = [(24.7136, 46.6753), (21.4858, 39.1925), (26.4207, 50.0888), (21.3891, 39.8579), (24.4672, 39.6112)]
+SPREAD_DEG = 0.25
+
+
+def _point(rng: random.Random) -> tuple[float, float]:
+    lat, lng = rng.choice(CITIES)
+    return lat + rng.gauss(0, SPREAD_DEG / 2), lng + rng.gauss(0, SPREAD_DEG / 2)
+
+
+def workload(staff_count: int, booking_count: int, seed: int, unplaced_share: float):
+    """Staff (id, lat, lng) and bookings (lat, lng), about `unplaced_share` of each without a location."""
+    rng = random.Random(seed)
+    staff = []
+    for user_id in range(1, staff_count + 1):
+        lat, lng = (None, None) if rng.random() < unplaced_share else _point(rng)
+        staff.append((user_id, lat, lng))
+    bookings = [(None, None) if rng.random() < unplaced_share else _point(rng) for _ in range(booking_count)]
+    return staff, bookings
+
+
+def bench_engine(staff, bookings, max_open: int) -> Counter:
+    started = time.perf_counter()
+    dispatcher = Dispatcher([StaffState(user_id, 0, lat, lng) for user_id, lat, lng in staff], max_open=max_open)
+    built = time.perf_counter()
+    per_staff: Counter = Counter()
+    for lat, lng in bookings:
+        chosen = dispatcher.assign(lat, lng)
+        if chosen is not None:
+            per_staff[chosen.user_id] += 1
+    finished = time.perf_counter()
+
+    assigned = sum(per_staff.values())
+    print(f"⚙️  engine: built in {(built - started) * 1000:.1f} ms, "
+          f"{assigned} of {len(bookings)} assigned in {finished - built:.2f} s "
+          f"→ {assigned / (finished - built):,.0f} assignments/s")
+    return per_staff
+
+
+async def bench_db(staff, bookings, max_open: int, batch_size: int | None) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine_for(f"sqlite+aiosqlite:///{directory}/dispatch.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            service_id = (await conn.execute(Service.__table__.insert().values(name_ar="خدمة"))).inserted_primary_key[0]
+            client_id = (await conn.execute(User.__table__.insert().values(
+                email="client@bench.local", full_name="client", phone="", role=Role.client,
+                hashed_password="!", is_active=True,
+            ))).inserted_primary_key[0]
+            await conn.execute(User.__table__.insert(), [
+                {"id": client_id + user_id, "email": f"staff{user_id}@bench.local", "full_name": f"staff {user_id}",
+                 "phone": "", "role": Role.employee, "hashed_password": "!", "is_active": True}
+                for user_id, _, _ in staff
+            ])
+            # Each located staff member gets one completed job, which is where the dispatcher places them
+            await conn.execute(Booking.__table__.insert(), [
+                {"client_id": client_id, "service_id": service_id, "status": "completed", "contact_name": "bench",
+                 "contact_phone": "", "description": "", "address_text": "", "location_lat": lat,
+                 "location_lng": lng, "geo_key": geo_key(lat, lng), "assigned_employee_id": client_id + user_id}
+                for user_id, lat, lng in staff if lat is not None
+            ])
+            await conn.execute(Booking.__table__.insert(), [
+                {"client_id": client_id, "service_id": service_id, "status": "requested", "contact_name": "bench",
+                 "contact_phone": "", "description": "", "address_text": "", "location_lat": lat,
+                 "location_lng": lng, "geo_key": geo_key(lat, lng)}
+                for lat, lng in bookings
+            ])
+
+        started = time.perf_counter()
+        async with AsyncSession(engine) as session:
+            dispatcher = Dispatcher(await load_staff(session), max_open=max_open)
+            loaded = time.perf_counter()
+            assigned = await dispatch_pending(session, batch_size, dispatcher)
+        finished = time.perf_counter()
+        await engine.dispose()
+
+    print(f"🗄️  sqlite: staff loaded in {(loaded - started) * 1000:.1f} ms, "
+          f"{assigned} assigned in {finished - loaded:.2f} s → {assigned / (finished - loaded):,.0f} assignments/s")
+
+
+def main(args) -> int:
+    staff, bookings = workload(args.staff, args.bookings, args.seed, args.unplaced)
+    print(f"🎲 seed {args.seed}: {len(staff)} staff, {len(bookings)} requested bookings, "
+          f"max open per staff {args.max_open or 'unlimited'}")
+    per_staff = bench_engine(staff, bookings, args.max_open)
+    if per_staff:
+        loads = sorted(per_staff.values())
+        print(f"   per staff: min {loads[0]}, median {loads[len(loads) // 2]}, max {loads[-1]}")
+    if args.db:
+        asyncio.run(bench_db(staff, bookings, args.max_open, args.batch_size))
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--staff", type=int, default=1000)
+    parser.add_argument("--bookings", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-open", type=int, default=0, help="cap per staff member (default: unlimited)")
+    parser.add_argument("--unplaced", type=float, default=0.05, help="share of staff and bookings without a location")
+    parser.add_argument("--batch-size", type=int, help="bookings per transaction with --db")
+    parser.add_argument("--db", action="store_true", help="also time dispatch_pending against SQLite")
+    args = parser.parse_args()
+    sys.exit(main(args))
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Measure how a login storm affects unrelated requests.
+Run with: python scripts/benchmark_login_storm.py [--logins 200] [--concurrency 32] [--probe /]
+
+Runs the app in-process against a throwaway SQLite database, fires --logins
+POST /login requests --concurrency at a time and, meanwhile, GETs --probe one
+after another, then reports the probe latencies. It does this twice: with
+bcrypt inline on the event loop (how logins used to be handled) and on the
+password hashing pool.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+EMAIL = "storm@bench.local"
+PASSWORD = "bench-password"
+
+
+def _percentile(samples: list[float], share: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+async def storm(app, path: str, logins: int, concurrency: int) -> tuple[list[float], float]:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get(path)  # warm up templates and the catalog cache
+        remaining = logins
+        done = asyncio.Event()
+
+        async def login_worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                response = await client.post("/login", data={"email": EMAIL, "password": PASSWORD})
+                assert response.status_code in (303, 503), response.status_code
+
+        async def probe():
+            latencies = []
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get(path)
+                latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.005)
+            return latencies
+
+        started = time.perf_counter()
+        prober = asyncio.create_task(probe())
+        await asyncio.gather(*(login_worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        return await prober, elapsed
+
+
+async def run(args) -> None:
+    from app.core.security import hash_password
+    from app.db.session import AsyncSessionLocal, Base, engine
+    from app.main import app
+    from app.models.user import Role, User
+    from app.services.hashing import password_hasher
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as session:
+        session.add(User(email=EMAIL, full_name="storm", phone="", role=Role.client,
+                         hashed_password=hash_password(PASSWORD), is_active=True))
+        await session.commit()
+
+    pool_workers = password_hasher.workers
+    for label, workers in (("inline", 0), (f"pool ({pool_workers} threads)", pool_workers)):
+        password_hasher.workers = workers
+        password_hasher.reset_metrics()
+        latencies, elapsed = await storm(app, args.probe, args.logins, args.concurrency)
+        metrics = password_hasher.metrics()
+        print(f"🔐 {label}: {args.logins} logins in {elapsed:.2f} s ({args.logins / elapsed:.1f}/s), "
+              f"queue max {metrics['queued_max']}, rejected {metrics['rejected']}")
+        print(f"   GET {args.probe} × {len(latencies)}: p50 {_percentile(latencies, 0.5) * 1000:.1f} ms, "
+              f"p99 {_percentile(latencies, 0.99) * 1000:.1f} ms, max {max(latencies) * 1000:.1f} ms")
+    password_hasher.shutdown()
+    await engine.dispose()
+
+
+def main(args) -> int:
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{directory}/storm.db"
+        os.environ["AUTO_CREATE_DB"] = "false"
+        os.environ["RATE_LIMIT_MAX_REQUESTS"] = str(10 * (args.logins + 10_000))
+        os.environ["RATE_LIMIT_AUTH_MAX_REQUESTS"] = str(10 * args.logins)
+        asyncio.run(run(args))
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--probe", default="/", help="unrelated endpoint to time during the storm")
+    args = parser.parse_args()
+    sys.exit(main(args))
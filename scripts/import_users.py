@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Import users in bulk from a CSV or JSONL file.
+Run with: python scripts/import_users.py users.csv [--role employee]
+
+Columns: email, password, full_name, phone (optional), role (optional).
+The file is streamed in batches, so it can be larger than memory. Exits
+non-zero when any row was rejected.
+"""
+import argparse
+import asyncio
+import sys
+import os
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import engine
+import app.models  # noqa: F401
+import app.services.booking_stats  # noqa: F401
+from app.models.user import Role
+from app.services.user_import import FORMATS, detect_format, import_users, shutdown_hashing_pools
+
+
+async def run(args) -> int:
+    fmt = args.format or detect_format(args.path)
+    if fmt is None:
+        print("❌ Cannot tell the format from the file name; pass --format csv|jsonl")
+        return 2
+
+    try:
+        with open(args.path, encoding="utf-8-sig", newline="") as lines:
+            async with AsyncSession(engine) as session:
+                report = await import_users(
+                    session,
+                    lines,
+                    fmt,
+                    default_role=Role(args.role),
+                    batch_size=args.batch_size,
+                    workers=args.workers,
+                )
+    finally:
+        shutdown_hashing_pools(wait=True)
+
+    for line, message in report.errors:
+        print(f"  line {line}: {message}")
+    if report.errors_truncated:
+        print(f"  ... {report.error_count - len(report.errors)} more")
+
+    print(f"📥 {report.rows} row(s) read, {report.created} user(s) created, {report.error_count} rejected")
+    return 1 if report.error_count else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="CSV or JSONL file")
+    parser.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    parser.add_argument("--role", choices=[role.value for role in Role], default="client",
+                        help="role for rows without one (default: client)")
+    parser.add_argument("--batch-size", type=int, help="rows per insert batch")
+    parser.add_argument("--workers", type=int, help="bcrypt worker processes (0 = hash in-process)")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Re-derive the booking_stats counters from the raw bookings table.
+Run with: python scripts/rebuild_booking_stats.py [--check]
+
+--check only compares the stored counters with the derived ones and exits
+non-zero on any mismatch, without writing anything.
+"""
+import argparse
+import asyncio
+import sys
+import os
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import engine
+import app.models  # noqa: F401
+from app.services.booking_stats import rebuild_booking_stats
+
+
+async def rebuild(check_only: bool) -> int:
+    async with AsyncSession(engine) as session:
+        mismatches = await rebuild_booking_stats(session, apply=not check_only)
+
+    for scope, scope_id, status, stored, expected in mismatches:
+        print(f"  {scope}:{scope_id} [{status}] stored={stored} expected={expected}")
+
+    if not mismatches:
+        print("✅ booking_stats matches the bookings table")
+        return 0
+    if check_only:
+        print(f"❌ {len(mismatches)} counter(s) out of sync")
+        return 1
+    print(f"🔧 Rebuilt booking_stats, fixed {len(mismatches)} counter(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="verify only, do not rewrite the counters")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(rebuild(args.check)))
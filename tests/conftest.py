@@ -1,6 +1,7 @@
 import asyncio
 import importlib
 import os
+from contextlib import contextmanager
 
 import pytest
 from sqlalchemy import text
@@ -78,6 +79,9 @@ def app(tmp_path_factory):
     os.environ["AUTO_CREATE_DB"] = "true"
     os.environ["DB_CONNECT_TIMEOUT_SECONDS"] = "5"
     os.environ["DB_CONNECT_SSL"] = "false"
+    os.environ["USER_IMPORT_HASH_WORKERS"] = "2"
+    os.environ["RATE_LIMIT_MAX_REQUESTS"] = "100000"
+    os.environ["RATE_LIMIT_AUTH_MAX_REQUESTS"] = "100000"
 
     from app.core import config
     config.get_settings.cache_clear()
@@ -136,6 +140,15 @@ def clean_database(app):
 
     _run(_clean())
 
+    from app.services.access_tokens import token_revocations
+    from app.services.catalog import service_catalog
+    from app.services.rate_limit import rate_limiter
+    from app.services.user_cache import user_cache
+    service_catalog.invalidate()
+    user_cache.invalidate()
+    token_revocations.clear()
+    rate_limiter.clear()
+
 
 def create_user(email: str, password: str, role: str = "client", is_active: bool = True):
     async def _create():
@@ -176,11 +189,13 @@ def create_service(name_ar: str):
     async def _create():
         from app.db.session import AsyncSessionLocal
         from app.models.service import Service
+        from app.services.catalog import service_catalog
 
         async with AsyncSessionLocal() as session:
             service = Service(name_ar=name_ar, name_en="Test", description="")
             session.add(service)
             await session.commit()
+            service_catalog.invalidate()
             return service.id
 
     return _run(_create())
@@ -223,3 +238,53 @@ def get_booking_by_contact(contact_name: str):
             return result.scalar_one_or_none()
 
     return _run(_get())
+
+
+def create_booking(client_id: int, service_id: int, contact_name: str, status: str = "requested", **fields):
+    async def _create():
+        from app.db.session import AsyncSessionLocal
+        from app.models.booking import Booking, BookingStatus
+
+        async with AsyncSessionLocal() as session:
+            booking = Booking(
+                client_id=client_id,
+                service_id=service_id,
+                contact_name=contact_name,
+                contact_phone=fields.pop("contact_phone", "0500000000"),
+                status=BookingStatus(status),
+                **fields,
+            )
+            session.add(booking)
+            await session.commit()
+            return booking.id
+
+    return _run(_create())
+
+
+@contextmanager
+def count_queries():
+    """Collect the SQL statements executed on the app engine inside the block."""
+    from sqlalchemy import event
+    from app.db.session import engine
+
+    statements: list[str] = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def booking_stats_mismatches():
+    async def _check():
+        from app.db.session import AsyncSessionLocal
+        from app.services.booking_stats import rebuild_booking_stats
+
+        async with AsyncSessionLocal() as session:
+            return await rebuild_booking_stats(session, apply=False)
+
+    return _run(_check())
@@ -1,4 +1,4 @@
-from tests.conftest import create_user, get_service_by_name
+from tests.conftest import count_queries, create_booking, create_service, create_user, get_service_by_name
 
 
 def _login(client, email: str, password: str):
@@ -39,3 +39,509 @@ def test_admin_can_create_service(client):
     service = get_service_by_name("خدمة جديدة")
     assert service is not None
     assert service.name_ar == "خدمة جديدة"
+
+
+def test_admin_bookings_paged_and_filtered(client):
+    create_user("admin3@example.com", "pass1234", role="admin")
+    client_id = create_user("client4@example.com", "pass1234")
+    cookies = _login(client, "admin3@example.com", "pass1234")
+    service_id = create_service("خدمة الإدارة")
+    other_service_id = create_service("خدمة أخرى")
+    for i in range(3):
+        create_booking(client_id, service_id, f"Paged {i}", status="completed")
+    create_booking(client_id, other_service_id, "Other", status="requested")
+
+    response = client.get("/admin/bookings?limit=2&sort=id&direction=asc", cookies=cookies)
+    assert response.status_code == 200
+    assert "(4)" in response.text
+    assert "صفحة 1 من 2" in response.text
+    assert response.text.count("edit-booking-") == 4  # two rows, each with a button and a dialog
+
+    response = client.get(f"/admin/bookings?status=completed&service_id={service_id}", cookies=cookies)
+    assert response.status_code == 200
+    assert "(3)" in response.text
+
+    response = client.get("/admin/bookings?page=5&limit=2", cookies=cookies)
+    assert response.status_code == 200
+    assert "(4)" in response.text
+
+
+def test_admin_users_search_and_filters(client):
+    create_user("admin4@example.com", "pass1234", role="admin")
+    create_user("sara.ahmed@example.com", "pass1234")
+    create_user("omar@example.com", "pass1234", role="technical")
+    create_user("inactive@example.com", "pass1234", is_active=False)
+    cookies = _login(client, "admin4@example.com", "pass1234")
+
+    response = client.get("/admin/users?q=ra.ahm", cookies=cookies)
+    assert response.status_code == 200
+    assert "sara.ahmed@example.com" in response.text
+    assert "omar@example.com" not in response.text
+
+    response = client.get("/admin/users?q=om", cookies=cookies)
+    assert "omar@example.com" in response.text
+    assert "sara.ahmed@example.com" not in response.text
+
+    response = client.get("/admin/users?role=technical", cookies=cookies)
+    assert "omar@example.com" in response.text
+    assert "(1)" in response.text
+
+    response = client.get("/admin/users?active=0", cookies=cookies)
+    assert "inactive@example.com" in response.text
+    assert "(1)" in response.text
+
+
+def test_admin_dashboard_overview_query_count(client):
+    create_user("admin5@example.com", "pass1234", role="admin")
+    client_id = create_user("client5@example.com", "pass1234")
+    create_user("tech5@example.com", "pass1234", role="technical")
+    service_id = create_service("خدمة النظرة العامة")
+    create_booking(client_id, service_id, "Overview")
+    cookies = _login(client, "admin5@example.com", "pass1234")
+
+    with count_queries() as statements:
+        response = client.get("/admin", cookies=cookies)
+    assert response.status_code == 200
+    # revocation check, current user, overview counters, recent bookings
+    assert len(statements) == 4
+    assert 'font-weight: 950; line-height: 1;">3</div>' in response.text
+
+
+def test_admin_user_edits_invalidate_cached_user(client):
+    create_user("admin9@example.com", "pass1234", role="admin")
+    staff_id = create_user("staff9@example.com", "pass1234", role="employee")
+    admin_cookies = _login(client, "admin9@example.com", "pass1234")
+    staff_cookies = _login(client, "staff9@example.com", "pass1234")
+
+    assert client.get("/admin", cookies=admin_cookies).status_code == 200
+    with count_queries() as statements:
+        assert client.get("/admin", cookies=admin_cookies).status_code == 200
+    # The signed-in user comes from the cache: revocation check, overview counters, recent bookings
+    assert len(statements) == 3
+
+    assert client.get("/dashboard", cookies=staff_cookies, follow_redirects=False).status_code == 200
+    response = client.post(
+        f"/admin/users/{staff_id}/update",
+        data={"full_name": "staff9", "email": "staff9@example.com", "role": "employee"},
+        cookies=admin_cookies,
+        follow_redirects=False,
+    )
+    assert response.status_code == 303
+    response = client.get("/dashboard", cookies=staff_cookies, follow_redirects=False)
+    assert response.status_code == 303
+    assert response.headers["location"] == "/login"
+
+
+def test_admin_delete_user_cascades_in_database(client):
+    import asyncio
+
+    from sqlalchemy import func, select
+
+    from app.db.session import AsyncSessionLocal
+    from app.models.booking import Booking
+    from app.models.review import Review
+    from tests.conftest import booking_stats_mismatches, get_booking_by_contact
+
+    create_user("admin6@example.com", "pass1234", role="admin")
+    client_id = create_user("client6@example.com", "pass1234")
+    other_id = create_user("other6@example.com", "pass1234")
+    tech_id = create_user("tech6@example.com", "pass1234", role="technical")
+    service_id = create_service("خدمة الحذف")
+    for n in range(3):
+        create_booking(client_id, service_id, f"Doomed {n}", status="completed", assigned_employee_id=tech_id)
+    kept_id = create_booking(other_id, service_id, "Kept", status="assigned", assigned_employee_id=tech_id)
+
+    doomed_id = get_booking_by_contact("Doomed 0").id
+
+    async def _review_first_booking():
+        async with AsyncSessionLocal() as session:
+            session.add(Review(booking_id=doomed_id, rating=5, comment=""))
+            session.add(Review(booking_id=kept_id, rating=4, comment=""))
+            await session.commit()
+
+    asyncio.run(_review_first_booking())
+    cookies = _login(client, "admin6@example.com", "pass1234")
+
+    with count_queries() as statements:
+        response = client.post(f"/admin/users/{client_id}/delete", cookies=cookies, follow_redirects=False)
+    assert response.status_code == 303
+    assert len([s for s in statements if s.lstrip().upper().startswith("DELETE")]) == 1
+
+    response = client.post(f"/admin/users/{tech_id}/delete", cookies=cookies, follow_redirects=False)
+    assert response.status_code == 303
+
+    response = client.post(f"/admin/bookings/{kept_id}/delete", cookies=cookies, follow_redirects=False)
+    assert response.status_code == 303
+    response = client.post(f"/admin/bookings/{kept_id}/delete", cookies=cookies, follow_redirects=False)
+    assert response.status_code == 404
+
+    async def _counts():
+        async with AsyncSessionLocal() as session:
+            bookings = (await session.execute(select(func.count(Booking.id)))).scalar()
+            reviews = (await session.execute(select(func.count(Review.id)))).scalar()
+            return bookings, reviews
+
+    assert asyncio.run(_counts()) == (0, 0)
+    assert booking_stats_mismatches() == []
+
+
+def test_admin_delete_user_clears_assignments(client):
+    from tests.conftest import booking_stats_mismatches, get_booking_by_contact
+
+    create_user("admin7@example.com", "pass1234", role="admin")
+    client_id = create_user("client7@example.com", "pass1234")
+    tech_id = create_user("tech7@example.com", "pass1234", role="technical")
+    service_id = create_service("خدمة الإسناد")
+    create_booking(client_id, service_id, "Assigned", status="assigned", assigned_employee_id=tech_id)
+    cookies = _login(client, "admin7@example.com", "pass1234")
+
+    response = client.post(f"/admin/users/{tech_id}/delete", cookies=cookies, follow_redirects=False)
+    assert response.status_code == 303
+    assert get_booking_by_contact("Assigned").assigned_employee_id is None
+    assert booking_stats_mismatches() == []
+
+
+def test_admin_bulk_booking_actions(client):
+    from tests.conftest import booking_stats_mismatches, get_booking_by_contact
+
+    create_user("admin8@example.com", "pass1234", role="admin")
+    client_id = create_user("client8@example.com", "pass1234")
+    tech_id = create_user("tech8@example.com", "pass1234", role="technical")
+    service_id = create_service("خدمة التوزيع")
+    ids = [create_booking(client_id, service_id, f"Bulk {n}") for n in range(4)]
+    cookies = _login(client, "admin8@example.com", "pass1234")
+
+    with count_queries() as statements:
+        response = client.post(
+            "/admin/bookings/bulk",
+            data={"action": "assign", "booking_ids": ids[:3], "new_employee_id": str(tech_id), "status": "requested"},
+            cookies=cookies,
+        )
+    assert response.status_code == 200
+    assert "(4)" in response.text  # the refreshed, still filtered list
+    assert len([s for s in statements if s.lstrip().upper().startswith("UPDATE BOOKINGS")]) == 1
+    assert get_booking_by_contact("Bulk 2").assigned_employee_id == tech_id
+    assert get_booking_by_contact("Bulk 3").assigned_employee_id is None
+
+    response = client.post(
+        "/admin/bookings/bulk",
+        data={"action": "status", "booking_ids": ids[:3], "new_status": "assigned", "status": "requested"},
+        cookies=cookies,
+    )
+    assert response.status_code == 200
+    assert "(1)" in response.text
+    assert get_booking_by_contact("Bulk 0").status.value == "assigned"
+    assert get_booking_by_contact("Bulk 0").closed_at is None
+
+    response = client.post(
+        "/admin/bookings/bulk", data={"action": "status", "booking_ids": ids[:1], "new_status": "completed"},
+        cookies=cookies,
+    )
+    assert response.status_code == 200
+    assert get_booking_by_contact("Bulk 0").closed_at is not None
+
+    response = client.post(
+        "/admin/bookings/bulk", data={"action": "delete", "booking_ids": ids[1:]}, cookies=cookies
+    )
+    assert response.status_code == 200
+    assert "(1)" in response.text
+    assert booking_stats_mismatches() == []
+
+    response = client.post(
+        "/admin/bookings/bulk", data={"action": "status", "booking_ids": ids, "new_status": "bogus"}, cookies=cookies
+    )
+    assert response.status_code == 400
+    response = client.post(
+        "/admin/bookings/bulk", data={"action": "assign", "booking_ids": ids, "new_employee_id": str(client_id)},
+        cookies=cookies,
+    )
+    assert response.status_code == 400
+    response = client.post("/admin/bookings/bulk", data={"action": "delete"}, cookies=cookies)
+    assert response.status_code == 400
+
+
+def test_admin_user_import_reports_row_errors(client):
+    from tests.conftest import get_user_by_email
+
+    create_user("admin9@example.com", "pass1234", role="admin")
+    create_user("taken9@example.com", "pass1234")
+    cookies = _login(client, "admin9@example.com", "pass1234")
+
+    csv_body = (
+        "email,password,full_name,phone,role\n"
+        "new1@example.com,longpassword,New One,0501,employee\n"
+        "not-an-email,longpassword,Bad Email,,\n"
+        "taken9@example.com,longpassword,Taken,,\n"
+        "new2@example.com,short,Short Password,,\n"
+        "new1@example.com,longpassword,Duplicate,,\n"
+        "new3@example.com,longpassword,Bad Role,,boss\n"
+        "new4@example.com,longpassword,New Four,,\n"
+    )
+    response = client.post(
+        "/admin/users/import",
+        files={"file": ("staff.csv", csv_body.encode("utf-8"), "text/csv")},
+        data={"default_role": "technical"},
+        cookies=cookies,
+    )
+    assert response.status_code == 200
+    assert "تم الإنشاء: 2" in response.text
+    assert "الأخطاء: 5" in response.text
+    assert get_user_by_email("new1@example.com").role.value == "employee"
+    assert get_user_by_email("new4@example.com").role.value == "technical"
+    assert get_user_by_email("new3@example.com") is None
+
+    jsonl_body = (
+        '{"email": "json1@example.com", "password": "longpassword", "full_name": "J"}\n[1]\n{oops\n'
+        '{"email": "json2@example.com", "password": "longpassword", "full_name": "J", "role": 5}\n'
+        '{"email": "json3@example.com", "password": "longpassword", "full_name": "J", "role": ["admin"]}\n'
+    )
+    response = client.post(
+        "/admin/users/import",
+        files={"file": ("clients.jsonl", jsonl_body.encode("utf-8"), "application/x-ndjson")},
+        cookies=cookies,
+    )
+    assert response.status_code == 200
+    assert "تم الإنشاء: 1" in response.text
+    assert "الأخطاء: 4" in response.text
+    assert get_user_by_email("json1@example.com") is not None
+    assert get_user_by_email("json2@example.com") is None
+
+    # Bad bytes after the first read chunk: rows before them are imported and reported
+    padding = "x" * 5000
+    body = f"email,password,full_name,note\nutf1@example.com,longpassword,U,{padding}\n".encode()
+    body += f"utf2@example.com,longpassword,U,{padding}\n".encode() + b"utf3@example.com,\xff\xfe,U,x\n"
+    response = client.post(
+        "/admin/users/import", files={"file": ("more.csv", body, "text/csv")}, cookies=cookies
+    )
+    assert response.status_code == 200
+    assert "تم الإنشاء: 1" in response.text
+    assert "UTF-8" in response.text
+    assert get_user_by_email("utf1@example.com") is not None
+
+    response = client.post(
+        "/admin/users/import", files={"file": ("users.txt", b"x", "text/plain")}, cookies=cookies
+    )
+    assert response.status_code == 400
+
+
+def test_admin_bookings_export_streams_filtered_rows(client):
+    import csv
+    import io
+    import zipfile
+
+    create_user("admin10@example.com", "pass1234", role="admin")
+    client_id = create_user("client10@example.com", "pass1234")
+    service_id = create_service("خدمة التصدير")
+    create_booking(client_id, service_id, "=HYPERLINK(1)", status="completed", contact_phone="+966 50 123 4567")
+    create_booking(client_id, service_id, "+1+cmd|' /C calc'!A0", status="completed", contact_phone="-2+3+cmd")
+    create_booking(client_id, service_id, "Open", status="requested")
+    cookies = _login(client, "admin10@example.com", "pass1234")
+
+    response = client.get("/admin/bookings", cookies=cookies)
+    assert "/admin/bookings/export?format=csv" in response.text
+
+    response = client.get("/admin/bookings/export?format=csv&status=completed", cookies=cookies)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "attachment" in response.headers["content-disposition"]
+    rows = list(csv.reader(io.StringIO(response.content.decode("utf-8-sig"))))
+    assert rows[0][:3] == ["id", "created_at", "status"]
+    assert len(rows) == 3
+    rows = sorted(rows[1:], key=lambda row: int(row[0]))
+    assert rows[0][2] == "completed"
+    assert rows[0][3] == "خدمة التصدير"
+    # Formulas are neutralised, including ones that open with a signed number
+    assert rows[0][6:8] == ["'=HYPERLINK(1)", "+966 50 123 4567"]
+    assert rows[1][6:8] == ["'+1+cmd|' /C calc'!A0", "'-2+3+cmd"]
+
+    response = client.get("/admin/bookings/export?format=xlsx", cookies=cookies)
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.content)) as workbook:
+        assert workbook.testzip() is None
+        sheet = workbook.read("xl/worksheets/sheet1.xml").decode("utf-8")
+    assert sheet.count("<row>") == 4
+    assert "خدمة التصدير" in sheet
+
+    assert client.get("/admin/bookings/export?format=pdf", cookies=cookies).status_code == 400
+
+
+def test_archived_bookings_listed_and_exported_on_request(client):
+    import asyncio
+    from datetime import datetime, timedelta
+
+    from app.db.session import AsyncSessionLocal
+    from app.models.review import Review
+    from app.services.archive import archive_closed_bookings
+    from tests.conftest import booking_stats_mismatches, get_booking_by_contact
+
+    create_user("admin11@example.com", "pass1234", role="admin")
+    client_id = create_user("client11@example.com", "pass1234")
+    service_id = create_service("خدمة الأرشفة")
+    old = datetime.utcnow() - timedelta(days=400)
+    old_id = create_booking(client_id, service_id, "Old Closed", status="completed", created_at=old, closed_at=old)
+    create_booking(client_id, service_id, "Old Open", status="in_progress", created_at=old)
+    # Created long ago but only just closed: stays until it has been closed that long
+    recent_id = create_booking(client_id, service_id, "Recent Closed", status="cancelled", created_at=old)
+
+    async def _archive():
+        async with AsyncSessionLocal() as session:
+            session.add(Review(booking_id=old_id, rating=5, comment="ممتاز"))
+            await session.commit()
+            return await archive_closed_bookings(session, older_than_days=180, batch_size=1)
+
+    assert asyncio.run(_archive()) == 1
+    assert get_booking_by_contact("Old Closed") is None
+    assert booking_stats_mismatches() == []
+
+    cookies = _login(client, "admin11@example.com", "pass1234")
+    response = client.get("/admin/bookings", cookies=cookies)
+    assert "(2)" in response.text
+    assert "Old Closed" not in response.text
+
+    response = client.get("/admin/bookings?include_archived=1&sort=client", cookies=cookies)
+    assert response.status_code == 200
+    assert "(3)" in response.text
+    assert "مؤرشف" in response.text
+    assert f"edit-booking-{old_id}" not in response.text
+
+    response = client.get("/admin/bookings/export?format=csv&include_archived=1", cookies=cookies)
+    body = response.content.decode("utf-8-sig")
+    assert body.count("\n") == 4
+    assert "ممتاز" in body
+
+    # Deleting the client removes archived bookings too, and the counters follow
+    response = client.post(f"/admin/users/{client_id}/delete", cookies=cookies, follow_redirects=False)
+    assert response.status_code == 303
+    response = client.get("/admin/bookings?include_archived=1", cookies=cookies)
+    assert "(0)" in response.text
+    assert booking_stats_mismatches() == []
+
+    # Ids are never handed out twice, so a new booking cannot collide with an archived one
+    other_id = create_user("other11@example.com", "pass1234")
+    assert create_booking(other_id, service_id, "After") > recent_id
+
+
+def test_admin_auto_dispatch_balances_workload_then_distance(client):
+    from tests.conftest import booking_stats_mismatches, get_booking_by_contact
+
+    riyadh, jeddah = (24.7136, 46.6753), (21.4858, 39.1925)
+    create_user("admin12@example.com", "pass1234", role="admin")
+    client_id = create_user("client12@example.com", "pass1234")
+    near_id = create_user("near12@example.com", "pass1234", role="employee")
+    far_id = create_user("far12@example.com", "pass1234", role="technical")
+    busy_id = create_user("busy12@example.com", "pass1234", role="driver")
+    idle_id = create_user("idle12@example.com", "pass1234", role="employee", is_active=False)
+    service_id = create_service("خدمة التكليف التلقائي")
+
+    # Last jobs place the staff; the driver already has one open booking
+    create_booking(client_id, service_id, "Done near", "completed", assigned_employee_id=near_id,
+                   location_lat=riyadh[0], location_lng=riyadh[1])
+    create_booking(client_id, service_id, "Done far", "completed", assigned_employee_id=far_id,
+                   location_lat=jeddah[0], location_lng=jeddah[1])
+    create_booking(client_id, service_id, "Open busy", "assigned", assigned_employee_id=busy_id,
+                   location_lat=riyadh[0] + 0.01, location_lng=riyadh[1])
+    create_booking(client_id, service_id, "Done idle", "completed", assigned_employee_id=idle_id,
+                   location_lat=riyadh[0], location_lng=riyadh[1])
+
+    create_booking(client_id, service_id, "New riyadh", location_lat=riyadh[0] + 0.02, location_lng=riyadh[1])
+    create_booking(client_id, service_id, "New jeddah", location_lat=jeddah[0] + 0.02, location_lng=jeddah[1])
+    create_booking(client_id, service_id, "New riyadh 2", location_lat=riyadh[0], location_lng=riyadh[1] + 0.001)
+    create_booking(client_id, service_id, "New unplaced")
+    create_booking(client_id, service_id, "Cancelled", "cancelled")
+
+    cookies = _login(client, "admin12@example.com", "pass1234")
+    response = client.post("/admin/bookings/dispatch", data={"status": "requested"}, cookies=cookies)
+    assert response.status_code == 200
+    assert "(0)" in response.text
+
+    # Least loaded first, nearest among them; an assignment moves the person to the new job
+    assert get_booking_by_contact("New riyadh").assigned_employee_id == near_id
+    assert get_booking_by_contact("New jeddah").assigned_employee_id == far_id
+    assert get_booking_by_contact("New riyadh 2").assigned_employee_id == busy_id
+    unplaced = get_booking_by_contact("New unplaced")
+    assert unplaced.assigned_employee_id == near_id
+    assert unplaced.status.value == "assigned"
+    assert get_booking_by_contact("Cancelled").assigned_employee_id is None
+    assert booking_stats_mismatches() == []
+
+
+def test_dispatch_leaves_bookings_taken_in_the_meantime(client):
+    import asyncio
+
+    from tests.conftest import _run, booking_stats_mismatches, get_booking_by_contact
+
+    client_id = create_user("client12b@example.com", "pass1234")
+    first_id = create_user("first12b@example.com", "pass1234", role="employee")
+    second_id = create_user("second12b@example.com", "pass1234", role="technical")
+    service_id = create_service("خدمة التكليف المتزامن")
+    manual = create_booking(client_id, service_id, "Taken manually")
+    stale = create_booking(client_id, service_id, "Decided stale")
+    for index in range(6):
+        create_booking(client_id, service_id, f"Concurrent {index}")
+
+    async def _race():
+        from app.db.session import AsyncSessionLocal
+        from app.models.booking import Booking, BookingStatus
+        from app.services.dispatch import apply_assignments, dispatch_pending
+
+        # Decided while requested, written after a manual assignment
+        async with AsyncSessionLocal() as session:
+            booking = await session.get(Booking, manual)
+            booking.status = BookingStatus.assigned
+            booking.assigned_employee_id = second_id
+            await session.commit()
+        async with AsyncSessionLocal() as session:
+            applied = await apply_assignments(session, {manual: first_id, stale: first_id})
+            await session.commit()
+        assert applied == 1
+
+        # Two runs at once (the admin button and the worker loop) split the rest
+        async def _dispatch():
+            async with AsyncSessionLocal() as session:
+                return await dispatch_pending(session, batch_size=2)
+
+        return await asyncio.gather(_dispatch(), _dispatch())
+
+    assert sum(_run(_race())) == 6
+    assert get_booking_by_contact("Taken manually").assigned_employee_id == second_id
+    assert get_booking_by_contact("Decided stale").assigned_employee_id == first_id
+    assert booking_stats_mismatches() == []
+
+
+def test_admin_bookings_search_follows_edits(client):
+    create_user("admin13@example.com", "pass1234", role="admin")
+    client_id = create_user("client13@example.com", "pass1234")
+    service_id = create_service("خدمة بحث الإدارة")
+    first = create_booking(client_id, service_id, "Search first", description="سباكة المطبخ")
+    second = create_booking(client_id, service_id, "Search second", description="كهرباء")
+    cookies = _login(client, "admin13@example.com", "pass1234")
+
+    response = client.get("/admin/bookings", params={"q": "سباكة المطبخ"}, cookies=cookies)
+    assert response.status_code == 200
+    assert "(1)" in response.text
+    assert f"#{first}" in response.text
+
+    # Re-indexed on update, dropped on delete
+    from tests.conftest import _run
+
+    async def _edit():
+        from app.db.session import AsyncSessionLocal
+        from app.models.booking import Booking
+
+        async with AsyncSessionLocal() as session:
+            booking = await session.get(Booking, second)
+            booking.description = "سباكة الحمام"
+            await session.commit()
+
+    _run(_edit())
+    response = client.get("/admin/bookings", params={"q": "سباكة"}, cookies=cookies)
+    assert "(2)" in response.text
+    response = client.get("/admin/bookings", params={"q": "كهرباء"}, cookies=cookies)
+    assert "(0)" in response.text
+
+    client.post(f"/admin/bookings/{first}/delete", cookies=cookies, follow_redirects=False)
+    response = client.get("/admin/bookings", params={"q": "سباكة", "include_archived": "1"}, cookies=cookies)
+    assert "(1)" in response.text
+
+    response = client.get("/admin/bookings/export", params={"q": "الحمام"}, cookies=cookies)
+    assert "Search second" in response.text
@@ -40,3 +40,188 @@ def test_admin_login_redirects_to_admin(client):
     )
     assert response.status_code == 303
     assert response.headers["location"] == "/admin"
+
+
+def _add_reset_token(user_id: int, token: str, expires_in_minutes: int):
+    import asyncio
+    from datetime import datetime, timedelta
+
+    from app.core.security import hash_reset_token
+    from app.db.session import AsyncSessionLocal
+    from app.models.password_reset import PasswordResetToken
+
+    async def _add():
+        async with AsyncSessionLocal() as session:
+            session.add(PasswordResetToken(
+                user_id=user_id,
+                token_hash=hash_reset_token(token),
+                expires_at=datetime.utcnow() + timedelta(minutes=expires_in_minutes),
+            ))
+            await session.commit()
+
+    asyncio.run(_add())
+
+
+def test_reset_token_verification_and_sweep(client):
+    import asyncio
+
+    from sqlalchemy import func, select
+
+    from app.db.session import AsyncSessionLocal
+    from app.models.password_reset import PasswordResetToken
+    from app.services.reset_tokens import sweep_expired_reset_tokens
+
+    user_id = create_user("reset1@example.com", "pass1234")
+    other_id = create_user("reset2@example.com", "pass1234")
+    _add_reset_token(user_id, "live-token", 30)
+    _add_reset_token(user_id, "stale-token", -5)
+    for n in range(5):
+        _add_reset_token(other_id, f"stale-{n}", -60)
+
+    assert client.get("/reset/verify/live-token").status_code == 200
+    assert client.get("/reset/live-token").status_code == 200
+    response = client.get("/reset/stale-token")
+    assert response.status_code == 400
+    assert "منتهي الصلاحية" in response.text
+    assert client.get("/reset/verify/unknown-token").status_code == 400
+
+    response = client.post(
+        "/reset/confirm",
+        data={"token": "stale-token", "new_password": "newpass123", "confirm_password": "newpass123"},
+        follow_redirects=False,
+    )
+    assert response.status_code == 400
+
+    async def _sweep():
+        async with AsyncSessionLocal() as session:
+            removed = await sweep_expired_reset_tokens(session, batch_size=2)
+            left = (await session.execute(select(func.count(PasswordResetToken.id)))).scalar()
+            return removed, left
+
+    assert asyncio.run(_sweep()) == (6, 1)
+
+    response = client.post(
+        "/reset/confirm",
+        data={"token": "live-token", "new_password": "newpass123", "confirm_password": "newpass123"},
+        follow_redirects=False,
+    )
+    assert response.status_code == 303
+    response = client.post(
+        "/login", data={"email": "reset1@example.com", "password": "newpass123"}, follow_redirects=False
+    )
+    assert response.status_code == 303
+
+
+def test_password_hashing_pool_sheds_load(client, monkeypatch):
+    import asyncio
+
+    from app.services.hashing import PasswordHasher, PasswordHasherBusy, password_hasher
+
+    create_user("admin2@example.com", "pass1234", role="admin")
+    password_hasher.reset_metrics()
+    response = client.post(
+        "/login", data={"email": "admin2@example.com", "password": "pass1234"}, follow_redirects=False
+    )
+    assert response.status_code == 303
+    metrics = client.get("/admin/metrics/password-hashing").json()
+    assert metrics["completed"] == 1 and metrics["rejected"] == 0
+
+    # One running, one waiting, the third is turned away
+    hasher = PasswordHasher(workers=1, max_queue=1)
+
+    async def _storm():
+        return await asyncio.gather(*(hasher.hash("pass1234") for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(_storm())
+    hasher.shutdown()
+    assert [isinstance(result, PasswordHasherBusy) for result in results] == [False, False, True]
+    assert hasher.metrics()["completed"] == 2 and hasher.metrics()["queued_max"] == 1
+
+    async def _busy(*args):
+        raise PasswordHasherBusy()
+
+    monkeypatch.setattr(password_hasher, "verify", _busy)
+    response = client.post(
+        "/login", data={"email": "admin2@example.com", "password": "pass1234"}, follow_redirects=False
+    )
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+def test_access_tokens_carry_claims_and_revoke(client):
+    import asyncio
+
+    import pytest
+    from pydantic import ValidationError
+
+    from app.core.config import Settings
+    from app.core.security import decode_access_token
+    from app.db.session import AsyncSessionLocal
+    from app.models.user import Role
+    from app.services.access_tokens import token_revocations
+    from tests.conftest import count_queries
+
+    user_id = create_user("tokens1@example.com", "pass1234", role="employee")
+
+    def _sign_in() -> str:
+        response = client.post(
+            "/login", data={"email": "tokens1@example.com", "password": "pass1234"}, follow_redirects=False
+        )
+        client.cookies.clear()
+        return response.cookies["access_token"]
+
+    first, second = _sign_in(), _sign_in()
+    assert decode_access_token(first)[:3] == (user_id, Role.employee, 0)
+    assert decode_access_token(first).token_id != decode_access_token(second).token_id
+
+    assert client.get("/dashboard", cookies={"access_token": first}).status_code == 200
+    # The role check needs nothing from the database
+    with count_queries() as statements:
+        response = client.get("/admin", cookies={"access_token": first}, follow_redirects=False)
+    assert response.status_code == 403
+    assert statements == []
+
+    # Logging out ends that session only; the other device stays signed in
+    client.post("/logout", cookies={"access_token": first}, follow_redirects=False)
+    client.cookies.clear()
+    response = client.get("/dashboard", cookies={"access_token": first}, follow_redirects=False)
+    assert response.status_code == 303
+    assert response.headers["location"] == "/login"
+    assert client.get("/dashboard", cookies={"access_token": second}).status_code == 200
+
+    # Another worker starts with nothing in memory and learns the revocation on refresh
+    async def _refresh():
+        async with AsyncSessionLocal() as session:
+            return await token_revocations.refresh(session)
+
+    token_revocations.clear()
+    assert not token_revocations.is_revoked(decode_access_token(first))
+    assert asyncio.run(_refresh()) == 1
+    assert token_revocations.is_revoked(decode_access_token(first))
+    assert not token_revocations.is_revoked(decode_access_token(second))
+
+    # A worker that has not refreshed yet still refuses a revoked token at once,
+    # and stops serving the user from its cache
+    from app.services.access_tokens import revoke_tokens
+    from app.services.user_cache import user_cache
+
+    async def _revoke_elsewhere():
+        async with AsyncSessionLocal() as session:
+            await revoke_tokens(session, user_id)
+            await session.commit()
+
+    token_revocations.clear()
+    response = client.get("/dashboard", cookies={"access_token": first}, follow_redirects=False)
+    assert response.status_code == 303
+
+    asyncio.run(_revoke_elsewhere())
+    token_revocations.clear()
+    assert user_id in user_cache._entries
+    response = client.get("/dashboard", cookies={"access_token": second}, follow_redirects=False)
+    assert response.status_code == 303
+    assert response.headers["location"] == "/login"
+    assert user_id not in user_cache._entries
+
+    # Workers must pull each other's revocations
+    with pytest.raises(ValidationError):
+        Settings(token_revocation_refresh_seconds=0)
@@ -1,4 +1,14 @@
-from tests.conftest import create_service, create_user, get_booking_by_contact, get_service_by_id
+import re
+
+from tests.conftest import (
+    booking_stats_mismatches,
+    count_queries,
+    create_booking,
+    create_service,
+    create_user,
+    get_booking_by_contact,
+    get_service_by_id,
+)
 
 
 def _login(client, email: str, password: str):
@@ -43,3 +53,275 @@ def test_create_booking(client):
     booking = get_booking_by_contact("Test Booker")
     assert booking is not None
     assert booking.service_id == service_id
+
+    # An unknown id is looked up on its own; the cached catalog is not reloaded
+    with count_queries() as statements:
+        response = client.post(
+            "/bookings",
+            data={"service_id": service_id + 1000, "contact_name": "X", "contact_phone": "0"},
+            cookies=cookies,
+        )
+    assert response.status_code == 404
+    catalog_reads = [statement for statement in statements if "FROM services" in statement]
+    assert len(catalog_reads) == 1 and "services.id = " in catalog_reads[0]
+
+    # Deleted through another worker while still cached here: a 404, not a foreign key error
+    from app.services.catalog import service_catalog
+    from tests.conftest import _run
+
+    async def _delete_service():
+        from sqlalchemy import delete
+        from app.db.session import AsyncSessionLocal
+        from app.models.booking import Booking
+        from app.models.service import Service
+
+        async with AsyncSessionLocal() as session:
+            await session.execute(delete(Booking).where(Booking.service_id == service_id))
+            await session.execute(delete(Service).where(Service.id == service_id))
+            await session.commit()
+
+    _run(_delete_service())
+    response = client.post(
+        "/bookings",
+        data={"service_id": service_id, "contact_name": "Stale", "contact_phone": "0"},
+        cookies=cookies,
+    )
+    assert response.status_code == 404
+    assert get_booking_by_contact("Stale") is None
+    assert service_catalog._snapshot is None
+
+
+def test_list_bookings_keyset_pagination(client):
+    user_id = create_user("pager@example.com", "pass1234")
+    cookies = _login(client, "pager@example.com", "pass1234")
+    service_id = create_service("خدمة الصفحات")
+    for i in range(5):
+        create_booking(user_id, service_id, f"Pager {i}")
+
+    first = client.get("/bookings?limit=2", cookies=cookies)
+    assert first.status_code == 200
+    cursor = re.search(r"cursor=([^&\"]+)", first.text)
+    assert cursor is not None
+    assert first.text.count('class="booking-card') == 2
+
+    seen = first.text.count('class="booking-card')
+    next_url = f"/bookings?limit=2&cursor={cursor.group(1)}"
+    while next_url:
+        page = client.get(next_url, cookies=cookies)
+        assert page.status_code == 200
+        seen += page.text.count('class="booking-card')
+        match = re.search(r"cursor=([^&\"]+)", page.text)
+        next_url = f"/bookings?limit=2&cursor={match.group(1)}" if match else None
+    assert seen == 5
+
+
+def test_list_bookings_rejects_bad_cursor(client):
+    create_user("badcursor@example.com", "pass1234")
+    cookies = _login(client, "badcursor@example.com", "pass1234")
+    response = client.get("/bookings?cursor=not-a-cursor", cookies=cookies)
+    assert response.status_code == 400
+
+
+def test_booking_stats_follow_every_change(client):
+    client_id = create_user("statsclient@example.com", "pass1234")
+    create_user("statstech@example.com", "pass1234", role="technical")
+    create_user("statsadmin@example.com", "pass1234", role="admin")
+    service_id = create_service("خدمة العدادات")
+    kept = create_booking(client_id, service_id, "Kept")
+    removed = create_booking(client_id, service_id, "Removed")
+
+    tech_cookies = _login(client, "statstech@example.com", "pass1234")
+    client.post(f"/bookings/{kept}/status", data={"new_status": "assigned"}, cookies=tech_cookies)
+    client.post(f"/bookings/{kept}/status", data={"new_status": "completed"}, cookies=tech_cookies)
+    assert booking_stats_mismatches() == []
+
+    admin_cookies = _login(client, "statsadmin@example.com", "pass1234")
+    client.post(f"/admin/bookings/{removed}/delete", cookies=admin_cookies)
+    assert booking_stats_mismatches() == []
+
+    tech = client.get("/dashboard", cookies=tech_cookies)
+    assert 'font-[950]">1</div>' in tech.text
+
+    client.post(f"/admin/users/{client_id}/delete", cookies=admin_cookies)
+    assert booking_stats_mismatches() == []
+
+
+def test_booking_stats_concurrent_writers_count_what_they_changed(client):
+    import asyncio
+
+    from sqlalchemy import select, update
+
+    from app.db.session import AsyncSessionLocal
+    from app.models.booking import Booking, BookingStatus
+    from app.services.booking_stats import locked_for_update, track_bulk
+    from tests.conftest import _run
+
+    client_id = create_user("raceclient@example.com", "pass1234")
+    service_id = create_service("خدمة التزامن")
+    booking_id = create_booking(client_id, service_id, "Raced")
+
+    async def _interleave():
+        async with AsyncSessionLocal() as first, AsyncSessionLocal() as second:
+            # The first writer holds the booking mid-change...
+            booking = (
+                await first.execute(await locked_for_update(first, select(Booking).where(Booking.id == booking_id)))
+            ).scalar_one()
+            booking.status = BookingStatus.completed
+            await first.flush()
+
+            # ...while a bulk update of the same row starts and has to wait for it
+            async def _bulk():
+                selected = Booking.id == booking_id
+                values = {"status": BookingStatus.cancelled}
+                await track_bulk(second, selected, values)
+                await second.execute(update(Booking).where(selected).values(**values))
+                await second.commit()
+
+            bulk = asyncio.create_task(_bulk())
+            await asyncio.sleep(0.2)
+            assert not bulk.done()
+            await first.commit()
+            await bulk
+
+    _run(_interleave())
+    assert get_booking_by_contact("Raced").status.value == "cancelled"
+    assert booking_stats_mismatches() == []
+
+
+def test_booking_stats_rebuild_repairs_counters_under_lock(client):
+    from sqlalchemy import update
+
+    from app.db.session import AsyncSessionLocal
+    from app.models.booking_stat import BookingStat
+    from app.services.booking_stats import rebuild_booking_stats
+    from tests.conftest import _run
+
+    client_id = create_user("rebuildclient@example.com", "pass1234")
+    service_id = create_service("خدمة إعادة العد")
+    create_booking(client_id, service_id, "Counted")
+
+    async def _corrupt_and_rebuild():
+        async with AsyncSessionLocal() as session:
+            await session.execute(update(BookingStat).values(count=BookingStat.count + 5))
+            await session.commit()
+
+        async with AsyncSessionLocal() as rebuilding:
+            with count_queries() as statements:
+                mismatches = await rebuild_booking_stats(rebuilding, apply=True)
+        # The write lock comes before the recount, so no booking change can slip in between
+        assert statements[0] == "BEGIN IMMEDIATE"
+        return mismatches
+
+    assert len(_run(_corrupt_and_rebuild())) == 3  # the global, service and client counters
+    assert booking_stats_mismatches() == []
+
+
+def test_map_viewport_and_nearest(client, monkeypatch):
+    client_id = create_user("mapped@example.com", "pass1234")
+    create_user("mapper@example.com", "pass1234", role="employee")
+    service_id = create_service("خدمة الخريطة")
+    # Riyadh points at increasing distance from the origin, one off-map, two across the antimeridian
+    points = {
+        "origin": (24.7136, 46.6753),
+        "near": (24.7200, 46.6800),
+        "mid": (24.7500, 46.7000),
+        "far": (24.9000, 46.9000),
+        "jeddah": (21.4858, 39.1925),
+        "fiji": (-17.8, 179.9),
+        "samoa": (-17.9, -179.9),
+    }
+    for name, (lat, lng) in points.items():
+        create_booking(client_id, service_id, f"map-{name}", location_lat=lat, location_lng=lng)
+    create_booking(client_id, service_id, "map-done", status="completed", location_lat=24.7137, location_lng=46.6754)
+    create_booking(client_id, service_id, "map-unplaced")
+
+    client_cookies = _login(client, "mapped@example.com", "pass1234")
+    response = client.get("/bookings/nearest", params={"lat": 24.7136, "lng": 46.6753}, cookies=client_cookies)
+    assert response.status_code == 403
+
+    cookies = _login(client, "mapper@example.com", "pass1234")
+    response = client.get(
+        "/bookings/map", params={"south": 24.6, "west": 46.5, "north": 24.8, "east": 46.8}, cookies=cookies
+    )
+    assert response.status_code == 200
+    found = {(p["lat"], p["lng"]) for p in response.json()["bookings"]}
+    assert found == {points["origin"], points["near"], points["mid"], (24.7137, 46.6754)}
+
+    response = client.get(
+        "/bookings/map", params={"south": -18.5, "west": 179.5, "north": -17.5, "east": -179.5}, cookies=cookies
+    )
+    found = {(p["lat"], p["lng"]) for p in response.json()["bookings"]}
+    assert found == {points["fiji"], points["samoa"]}
+
+    response = client.get(
+        "/bookings/map", params={"south": 25, "west": 46, "north": 24, "east": 47}, cookies=cookies
+    )
+    assert response.status_code == 400
+
+    response = client.get("/bookings/nearest", params={"lat": 24.7136, "lng": 46.6753, "k": 4}, cookies=cookies)
+    assert response.status_code == 200
+    nearest = response.json()["bookings"]
+    # The completed booking is not open, so it is skipped
+    assert [(p["lat"], p["lng"]) for p in nearest] == [
+        points["origin"], points["near"], points["mid"], points["far"]
+    ]
+    distances = [p["distance_m"] for p in nearest]
+    assert distances == sorted(distances)
+    assert distances[0] == 0
+    assert 700 < distances[1] < 900
+
+    # Each box reads only the closest few; a cut that leaves k unproven reads further, never less
+    from app.services import geo
+    monkeypatch.setattr(geo, "NEAREST_OVERFETCH", 1)
+    with count_queries() as statements:
+        response = client.get("/bookings/nearest", params={"lat": 24.7136, "lng": 46.6753, "k": 3}, cookies=cookies)
+    assert [(p["lat"], p["lng"]) for p in response.json()["bookings"]] == [
+        points["origin"], points["near"], points["mid"]
+    ]
+    box_reads = [statement for statement in statements if "geo_key" in statement]
+    assert box_reads and all("LIMIT" in statement for statement in box_reads)
+
+
+def test_search_bookings_ranked_with_arabic_folding(client):
+    client_id = create_user("searched@example.com", "pass1234")
+    other_id = create_user("other-searched@example.com", "pass1234")
+    create_user("searcher@example.com", "pass1234", role="technical")
+    service_id = create_service("خدمة البحث")
+
+    # Hamza, maqsura and tashkeel in the stored text, none in the query
+    create_booking(client_id, service_id, "أحمد", contact_phone="0500000001",
+                   description="صيانة مكيف", address_text="حي الشفا")
+    create_booking(client_id, service_id, "سالم", contact_phone="0500000002",
+                   description="تركيب مكيف عند أحمد", address_text="مستشفى الملك")
+    create_booking(other_id, service_id, "إِبراهيم", contact_phone="0500000003",
+                   description="نقل أثاث", address_text="المُصطفى")
+    create_booking(client_id, service_id, "خالد", contact_phone="0599999999", description="لا علاقة")
+
+    cookies = _login(client, "searcher@example.com", "pass1234")
+    response = client.get("/bookings", params={"q": "احمد"}, cookies=cookies)
+    assert response.status_code == 200
+    # The contact name outranks a mention in the description
+    assert response.text.index("0500000001") < response.text.index("0500000002")
+    assert "0500000003" not in response.text
+
+    response = client.get("/bookings", params={"q": "مستشفي"}, cookies=cookies)
+    assert "0500000002" in response.text and "0500000001" not in response.text
+    response = client.get("/bookings", params={"q": "ابراهيم المصطفى"}, cookies=cookies)
+    assert "0500000003" in response.text and "0500000001" not in response.text
+    # Prefix match on the phone, paged through the offset cursor
+    response = client.get("/bookings", params={"q": "05000", "limit": 2}, cookies=cookies)
+    assert response.text.count("📞") == 2
+    cursor = re.search(r"cursor=(\d+)", response.text).group(1)
+    response = client.get("/bookings", params={"q": "05000", "limit": 2, "cursor": cursor}, cookies=cookies)
+    assert response.text.count("📞") == 1
+    assert "0599999999" not in response.text
+
+    response = client.get("/bookings", params={"q": "غير موجود"}, cookies=cookies)
+    assert "📞" not in response.text
+
+    # Clients only find their own bookings
+    cookies = _login(client, "other-searched@example.com", "pass1234")
+    response = client.get("/bookings", params={"q": "احمد"}, cookies=cookies)
+    assert "📞" not in response.text
+    response = client.get("/bookings", params={"q": "اثاث"}, cookies=cookies)
+    assert "0500000003" in response.text
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.pool import InstrumentedQueuePool, pool_status
+from tests.conftest import create_user
+
+
+def _login(client, email: str, password: str):
+    response = client.post(
+        "/login",
+        data={"email": email, "password": password},
+        follow_redirects=False,
+    )
+    assert response.status_code == 303
+    return response.cookies
+
+
+def test_instrumented_pool_counts_waits_and_timeouts(tmp_path):
+    async def _exercise():
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+            poolclass=InstrumentedQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.05,
+        )
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                busy = pool_status(engine.pool)
+                with pytest.raises(exc.TimeoutError):
+                    async with engine.connect():
+                        pass
+            return busy, pool_status(engine.pool)
+        finally:
+            await engine.dispose()
+
+    busy, status = asyncio.run(_exercise())
+    assert busy["checked_out"] == 1
+    assert status["checked_out"] == 0
+    assert status["acquired_total"] == 1
+    assert status["timeouts_total"] == 1
+    assert status["wait_seconds_max"] >= 0.05
+
+
+def test_pool_metrics_endpoint_is_admin_only(client):
+    create_user("poolclient@example.com", "pass1234")
+    create_user("pooladmin@example.com", "pass1234", role="admin")
+
+    cookies = _login(client, "poolclient@example.com", "pass1234")
+    assert client.get("/admin/metrics/db-pool", cookies=cookies).status_code == 403
+
+    cookies = _login(client, "pooladmin@example.com", "pass1234")
+    response = client.get("/admin/metrics/db-pool", cookies=cookies)
+    assert response.status_code == 200
+    assert "pool_class" in response.json()
+
+
+def test_sqlite_profile_applied_to_new_connections(app):
+    from app.db.session import engine, is_postgresql
+
+    if is_postgresql:
+        pytest.skip("SQLite profile only")
+
+    async def _pragmas():
+        async with engine.connect() as conn:
+            names = ("journal_mode", "synchronous", "busy_timeout", "temp_store", "foreign_keys")
+            return {name: (await conn.execute(text(f"PRAGMA {name}"))).scalar() for name in names}
+
+    pragmas = asyncio.run(_pragmas())
+    assert pragmas["journal_mode"].lower() == "wal"
+    assert pragmas["synchronous"] == 1  # NORMAL
+    assert pragmas["busy_timeout"] == 5000
+    assert pragmas["temp_store"] == 2  # MEMORY
+    assert pragmas["foreign_keys"] == 1
+
+
+def test_read_handlers_use_replica_until_client_writes(app, client, tmp_path, monkeypatch):
+    import app.db.session as db_session
+    from app.db.session import Base, PRIMARY_PIN_COOKIE, create_engine_for, is_postgresql
+    from app.models.service import Service
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+    if is_postgresql:
+        pytest.skip("replica stand-in is a second SQLite file")
+
+    replica = create_engine_for(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    replica_sessions = async_sessionmaker(bind=replica, expire_on_commit=False, class_=AsyncSession)
+
+    async def _seed_replica():
+        async with replica.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with replica_sessions() as session:
+            session.add(Service(name_ar="خدمة النسخة", name_en="Replica only", description=""))
+            await session.commit()
+
+    asyncio.run(_seed_replica())
+    monkeypatch.setattr(db_session, "AsyncReadSessionLocal", replica_sessions)
+    try:
+        create_user("replicaadmin@example.com", "pass1234", role="admin")
+        cookies = _login(client, "replicaadmin@example.com", "pass1234")
+        # Logging in is a write, so the session is pinned to the primary
+        assert PRIMARY_PIN_COOKIE in cookies
+        client.cookies.clear()
+
+        access = {"access_token": cookies["access_token"]}
+        response = client.get("/admin/services", cookies=access)
+        assert response.status_code == 200
+        assert "Replica only" in response.text
+
+        pinned = {**access, PRIMARY_PIN_COOKIE: cookies[PRIMARY_PIN_COOKIE]}
+        response = client.get("/admin/services", cookies=pinned)
+        assert response.status_code == 200
+        assert "Replica only" not in response.text
+    finally:
+        asyncio.run(replica.dispose())
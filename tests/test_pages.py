@@ -1,3 +1,6 @@
+from tests.conftest import count_queries, create_booking, create_service, create_user
+
+
 def test_home_page(client):
     response = client.get("/")
     assert response.status_code == 200
@@ -12,3 +15,165 @@ def test_booking_requires_login(client):
     response = client.get("/book", follow_redirects=False)
     assert response.status_code == 303
     assert response.headers["location"] == "/login"
+
+
+def test_dashboard_stats_are_aggregated(client):
+    user_id = create_user("stats@example.com", "pass1234")
+    other_id = create_user("other@example.com", "pass1234")
+    service_id = create_service("خدمة الإحصاء")
+    create_booking(user_id, service_id, "A", status="requested")
+    create_booking(user_id, service_id, "B", status="in_progress")
+    create_booking(user_id, service_id, "C", status="completed")
+    create_booking(user_id, service_id, "D", status="cancelled")
+    create_booking(other_id, service_id, "E", status="completed")
+
+    login = client.post("/login", data={"email": "stats@example.com", "password": "pass1234"}, follow_redirects=False)
+    response = client.get("/dashboard", cookies=login.cookies)
+    assert response.status_code == 200
+    assert 'font-[950]">4</div>' in response.text
+    assert 'font-[950] text-accent-primary">2</div>' in response.text
+    assert 'font-[950] text-[#28a745]">1</div>' in response.text
+
+
+def test_home_serves_catalog_from_cache_with_etag(client):
+    create_service("خدمة مخزنة")
+    first = client.get("/")
+    assert first.status_code == 200
+    assert "خدمة مخزنة" in first.text
+    etag = first.headers["etag"]
+
+    with count_queries() as statements:
+        cached = client.get("/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert statements == []
+
+
+def test_admin_service_edit_invalidates_catalog(client):
+    create_user("catalogadmin@example.com", "pass1234", role="admin")
+    first = client.get("/")
+    login = client.post(
+        "/login", data={"email": "catalogadmin@example.com", "password": "pass1234"}, follow_redirects=False
+    )
+    client.post(
+        "/admin/services/create",
+        data={"name_ar": "خدمة مضافة", "name_en": "Added", "description": ""},
+        cookies=login.cookies,
+    )
+    client.cookies.clear()
+    second = client.get("/")
+    assert "خدمة مضافة" in second.text
+    assert second.headers["etag"] != first.headers["etag"]
+
+
+def test_rate_limit_policies_and_bounded_buckets(client, monkeypatch):
+    from starlette.requests import Request
+
+    from app.services import rate_limit
+    from app.services.rate_limit import RatePolicy, TokenBucketLimiter
+
+    monkeypatch.setitem(rate_limit.POLICIES, "auth", RatePolicy("auth", 2, 60))
+    for _ in range(2):
+        response = client.post("/login", data={"email": "nobody@example.com", "password": "x"})
+        assert response.status_code == 401
+    response = client.post("/login", data={"email": "nobody@example.com", "password": "x"})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "30"
+    # Other routes draw on other buckets; health checks on none
+    assert client.get("/login").status_code == 200
+    assert client.get("/health").json() == {"status": "ok"}
+
+    def _routed(method: str, path: str) -> str:
+        request = Request({"type": "http", "method": method, "path": path, "headers": [(b"hx-request", b"true")]})
+        return rate_limit.route_policy(request).name
+
+    # The HTMX bucket follows the route, not the client's HX-Request header
+    assert _routed("GET", "/admin/bookings") == "htmx"
+    assert _routed("GET", "/dashboard") == "default"
+    assert _routed("POST", "/admin/bookings/bulk") == "default"
+
+    limiter = TokenBucketLimiter(max_clients=2)
+    policy = RatePolicy("default", 1, 10)
+    assert limiter.hit("a", policy, now=0) == 0
+    assert limiter.hit("a", policy, now=1) == 9
+    assert limiter.hit("a", policy, now=10) == 0
+    limiter.hit("b", policy, now=10)
+    limiter.hit("c", policy, now=10)
+    assert len(limiter) == 2
+    assert limiter.hit("a", policy, now=10) == 0  # evicted, so a fresh bucket
+
+    monkeypatch.setattr(rate_limit, "_TRUSTED_PROXIES", rate_limit._networks("10.0.0.0/8"))
+
+    def _request(peer: str, forwarded: str) -> Request:
+        return Request({
+            "type": "http", "method": "GET", "path": "/", "client": (peer, 1234),
+            "headers": [(b"x-forwarded-for", forwarded.encode())],
+        })
+
+    assert rate_limit.client_ip(_request("10.0.0.5", "203.0.113.9, 10.0.0.7")) == "203.0.113.9"
+    assert rate_limit.client_ip(_request("10.0.0.5", "198.51.100.1, 203.0.113.9")) == "203.0.113.9"
+    assert rate_limit.client_ip(_request("192.0.2.1", "203.0.113.9")) == "192.0.2.1"
+
+
+def test_rate_limit_state_shared_across_workers_and_nodes(tmp_path):
+    import asyncio
+
+    from app.db.session import AsyncSessionLocal
+    from app.services.rate_limit import DatabaseRateLimiter, RatePolicy, SharedMemoryLimiter, hit_async
+
+    policy = RatePolicy("auth", 3, 60)
+
+    # Two workers mapping the same file draw on one bucket
+    path = str(tmp_path / "buckets")
+    first, second = SharedMemoryLimiter(path, slots=64), SharedMemoryLimiter(path, slots=64)
+    assert first.hit("203.0.113.9", policy, now=0) == 0
+    assert second.hit("203.0.113.9", policy, now=0) == 0
+    assert first.hit("203.0.113.9", policy, now=0) == 0
+    assert second.hit("203.0.113.9", policy, now=0) == 20
+    assert second.hit("198.51.100.1", policy, now=0) == 0
+    # More clients than slots: the stalest buckets are reused, the file does not grow
+    tiny = SharedMemoryLimiter(str(tmp_path / "tiny"), slots=4)
+    for n in range(50):
+        assert tiny.hit(f"192.0.2.{n}", policy, now=n) == 0
+    assert (tmp_path / "tiny").stat().st_size == 4 * 24
+
+    # The file is opened on first use in each process, not when the limiter is built
+    # (a preloaded app forks its workers afterwards)
+    lazy = SharedMemoryLimiter(str(tmp_path / "lazy"), slots=4)
+    assert not (tmp_path / "lazy").exists()
+    lazy.hit("192.0.2.1", policy, now=0)
+    inherited_fd, lazy._pid = lazy._fd, -1  # as seen from a forked worker
+    lazy.hit("192.0.2.1", policy, now=0)
+    assert lazy._fd != inherited_fd
+
+    # While another worker holds the lock, the event loop keeps running
+    async def _contended():
+        with first._locked():
+            assert second.hit("192.0.2.9", policy, now=0, blocking=False) is None
+            waiting = asyncio.create_task(hit_async(second, "192.0.2.9", policy))
+            await asyncio.sleep(0.01)
+            assert not waiting.done()
+        return await waiting
+
+    assert asyncio.run(_contended()) == 0
+
+    # Two nodes share counts through the database, one flush behind
+    node_a = DatabaseRateLimiter(max_clients=100, retention_seconds=120)
+    node_b = DatabaseRateLimiter(max_clients=100, retention_seconds=120)
+
+    async def _flush(node):
+        async with AsyncSessionLocal() as session:
+            return await node.flush(session, now=6010)
+
+    assert node_a.hit("203.0.113.9", policy, now=6000) == 0
+    assert node_a.hit("203.0.113.9", policy, now=6000) == 0
+    assert asyncio.run(_flush(node_a)) == 1
+    assert node_b.hit("203.0.113.9", policy, now=6010) == 0
+    asyncio.run(_flush(node_b))
+    assert node_b.hit("203.0.113.9", policy, now=6020) == 40
+    # A has not flushed since B's request, so it lets one more through; then its
+    # flush brings the cluster-wide count and it refuses, into the next window too
+    assert node_a.hit("203.0.113.9", policy, now=6030) == 0
+    asyncio.run(_flush(node_a))
+    assert node_a.hit("203.0.113.9", policy, now=6040) == 20
+    assert node_a.hit("203.0.113.9", policy, now=6060) > 0
+    assert node_a.hit("203.0.113.9", policy, now=6100) == 0